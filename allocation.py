@@ -0,0 +1,139 @@
+# allocation.py
+# Claim allocation that can't over-allocate a listing. Every claim write runs in
+# a BEGIN IMMEDIATE transaction: the write lock is taken before the stock is
+# read, so two sessions (or processes) can't both see the same units, and the
+# decrement is a single conditional UPDATE. Lock waits beyond the busy timeout
+# are retried with exponential backoff.
+#
+# Claims store how much they asked for in Claimed_Quantity. Only active
+# (Pending / Completed) claims hold that stock: cancelling or deleting one gives
+# it back. Claims loaded from the CSVs have no Claimed_Quantity and hold nothing.
+import random
+import sqlite3
+import time
+
+import archive
+
+BUSY_TIMEOUT_MS = 5000
+RETRIES = 8
+BACKOFF = 0.01  # seconds, doubled per attempt with jitter
+ACTIVE = ("Pending", "Completed")
+
+
+class InsufficientQuantity(ValueError):
+    pass
+
+
+def connect(db_path, busy_ms=BUSY_TIMEOUT_MS):
+    conn = sqlite3.connect(db_path, timeout=busy_ms / 1000, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={busy_ms}")
+    return conn
+
+def install(conn):
+    # databases built before claims carried a quantity
+    columns = [r[1] for r in conn.execute("PRAGMA table_info(claims)")]
+    if "Claimed_Quantity" not in columns:
+        with conn:
+            conn.execute("ALTER TABLE claims ADD COLUMN Claimed_Quantity INTEGER")
+
+def _busy(e):
+    msg = str(e).lower()
+    return "locked" in msg or "busy" in msg
+
+def immediate(conn, work, retries=RETRIES, backoff=BACKOFF):
+    # run work() in one BEGIN IMMEDIATE transaction and commit it; returns
+    # (result, retries used). Only lock contention is retried.
+    for attempt in range(retries + 1):
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+        except sqlite3.OperationalError as e:
+            if not _busy(e) or attempt == retries:
+                raise
+            time.sleep(backoff * 2 ** attempt * random.uniform(0.5, 1.5))
+            continue
+        try:
+            result = work()
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        return result, attempt
+    raise AssertionError("unreachable")
+
+def _reserve(conn, food_id, quantity):
+    cur = conn.execute("UPDATE food_listings SET Quantity = Quantity - ? WHERE Food_ID = ? AND Quantity >= ?",
+                       (quantity, food_id, quantity))
+    if cur.rowcount == 0:
+        row = conn.execute("SELECT Quantity FROM food_listings WHERE Food_ID = ?", (food_id,)).fetchone()
+        if row is None:
+            raise InsufficientQuantity(f"Food_ID {food_id} does not exist")
+        raise InsufficientQuantity(f"Food_ID {food_id} has {row[0] or 0} left, {quantity} requested")
+
+def held_sql(food_id):
+    # SQL for the units a listing's active claims hold, archived months
+    # included; food_id is a column expression. A listing's Quantity is its
+    # stock with these already taken off
+    statuses = ", ".join(f"'{s}'" for s in ACTIVE)
+    return (f"(SELECT IFNULL(SUM(Claimed_Quantity), 0) FROM claims_history "
+            f"WHERE Food_ID = {food_id} AND Status IN ({statuses}))")
+
+def _release(conn, food_id, quantity):
+    if quantity:
+        conn.execute("UPDATE food_listings SET Quantity = Quantity + ? WHERE Food_ID = ?", (quantity, food_id))
+
+# ---------- claim operations ----------
+# The _claim / _set_status / _delete_claim bodies run inside a transaction the
+# caller already holds (batch_ops runs many of them in one); the public
+# functions wrap each in its own BEGIN IMMEDIATE.
+def _claim(conn, food_id, receiver_id, quantity=1, status="Pending", timestamp=None):
+    if quantity < 1:
+        raise ValueError("quantity must be at least 1")
+    if status in ACTIVE:
+        _reserve(conn, food_id, quantity)
+    claim_id = archive.next_claim_id(conn)
+    conn.execute(
+        "INSERT INTO claims (Claim_ID, Food_ID, Receiver_ID, Status, Timestamp, Claimed_Quantity) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        (claim_id, food_id, receiver_id, status, timestamp, quantity))
+    return claim_id
+
+def _missing(conn, claim_id):
+    if archive.archived(conn, claim_id):
+        return ValueError(f"Claim_ID {claim_id} is archived: its month is closed and can't be changed")
+    return ValueError(f"Claim_ID {claim_id} does not exist")
+
+def _set_status(conn, claim_id, status):
+    # moving between active and Cancelled gives back / takes again the claimed units
+    row = conn.execute("SELECT Food_ID, Status, Claimed_Quantity FROM claims WHERE Claim_ID = ?",
+                       (claim_id,)).fetchone()
+    if row is None:
+        raise _missing(conn, claim_id)
+    food_id, old, quantity = row
+    if old in ACTIVE and status not in ACTIVE:
+        _release(conn, food_id, quantity)
+    elif old not in ACTIVE and status in ACTIVE and quantity:
+        _reserve(conn, food_id, quantity)
+    conn.execute("UPDATE claims SET Status = ? WHERE Claim_ID = ?", (status, claim_id))
+
+def _delete_claim(conn, claim_id):
+    row = conn.execute("SELECT Food_ID, Status, Claimed_Quantity FROM claims WHERE Claim_ID = ?",
+                       (claim_id,)).fetchone()
+    if row is None and archive.archived(conn, claim_id):
+        raise _missing(conn, claim_id)
+    if row and row[1] in ACTIVE:
+        _release(conn, row[0], row[2])
+    conn.execute("DELETE FROM claims WHERE Claim_ID = ?", (claim_id,))
+
+def claim(conn, food_id, receiver_id, quantity=1, status="Pending", timestamp=None, retries=RETRIES):
+    # returns (Claim_ID, retries used); raises InsufficientQuantity without writing anything
+    if quantity < 1:
+        raise ValueError("quantity must be at least 1")
+    return immediate(conn, lambda: _claim(conn, food_id, receiver_id, quantity, status, timestamp), retries)
+
+def set_status(conn, claim_id, status, retries=RETRIES):
+    return immediate(conn, lambda: _set_status(conn, claim_id, status), retries)
+
+def delete_claim(conn, claim_id, retries=RETRIES):
+    return immediate(conn, lambda: _delete_claim(conn, claim_id), retries)
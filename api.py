@@ -0,0 +1,337 @@
+# api.py
+# Read-only HTTP/JSON API over local_food_wastage.db for consumers outside the
+# app: the Listings tab's filtered grid, provider / receiver lookups and the
+# predefined analytics. Stdlib only (http.server), a thread per client connection.
+#
+# Each request runs in one read transaction on a pooled read-only connection.
+# It first reads the data version: the change log's id and position
+# (changelog.py), how far the derived tables have caught up, and today's date.
+# The ETag hashes that version with the request, so If-None-Match gets its 304
+# before any query runs, and cached bodies are reused until the version moves.
+#
+#   python api.py [--db local_food_wastage.db] [--port 8502]
+#
+#   GET /listings?city=&radius_km=&food_type=&food_name=&provider=&provider_id=&sort=&desc=&limit=&after=
+#   GET /providers?q=&city=&sort=&desc=&limit=&after=        GET /providers/<id>
+#   GET /receivers?q=&city=&sort=&desc=&limit=&after=        GET /receivers/<id>
+#   GET /queries                                             GET /queries/<n>[?city=]
+#
+# Tables come back as {"columns": [...], "rows": [[...], ...]}. Pages carry
+# "next", the token to pass as after= for the following page (null at the end).
+import argparse
+import base64
+import hashlib
+import json
+import queue
+import re
+import sqlite3
+import threading
+import traceback
+from collections import OrderedDict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+import geo
+import pagination
+import search
+import snapshots
+from pipeline import DB_PATH
+from queries import GRIDS, PREDEFINED_QUERIES, PROVIDER_ID_BY_NAME_SQL, listings_where
+
+PORT = 8502
+POOL_SIZE = 4
+CACHE_ENTRIES = 1024
+CACHE_BYTES = 256 * 2 ** 20  # bodies over a quarter of this are never cached
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+PEOPLE = {"providers": "Provider_ID", "receivers": "Receiver_ID"}
+QUERY_IDS = {name.split(" ", 1)[0]: name for name in PREDEFINED_QUERIES}
+
+VERSION_SQL = """
+    SELECT (SELECT Log_ID FROM change_log_info),
+           (SELECT seq FROM sqlite_sequence WHERE name = 'change_log'),
+           (SELECT group_concat(Name || ':' || Seq) FROM (SELECT Name, Seq FROM change_consumers ORDER BY Name)),
+           date('now')
+"""
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+# ---------- connections / cache ----------
+class ConnectionPool:
+    # read-only connections, each used by one request at a time
+    def __init__(self, db_path, size=POOL_SIZE):
+        uri = Path(db_path).resolve().as_uri() + "?mode=ro"
+        self.idle = queue.LifoQueue()
+        for _ in range(size):
+            self.idle.put(sqlite3.connect(uri, uri=True, check_same_thread=False, timeout=30))
+
+    @contextmanager
+    def connection(self):
+        conn = self.idle.get()
+        try:
+            yield conn
+        finally:
+            self.idle.put(conn)
+
+    def close(self):
+        while not self.idle.empty():
+            self.idle.get().close()
+
+class ResponseCache:
+    # LRU of encoded bodies, each tagged with the data version it was built at
+    def __init__(self, max_entries=CACHE_ENTRIES, max_bytes=CACHE_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # request key -> (version, body)
+        self.bytes = 0
+        self.hits = self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key, version):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, version, body):
+        if not self.max_entries or len(body) > self.max_bytes // 4:
+            return
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.bytes -= len(old[1])
+            self.entries[key] = (version, body)
+            self.bytes += len(body)
+            while len(self.entries) > self.max_entries or self.bytes > self.max_bytes:
+                _, (_, evicted) = self.entries.popitem(last=False)
+                self.bytes -= len(evicted)
+
+
+# ---------- helpers ----------
+def _int(args, name, default=None):
+    if name not in args:
+        return default
+    try:
+        return int(args[name])
+    except ValueError:
+        raise ApiError(400, f"{name} must be an integer")
+
+def _table(cur):
+    return {"columns": [d[0] for d in cur.description], "rows": cur.fetchall()}
+
+def _encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+def _decode_cursor(token):
+    # -> (sort value, key), both plain values sqlite3 can bind
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token.encode()))
+    except (ValueError, TypeError):
+        values = None
+    if not (isinstance(values, list) and len(values) == 2
+            and all(v is None or isinstance(v, (str, int, float)) for v in values)):
+        raise ApiError(400, "after must be a next token from a previous page")
+    return tuple(values)
+
+
+class Api:
+    def __init__(self, db_path=DB_PATH, pool_size=POOL_SIZE, cache_entries=CACHE_ENTRIES, cache_bytes=CACHE_BYTES):
+        self.pool = ConnectionPool(db_path, pool_size)
+        self.cache = ResponseCache(cache_entries, cache_bytes)
+        self.geo = geo.CityIndex()
+        self.geo_log = None  # Log_ID the city coordinates were loaded at
+        self.geo_lock = threading.Lock()
+        self.routes = [
+            (re.compile(r"/listings"), self.listings),
+            (re.compile(r"/(providers|receivers)"), self.people),
+            (re.compile(r"/(providers|receivers)/(-?\d+)"), self.person),
+            (re.compile(r"/queries"), self.query_list),
+            (re.compile(r"/queries/(\w+)"), self.query),
+        ]
+
+    def handle(self, target, if_none_match=None):
+        # -> (status, headers, body)
+        url = urlsplit(target)
+        path = url.path.rstrip("/") or "/"
+        args = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        key = (path, tuple(sorted(args.items())))
+        headers = {"Content-Type": "application/json"}
+        for pattern, route in self.routes:
+            match = pattern.fullmatch(path)
+            if match:
+                break
+        else:
+            return 404, headers, json.dumps({"error": f"no such resource: {path}"}).encode()
+
+        with self.pool.connection() as conn:
+            conn.execute("BEGIN")  # version and body from the same snapshot of the file
+            try:
+                version = conn.execute(VERSION_SQL).fetchone()
+                etag = '"' + hashlib.blake2b(repr((version, key)).encode(), digest_size=12).hexdigest() + '"'
+                headers.update({"ETag": etag, "Cache-Control": "no-cache"})
+                if if_none_match and (if_none_match.strip() == "*" or etag in
+                                      (t.strip().removeprefix("W/") for t in if_none_match.split(","))):
+                    return 304, headers, b""
+                body = self.cache.get(key, version)
+                headers["X-Cache"] = "miss" if body is None else "hit"
+                if body is None:
+                    result = route(conn, args, *match.groups())
+                    body = json.dumps(result, separators=(",", ":")).encode()
+                    self.cache.put(key, version, body)
+                return 200, headers, body
+            except ApiError as e:
+                headers.pop("ETag", None)
+                headers.pop("X-Cache", None)
+                return e.status, headers, json.dumps({"error": str(e)}).encode()
+            except sqlite3.OperationalError as e:
+                # e.g. a file the pipeline hasn't built the change log / snapshot tables in
+                headers.pop("ETag", None)
+                return 503, headers, json.dumps({"error": f"database not ready: {e}"}).encode()
+            except Exception:
+                # a bug: the client still gets JSON, the traceback goes to stderr
+                traceback.print_exc()
+                headers.pop("ETag", None)
+                headers.pop("X-Cache", None)
+                return 500, headers, json.dumps({"error": "internal server error"}).encode()
+            finally:
+                conn.commit()  # ends the read transaction
+
+    def close(self):
+        self.pool.close()
+
+    # ---------- grids ----------
+    def _page(self, conn, name, where, params, args):
+        # one keyset page of queries.GRIDS[name], as in the app's paged grids
+        grid = GRIDS[name]
+        label = args.get("sort", next(iter(grid["sortable"])))
+        if label not in grid["sortable"]:
+            raise ApiError(400, f"sort must be one of {', '.join(grid['sortable'])}")
+        size = min(max(_int(args, "limit", PAGE_SIZE), 1), MAX_PAGE_SIZE)
+        cursor = _decode_cursor(args["after"]) if args.get("after") else None
+        sql, params = pagination.page_sql(grid, label, args.get("desc") in ("1", "true"), size, cursor,
+                                          where, params)
+        page = _table(conn.execute(sql, params))
+        rows = page["rows"]
+        return {"columns": page["columns"][:-2], "rows": [row[:-2] for row in rows],
+                "next": _encode_cursor(rows[-1][-2:]) if len(rows) == size else None}
+
+    def _near(self, conn, city, radius_km):
+        # Location spellings within radius_km of city; coordinates reload when the file was rebuilt
+        with self.geo_lock:
+            log_id = conn.execute("SELECT Log_ID FROM change_log_info").fetchone()[0]
+            if log_id != self.geo_log:
+                self.geo.load(conn)
+                self.geo_log = log_id
+        return self.geo.ensure_current(conn).nearby(city, radius_km)
+
+    def listings(self, conn, args):
+        # the Listings tab's filters
+        city = args.get("city", "All")
+        radius_km = _int(args, "radius_km", 0)
+        near = self._near(conn, city, radius_km) if city != "All" and radius_km else None
+        pid = _int(args, "provider_id")
+        if args.get("provider", "All") != "All":
+            row = conn.execute(PROVIDER_ID_BY_NAME_SQL, (args["provider"],)).fetchone()
+            if row is None:
+                raise ApiError(404, f"no provider named {args['provider']!r}")
+            pid = row[0]
+        where, params = listings_where(city, args.get("food_type", "All"), args.get("food_name", "All"), pid, near)
+        return self._page(conn, "food_listings", where, params, args)
+
+    # ---------- providers / receivers ----------
+    def people(self, conn, args, table):
+        if args.get("q", "").strip():
+            # ranked full-text hits (search.py), best first; not paged
+            sql, params, fixed = search.search_query(conn, table, args["q"], min(_int(args, "limit", PAGE_SIZE),
+                                                                                MAX_PAGE_SIZE))
+            result = _table(conn.execute(sql, params)) if sql else {"columns": [], "rows": []}
+            return {**result, "corrections": fixed}
+        where, params = ("City = ?", [args["city"]]) if "city" in args else ("1=1", [])
+        return self._page(conn, table, where, params, args)
+
+    def person(self, conn, args, table, row_id):
+        result = _table(conn.execute(f"SELECT * FROM {table} WHERE {PEOPLE[table]} = ?", (int(row_id),)))
+        if not result["rows"]:
+            raise ApiError(404, f"no row in {table} with {PEOPLE[table]} {row_id}")
+        return result
+
+    # ---------- predefined analytics ----------
+    def query_list(self, conn, args):
+        return {"queries": [{"id": n, "name": name, "parameters": ["city"] if "?" in PREDEFINED_QUERIES[name] else []}
+                            for n, name in QUERY_IDS.items()]}
+
+    def query(self, conn, args, number):
+        if number not in QUERY_IDS:
+            raise ApiError(404, f"no predefined query {number}")
+        name = QUERY_IDS[number]
+        sql = PREDEFINED_QUERIES[name]
+        if "?" in sql:
+            if "city" not in args:
+                raise ApiError(400, "this query needs city=")
+            return {"query": name, "source": "live", **_table(conn.execute(sql, (args["city"],)))}
+        # the stored snapshot while it still matches its source tables (snapshots.py)
+        if not snapshots.stale(conn, {name: sql}):
+            stored = json.loads(conn.execute("SELECT Result FROM query_snapshots WHERE Name = ?",
+                                             (name,)).fetchone()[0])
+            return {"query": name, "source": "snapshot", "columns": stored["columns"], "rows": stored["data"]}
+        return {"query": name, "source": "live", **_table(conn.execute(sql))}
+
+
+# ---------- server ----------
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so a client reuses its connection
+    disable_nagle_algorithm = True  # headers and body go out as two writes
+    api = None
+    quiet = True
+
+    def do_GET(self):
+        status, headers, body = self.api.handle(self.path, self.headers.get("If-None-Match"))
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if not self.quiet:
+            super().log_message(format, *args)
+
+def make_server(api, host="127.0.0.1", port=PORT, quiet=True):
+    handler = type("ApiHandler", (Handler,), {"api": api, "quiet": quiet})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a read-only JSON API over the database.")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--pool", type=int, default=POOL_SIZE, help="read-only connections")
+    parser.add_argument("--cache", type=int, default=CACHE_ENTRIES, help="cached responses (0 = off)")
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    args = parser.parse_args()
+
+    api = Api(args.db, args.pool, args.cache)
+    server = make_server(api, args.host, args.port, quiet=not args.verbose)
+    print(f"serving {args.db} on http://{args.host}:{server.server_port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        api.close()
@@ -2,18 +2,101 @@
 import streamlit as st
 import sqlite3
 import pandas as pd
-import io
+import time
+import uuid
+from datetime import date, datetime
+
+import allocation
+import archive
+import batch_ops
+import changelog
+import jobs
+from db import Database
+from expiry import expiring_query, install as install_expiry_indexes
+from export import export_csv
+import geo
+from matching import Matcher
+from pagination import count_sql, page_sql, split_page
+from profiler import Profiler
+import search
+import snapshots
+import summary
+from queries import (CLAIMS_VIEW_SQL, COMMON_FOOD_TYPES_SQL, FOOD_TYPES_SQL, GRIDS, MONTHLY_CLAIMS_SQL,
+                     PREDEFINED_QUERIES, PROVIDER_ID_BY_NAME_SQL, TOTALS_SQL, listings_where)
 
 DB_PATH = "local_food_wastage.db"
 
 st.set_page_config(page_title="Local Food Wastage Management", layout="wide")
 
+@st.cache_resource
+def get_db():
+    # one per server process: shared write connection + result cache
+    db = Database(DB_PATH, derived=summary.DERIVED)
+    with db.write_lock:
+        allocation.install(db.write_conn)
+        archive.install(db.write_conn)  # before summary: its triggers watch claims_archive
+        summary.install(db.write_conn)
+        snapshots.install(db.write_conn)
+        install_expiry_indexes(db.write_conn)
+        search.install(db.write_conn)
+        geo.install(db.write_conn)
+        changelog.install(db.write_conn)  # after allocation: the triggers copy every column
+    get_ingest().attach(db)
+    return db
+
+@st.cache_resource
+def get_matcher():
+    # in-memory receiver <-> listing index, shared by all sessions. Reloaded
+    # after a data refresh: the new file's table versions can repeat the old ones
+    db = get_db()
+    matcher = Matcher().load(db.reader())
+    get_ingest().on_swap(lambda: matcher.load(db.reader()))
+    return matcher
+
+@st.cache_resource
+def get_geo():
+    # city coordinates in a grid, shared by all sessions; coordinates only
+    # change with a pipeline run
+    db = get_db()
+    index = geo.CityIndex().load(db.reader())
+    get_ingest().on_swap(lambda: index.load(db.reader()))
+    return index
+
+@st.cache_resource
+def get_refresher():
+    # rebuilds the predefined-query snapshots off the script thread
+    refresher = snapshots.Refresher(get_db())
+    refresher.request()
+    get_ingest().on_swap(refresher.request)
+    return refresher
+
+@st.cache_resource
+def get_ingest():
+    # background pipeline.py runs into a staging file, swapped in when done
+    return jobs.IngestQueue(DB_PATH)
+
+@st.cache_resource
+def get_profiler():
+    # statement timings for the Admin tab, shared by all sessions
+    return Profiler()
+
 def get_conn():
-    return sqlite3.connect(DB_PATH)
+    # one read connection per browser session, reused across reruns; reopened
+    # after a data refresh swapped the file underneath it
+    db = get_db()
+    if st.session_state.get("read_conn_generation") != db.generation:
+        if "read_conn" in st.session_state:
+            st.session_state.read_conn.close()
+        with get_profiler().timed("(open read connection)", "connect"):
+            conn = db.reader()
+        conn.set_trace_callback(get_profiler().trace)  # counts reads that bypass run_query
+        st.session_state.read_conn = conn
+        st.session_state.read_conn_generation = db.generation
+    return st.session_state.read_conn
 
 def db_exists():
     try:
-        conn = get_conn()
+        conn = sqlite3.connect(DB_PATH)
         cur = conn.cursor()
         cur.execute("SELECT name FROM sqlite_master WHERE type='table';")
         tables = cur.fetchall()
@@ -22,74 +105,211 @@ def db_exists():
     except Exception:
         return False
 
-def to_csv_download(df, name="data.csv"):
-    csv_bytes = df.to_csv(index=False).encode('utf-8')  # convert to bytes
-    st.download_button(
-        f"Download {name}",
-        data=csv_bytes,
-        file_name=name,
-        mime="text/csv"
-    )
-
+def ingest_panel():
+    # queued / running pipeline jobs and recent results; polls while busy and
+    # reruns the whole page once the last job is done
+    busy = get_ingest().busy()
+
+    @st.fragment(run_every=2 if busy else None)
+    def panel():
+        status = get_ingest().status()
+        for job in status["active"]:
+            merged = f", {job['requests']} requests merged" if job["requests"] > 1 else ""
+            step = f": {job['step']}" if job["step"] else ""
+            st.progress(job["done"] / job["steps"],
+                        text=f"Job {job['id']} ({job['mode']}{merged}) {job['state']}{step}")
+        if busy and not status["active"]:
+            st.rerun()
+        if status["finished"]:
+            st.dataframe(pd.DataFrame(status["finished"], columns=["id", "mode", "state", "requests", "queued_at",
+                                                                   "started_at", "seconds", "error"]))
+            last = (status["active"] or status["finished"])[0]
+            with st.expander(f"pipeline.py output, job {last['id']}"):
+                st.code("\n".join(last["log"]) or "(no output yet)")
+
+    panel()
 
 st.title("Local Food Wastage Management System")
 
 if not db_exists():
-    st.error("Database not found. Run your pipeline to create local_food_wastage.db, then reload this app.")
+    st.warning("Database not found. Build it from the CSVs here (pipeline.py in full mode, in the background), "
+               "or run pipeline.py yourself and reload this app.")
+    if st.button("Build the database", disabled=get_ingest().busy()):
+        get_ingest().request("full", requested_by=st.session_state.setdefault("profile_session", uuid.uuid4().hex[:8]))
+    ingest_panel()
     st.stop()
 
+get_refresher()  # starts the background snapshot refresh once per server process
+get_profiler().start_run(st.session_state.setdefault("profile_session", uuid.uuid4().hex[:8]))
+
 # ---------- Utility helpers ----------
 def run_query(sql, params=None):
+    # cached until a write touches one of the tables the query reads
     conn = get_conn()
-    df = pd.read_sql_query(sql, conn, params=params or ())
-    conn.close()
+    with get_profiler().timed(sql, "read", params, conn) as info:
+        df = get_db().query(conn, sql, params, stats=info)
+        info["rows"] = len(df)
     return df
 
 def exec_sql(sql, params=None):
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute(sql, params or ())
-    conn.commit()
-    conn.close()
+    with get_profiler().timed(sql, "write", params, get_conn()) as info:
+        cur = get_db().execute(sql, params)
+        info["rows"] = cur.rowcount
+    get_refresher().request()
+    return cur
+
+def allocate(op, *args):
+    # claim writes go through allocation.py (BEGIN IMMEDIATE, no over-allocation)
+    # on the shared write connection
+    db = get_db()
+    try:
+        with db.write_lock, get_profiler().timed(f"allocation.{op.__name__}", "write"):
+            result, _ = op(db.write_conn, *args)
+    finally:
+        db.invalidate("claims", "food_listings")
+        get_refresher().request()
+    return result
+
+def write_batch(table, action, rows):
+    # batch_ops.apply on the shared write connection, locked like allocate()
+    db = get_db()
+    try:
+        with db.write_lock, get_profiler().timed(f"batch_ops.apply {table} {action}", "write") as info:
+            result, _ = batch_ops.apply(db.write_conn, table, action, rows)
+            info["rows"] = len(result[0])
+    finally:
+        db.invalidate(*batch_ops.WRITES[table])
+        get_refresher().request()
+    return result
+
+def batch_editor(table, label):
+    # many rows per submit: an uploaded CSV or rows typed into the grid, checked
+    # with the pipeline's cleaning rules and applied in one transaction.
+    # The match index notices the write through table_versions on its next run.
+    with st.expander(f"Batch {label}"):
+        action = st.radio("Action", ["Create / update", "Delete"], horizontal=True, key=f"batch_{table}_action")
+        action = "delete" if action == "Delete" else "upsert"
+        columns = batch_ops.template(table, action)
+        st.caption(f"Columns: {', '.join(columns)}. " + ("Rows are deleted by ID." if action == "delete" else
+                   f"Leave {columns[0]} blank to create a row; a known {columns[0]} updates it."))
+        upload = st.file_uploader("Upload CSV", type="csv", key=f"batch_{table}_{action}_csv")
+        if upload is not None:
+            df = batch_ops.read_csv(upload)
+            st.caption(f"{len(df)} rows in {upload.name}")
+        else:
+            df = st.data_editor(pd.DataFrame(columns=columns, dtype=str), num_rows="dynamic",
+                                key=f"batch_{table}_{action}_grid")
+        if st.button("Apply batch", key=f"batch_{table}_{action}_apply"):
+            try:
+                rows, errors = batch_ops.validate(table, df, action)
+                applied, failed = write_batch(table, action, rows) if rows else ([], [])
+            except Exception as e:
+                st.error(f"Error: {e}")
+                return
+            errors = sorted(errors + failed)
+            st.success(f"{len(applied)} rows applied, {len(errors)} rejected.")
+            if errors:
+                st.dataframe(pd.DataFrame(errors, columns=["Row", "Error"]))
+
+def refresh_matches(listing=None, receiver=None):
+    # keep the match index in step with a write made through one of the forms
+    get_matcher().refresh_claim(get_conn(), listing, receiver)
+
+def claim_refs(claim_id):
+    row = get_conn().execute("SELECT Food_ID, Receiver_ID FROM claims WHERE Claim_ID = ?", (claim_id,)).fetchone()
+    return row or (None, None)
+
+def query_csv_download(sql, params=None, name="data.csv"):
+    # rows are streamed from a cursor only when the button is clicked
+    db = get_db()
+    gzipped = st.checkbox(f"gzip {name}", key=f"gzip_{name}")
+
+    def build():
+        conn = db.reader()  # the callback runs outside the script thread
+        try:
+            return export_csv(conn, sql, params, compress=gzipped)
+        finally:
+            conn.close()
+
+    st.download_button(
+        f"Download {name}" + (".gz" if gzipped else ""),
+        data=build,
+        file_name=name + (".gz" if gzipped else ""),
+        mime="application/gzip" if gzipped else "text/csv",
+        key=f"download_{name}",
+        on_click="ignore"
+    )
+
+def search_box(table, label):
+    # ranked full-text hits (search.py); words match as prefixes and a word with
+    # no hits is swapped for close spellings
+    text = st.text_input(f"Search {label}", key=f"search_{table}",
+                         placeholder="type any part of a name, city or type")
+    if text.strip():
+        start = time.perf_counter()
+        df, fixed = search.search(get_conn(), table, text, limit=50)
+        note = "".join(f"; '{w}' read as {' / '.join(c)}" for w, c in fixed.items())
+        st.caption(f"{len(df)} best matches in {(time.perf_counter() - start) * 1000:.0f} ms{note}")
+        st.dataframe(df)
+
+def search_select(label, table, column, key):
+    # a selectbox over the values matching what was typed, instead of every
+    # distinct value in the table
+    text = st.text_input(f"{label} search", key=f"{key}_q", placeholder="type to find values")
+    options = ["All"] + (search.search_values(get_conn(), table, column, text) if text.strip() else [])
+    return st.selectbox(label, options, key=key)
+
+def paged_grid(name, where="1=1", params=()):
+    # one page of queries.GRIDS[name]; only the visible rows are fetched
+    grid = GRIDS[name]
+    c1, c2, c3 = st.columns(3)
+    sort = c1.selectbox("Sort by", list(grid["sortable"]), key=f"{name}_sort")
+    descending = c2.checkbox("Descending", value=grid.get("descending", False), key=f"{name}_desc")
+    page_size = c3.selectbox("Rows per page", [25, 50, 100, 500], index=1, key=f"{name}_size")
+
+    # cursors[i] is where page i starts; any change of view goes back to page 1
+    view = (sort, descending, page_size, where, tuple(params))
+    state = st.session_state.setdefault(f"{name}_pages", {"view": view, "cursors": [None]})
+    if state["view"] != view:
+        state.update(view=view, cursors=[None])
+    cursors = state["cursors"]
+
+    total = int(run_query(count_sql(grid, where), params).iloc[0, 0])
+    sql, page_params = page_sql(grid, sort, descending, page_size, cursors[-1], where, params)
+    df, next_cursor = split_page(run_query(sql, page_params))
+    st.dataframe(df)
+
+    first = (len(cursors) - 1) * page_size
+    has_next = next_cursor is not None and first + len(df) < total
+    p1, p2, p3 = st.columns([1, 1, 4])
+    p1.button("◀ Prev", key=f"{name}_prev", disabled=len(cursors) == 1, on_click=cursors.pop)
+    p2.button("Next ▶", key=f"{name}_next", disabled=not has_next, on_click=cursors.append, args=(next_cursor,))
+    p3.caption(f"Rows {first + 1 if len(df) else 0}–{first + len(df)} of {total}")
+    return df
 
 # ---------- Sidebar quick filters (used across app) ----------
 with st.sidebar:
     st.header("Quick Filters")
     # populate dynamic filters
-    conn = get_conn()
-    cities = ["All"] + sorted([r[0] for r in conn.execute("SELECT DISTINCT Location FROM food_listings WHERE Location IS NOT NULL").fetchall() if r[0]])
-    food_types = ["All"] + sorted([r[0] for r in conn.execute("SELECT DISTINCT Food_Type FROM food_listings WHERE Food_Type IS NOT NULL").fetchall() if r[0]])
-    providers_list = ["All"] + sorted([r[0] for r in conn.execute("SELECT DISTINCT Name FROM providers WHERE Name IS NOT NULL").fetchall() if r[0]])
-    conn.close()
+    food_types = ["All"] + sorted([v for v in run_query("SELECT Food_Type FROM summary_food_types WHERE Food_Type IS NOT NULL")["Food_Type"] if v])
 
-    quick_city = st.selectbox("City filter (quick)", cities)
+    quick_city = search_select("City filter (quick)", "food_listings", "Location", "quick_city")
     quick_food_type = st.selectbox("Food Type (quick)", food_types)
-    quick_provider = st.selectbox("Provider (quick)", providers_list)
+    quick_provider = search_select("Provider (quick)", "providers", "Name", "quick_provider")
     st.markdown("---")
     st.write("DB summary")
-    conn = get_conn()
-    counts = conn.execute("""
-        SELECT
-          (SELECT COUNT(*) FROM providers) as providers,
-          (SELECT COUNT(*) FROM receivers) as receivers,
-          (SELECT COUNT(*) FROM food_listings) as food_listings,
-          (SELECT COUNT(*) FROM claims) as claims
-    """).fetchone()
-    conn.close()
-    st.write(f"Providers: {counts[0]}  •  Receivers: {counts[1]}")
-    st.write(f"Food Listings: {counts[2]}  •  Claims: {counts[3]}")
+    totals = dict(run_query(TOTALS_SQL).values.tolist())
+    st.write(f"Providers: {totals['providers']}  •  Receivers: {totals['receivers']}")
+    st.write(f"Food Listings: {totals['food_listings']}  •  Claims: {totals['claims']}")
 
 # ---------- Main layout: tabs ----------
-tabs = st.tabs(["Dashboard", "Listings (Filters + CRUD)", "Providers / Receivers", "Claims", "Queries"])
+tabs = st.tabs(["Dashboard", "Listings (Filters + CRUD)", "Providers / Receivers", "Claims", "Queries", "Admin"])
 
 # ---------------- DASHBOARD ----------------
 with tabs[0]:
     st.header("Dashboard")
     # KPIs
-    k1 = run_query("SELECT COUNT(*) AS total_providers FROM providers").iloc[0,0]
-    k2 = run_query("SELECT COUNT(*) AS total_receivers FROM receivers").iloc[0,0]
-    k3 = run_query("SELECT SUM(Quantity) AS total_quantity FROM food_listings").iloc[0,0] or 0
-    k4 = run_query("SELECT COUNT(*) AS total_claims FROM claims").iloc[0,0]
+    k1, k2, k3, k4 = (totals[k] for k in ["providers", "receivers", "quantity", "claims"])
 
     col1, col2, col3, col4 = st.columns(4)
     col1.metric("Providers", int(k1))
@@ -98,60 +318,62 @@ with tabs[0]:
     col4.metric("Total Claims", int(k4))
 
     st.markdown("### Most Common Food Types")
-    df_common = run_query("""
-        SELECT Food_Type, COUNT(*) as cnt
-        FROM food_listings
-        GROUP BY Food_Type
-        ORDER BY cnt DESC
-        LIMIT 10
-    """)
+    df_common = run_query(COMMON_FOOD_TYPES_SQL)
     if not df_common.empty:
         st.bar_chart(df_common.set_index("Food_Type"))
 
     st.markdown("### Monthly Claims Trend")
-    df_monthly = run_query("""
-        SELECT substr(Timestamp, 1, 7) as month, COUNT(*) as claims_count
-        FROM claims
-        WHERE Timestamp IS NOT NULL
-        GROUP BY month
-        ORDER BY month;
-    """)
+    df_monthly = run_query(MONTHLY_CLAIMS_SQL)
     if not df_monthly.empty:
         st.line_chart(df_monthly.set_index("month"))
 
 # ---------------- LISTINGS ----------------
 with tabs[1]:
     st.header("Available Food Listings")
+    search_box("food_listings", "listings")
     # Filters (more advanced)
-    city_filter = st.selectbox("City (all)", ["All"] + sorted([v for v in run_query("SELECT DISTINCT Location FROM food_listings")["Location"].dropna()]))
-    food_type_filter = st.selectbox("Food Type (all)", ["All"] + sorted([v for v in run_query("SELECT DISTINCT Food_Type FROM food_listings")["Food_Type"].dropna()]))
-    food_name_filter = st.selectbox("Food Name (all)", ["All"] + sorted([v for v in run_query("SELECT DISTINCT Food_Name FROM food_listings")["Food_Name"].dropna()]))
-    provider_filter = st.selectbox("Provider (all)", ["All"] + sorted([v for v in run_query("SELECT DISTINCT Name FROM providers")["Name"].dropna()]))
-
-    q = "SELECT * FROM food_listings WHERE 1=1"
-    params = []
-    if city_filter != "All":
-        q += " AND Location = ?"
-        params.append(city_filter)
-    if food_type_filter != "All":
-        q += " AND Food_Type = ?"
-        params.append(food_type_filter)
-    if food_name_filter != "All":
-        q += " AND Food_Name = ?"
-        params.append(food_name_filter)
+    city_filter = search_select("City (all)", "food_listings", "Location", "city_filter")
+    radius_km = st.number_input("Also within km of the city (0 = that city only)", min_value=0, value=0, step=5,
+                                disabled=city_filter == "All")
+    near = None
+    if city_filter != "All" and radius_km:
+        index = get_geo().ensure_current(get_conn())
+        near = index.nearby(city_filter, radius_km)
+        if geo.city_key(city_filter) in index.coords:
+            st.caption(f"{len(index.within(city_filter, radius_km))} cities within {radius_km} km of {city_filter}")
+        else:
+            st.caption(f"No coordinates for {city_filter} (add it to {geo.CITIES_FILE} and rerun the pipeline); "
+                       "showing that city only")
+    food_type_filter = st.selectbox("Food Type (all)", ["All"] + list(run_query(FOOD_TYPES_SQL)["Food_Type"]))
+    food_name_filter = search_select("Food Name (all)", "food_listings", "Food_Name", "food_name_filter")
+    provider_filter = search_select("Provider (all)", "providers", "Name", "provider_filter")
+
+    pid = None
     if provider_filter != "All":
         # translate provider name to provider_id(s)
-        provider_ids = run_query("SELECT Provider_ID FROM providers WHERE Name = ?", (provider_filter,))
+        provider_ids = run_query(PROVIDER_ID_BY_NAME_SQL, (provider_filter,))
         if not provider_ids.empty:
             pid = int(provider_ids.iloc[0,0])
-            q += " AND Provider_ID = ?"
-            params.append(pid)
+    where, params = listings_where(city_filter, food_type_filter, food_name_filter, pid, near)
 
-    df_food = pd.read_sql_query(q, get_conn(), params=params)
-    st.dataframe(df_food)
+    paged_grid("food_listings", where, params)
 
     # Download CSV of current view
-    to_csv_download(df_food, name="filtered_food_listings.csv")
+    query_csv_download(f"SELECT * FROM food_listings WHERE {where}", params, name="filtered_food_listings.csv")
+
+    st.markdown("---")
+    st.subheader("Expiring soon")
+    e1, e2, e3 = st.columns(3)
+    as_of = e1.date_input("As of", value=date.today())
+    hours = e2.number_input("Within hours", min_value=1, value=48)
+    top_n = e3.number_input("Show next", min_value=1, max_value=500, value=20)
+    # minute resolution keeps the cached result reusable across reruns
+    now = datetime.combine(as_of, datetime.now().time().replace(second=0, microsecond=0))
+    exp_sql, exp_params = expiring_query(int(top_n), None if city_filter == "All" else city_filter, int(hours), now)
+    df_exp = run_query(exp_sql, exp_params)
+    st.caption(f"Live listings in {city_filter if city_filter != 'All' else 'all cities'} expiring by "
+               f"{exp_params[1]}, soonest first")
+    st.dataframe(df_exp)
 
     st.markdown("---")
     st.subheader("Create / Update / Delete Food Listing")
@@ -168,31 +390,27 @@ with tabs[1]:
         mtype = st.text_input("Meal_Type")
         submitted = st.form_submit_button("Submit")
         if submitted:
-            conn = get_conn()
-            cur = conn.cursor()
             try:
                 if fid.strip() == "":
                     # create new (auto primary key if not provided)
-                    cur.execute("""
+                    cur = exec_sql("""
                         INSERT INTO food_listings
                         (Food_Name, Quantity, Expiry_Date, Provider_ID, Provider_Type, Location, Food_Type, Meal_Type)
                         VALUES (?, ?, ?, ?, ?, ?, ?, ?)
                     """, (fname, int(qty), expiry or None, int(provider_id_input) if provider_id_input else None, ptype, location, ftype, mtype))
-                    conn.commit()
+                    refresh_matches(listing=cur.lastrowid)
                     st.success("New food listing added.")
                 else:
                     # update existing
-                    cur.execute("""
+                    exec_sql("""
                         UPDATE food_listings
                         SET Food_Name=?, Quantity=?, Expiry_Date=?, Provider_ID=?, Provider_Type=?, Location=?, Food_Type=?, Meal_Type=?
                         WHERE Food_ID=?
                     """, (fname, int(qty), expiry or None, int(provider_id_input) if provider_id_input else None, ptype, location, ftype, mtype, int(fid)))
-                    conn.commit()
+                    refresh_matches(listing=int(fid))
                     st.success("Food listing updated.")
             except Exception as e:
                 st.error(f"DB error: {e}")
-            finally:
-                conn.close()
 
     st.markdown("### Delete a food listing")
     with st.form("delete_food"):
@@ -204,10 +422,13 @@ with tabs[1]:
             else:
                 try:
                     exec_sql("DELETE FROM food_listings WHERE Food_ID = ?", (int(del_id),))
+                    refresh_matches(listing=int(del_id))
                     st.success("Deleted food listing.")
                 except Exception as e:
                     st.error(f"Error: {e}")
 
+    batch_editor("food_listings", "food listings")
+
 # ---------------- PROVIDERS / RECEIVERS ----------------
 with tabs[2]:
     st.header("Providers & Receivers Management")
@@ -216,9 +437,9 @@ with tabs[2]:
 
     with left:
         st.subheader("Providers")
-        df_prov = run_query("SELECT * FROM providers")
-        st.dataframe(df_prov)
-        to_csv_download(df_prov, name="providers.csv")
+        search_box("providers", "providers")
+        paged_grid("providers")
+        query_csv_download("SELECT * FROM providers", name="providers.csv")
 
         with st.form("provider_form"):
             pid = st.text_input("Provider_ID (leave blank to create)")
@@ -230,22 +451,16 @@ with tabs[2]:
             subp = st.form_submit_button("Submit Provider")
             if subp:
                 try:
-                    conn = get_conn()
-                    cur = conn.cursor()
                     if pid.strip() == "":
-                        cur.execute("INSERT INTO providers (Name, Type, Address, City, Contact) VALUES (?, ?, ?, ?, ?)",
-                                    (pname, ptype, paddr, pcity, pcontact))
-                        conn.commit()
+                        exec_sql("INSERT INTO providers (Name, Type, Address, City, Contact) VALUES (?, ?, ?, ?, ?)",
+                                 (pname, ptype, paddr, pcity, pcontact))
                         st.success("Provider added.")
                     else:
-                        cur.execute("UPDATE providers SET Name=?, Type=?, Address=?, City=?, Contact=? WHERE Provider_ID=?",
-                                    (pname, ptype, paddr, pcity, pcontact, int(pid)))
-                        conn.commit()
+                        exec_sql("UPDATE providers SET Name=?, Type=?, Address=?, City=?, Contact=? WHERE Provider_ID=?",
+                                 (pname, ptype, paddr, pcity, pcontact, int(pid)))
                         st.success("Provider updated.")
                 except Exception as e:
                     st.error(f"Error: {e}")
-                finally:
-                    conn.close()
 
         with st.form("delete_provider"):
             dpid = st.text_input("Provider_ID to delete")
@@ -260,11 +475,13 @@ with tabs[2]:
                     except Exception as e:
                         st.error(f"Error: {e}")
 
+        batch_editor("providers", "providers")
+
     with right:
         st.subheader("Receivers")
-        df_recv = run_query("SELECT * FROM receivers")
-        st.dataframe(df_recv)
-        to_csv_download(df_recv, name="receivers.csv")
+        search_box("receivers", "receivers")
+        paged_grid("receivers")
+        query_csv_download("SELECT * FROM receivers", name="receivers.csv")
 
         with st.form("receiver_form"):
             rid = st.text_input("Receiver_ID (leave blank to create)")
@@ -275,22 +492,18 @@ with tabs[2]:
             subr = st.form_submit_button("Submit Receiver")
             if subr:
                 try:
-                    conn = get_conn()
-                    cur = conn.cursor()
                     if rid.strip() == "":
-                        cur.execute("INSERT INTO receivers (Name, Type, City, Contact) VALUES (?, ?, ?, ?)",
-                                    (rname, rtype, rcity, rcontact))
-                        conn.commit()
+                        cur = exec_sql("INSERT INTO receivers (Name, Type, City, Contact) VALUES (?, ?, ?, ?)",
+                                       (rname, rtype, rcity, rcontact))
+                        refresh_matches(receiver=cur.lastrowid)
                         st.success("Receiver added.")
                     else:
-                        cur.execute("UPDATE receivers SET Name=?, Type=?, City=?, Contact=? WHERE Receiver_ID=?",
-                                    (rname, rtype, rcity, rcontact, int(rid)))
-                        conn.commit()
+                        exec_sql("UPDATE receivers SET Name=?, Type=?, City=?, Contact=? WHERE Receiver_ID=?",
+                                 (rname, rtype, rcity, rcontact, int(rid)))
+                        refresh_matches(receiver=int(rid))
                         st.success("Receiver updated.")
                 except Exception as e:
                     st.error(f"Error: {e}")
-                finally:
-                    conn.close()
 
         with st.form("delete_receiver"):
             drid = st.text_input("Receiver_ID to delete")
@@ -301,30 +514,72 @@ with tabs[2]:
                 else:
                     try:
                         exec_sql("DELETE FROM receivers WHERE Receiver_ID = ?", (int(drid),))
+                        refresh_matches(receiver=int(drid))
                         st.success("Receiver deleted.")
                     except Exception as e:
                         st.error(f"Error: {e}")
 
+        batch_editor("receivers", "receivers")
+
 # ---------------- CLAIMS ----------------
 with tabs[3]:
     st.header("Claims Management")
 
     st.subheader("View Claims")
-    df_claims = run_query("""
-        SELECT c.Claim_ID, c.Food_ID, f.Food_Name, c.Receiver_ID, r.Name as Receiver_Name, c.Status, c.Timestamp
-        FROM claims c
-        LEFT JOIN food_listings f ON c.Food_ID = f.Food_ID
-        LEFT JOIN receivers r ON c.Receiver_ID = r.Receiver_ID
-        ORDER BY c.Timestamp DESC
-    """)
-    st.dataframe(df_claims)
-    to_csv_download(df_claims, name="claims.csv")
+    hot, cold, months = archive.status(get_conn())
+    if months:
+        st.caption(f"{hot} claims in the open months (and every pending one); {cold} more in {len(months)} "
+                   f"archived months, {months[0][0]} to {months[-1][0]}, which can't be changed.")
+    paged_grid("claims")
+    if months and st.checkbox("Show archived claims", key="claims_archive_show"):
+        paged_grid("claims_archive")
+    query_csv_download(CLAIMS_VIEW_SQL, name="claims.csv")
+
+    st.markdown("### Suggested matches")
+    st.caption("Open listings proposed to receivers in the same city, ranked by expiry urgency, "
+               "quantity and what each receiver has claimed before.")
+    m1, m2 = st.columns([1, 3])
+    match_as_of = m1.date_input("Match as of", value=date.today())
+    match_receiver = m1.text_input("Receiver_ID (blank = match everyone)")
+    if m1.button("Run match"):
+        st.session_state.match_run = match_receiver.strip()
+    if "match_run" in st.session_state:
+        matcher = get_matcher().ensure_current(get_conn(), match_as_of)
+        start = time.perf_counter()
+        if st.session_state.match_run:
+            df_match = matcher.suggest(int(st.session_state.match_run), k=10)
+        else:
+            df_match = matcher.match()
+        m2.caption(f"{len(df_match)} proposals in {(time.perf_counter() - start) * 1000:.0f} ms "
+                   f"({len(matcher.listings)} open listings, {len(matcher.receivers)} receivers)")
+        m2.dataframe(df_match.head(200))
+
+    st.markdown("### Listings near a receiver")
+    st.caption("Open listings in the receiver's city and the cities around it, nearest first; "
+               f"{get_geo().located()} cities have coordinates.")
+    n1, n2, n3 = st.columns([1, 1, 1])
+    near_receiver = n1.text_input("Receiver_ID", key="near_receiver")
+    near_km = n2.number_input("Within km", min_value=0, value=25, step=5, key="near_km")
+    near_as_of = n3.date_input("Open as of", value=date.today(), key="near_as_of")
+    if near_receiver.strip():
+        try:
+            row = run_query("SELECT City FROM receivers WHERE Receiver_ID = ?", (int(near_receiver),))
+        except ValueError:
+            row = None
+            st.error("Receiver_ID must be an integer")
+        if row is not None and row.empty:
+            st.error(f"No receiver {near_receiver}")
+        elif row is not None:
+            df_near = geo.listings_near(get_conn(), get_geo(), row.iloc[0, 0], near_km, near_as_of.isoformat())
+            st.caption(f"Receiver {near_receiver} is in {row.iloc[0, 0]}; {len(df_near)} open listings")
+            st.dataframe(df_near)
 
     st.markdown("### Create a Claim")
     with st.form("create_claim"):
         cf_food_id = st.text_input("Food_ID")
         cf_receiver_id = st.text_input("Receiver_ID")
         cf_status = st.selectbox("Status", ["Pending", "Completed", "Cancelled"])
+        cf_qty = st.number_input("Quantity to claim", min_value=1, value=1)
         cf_ts = st.text_input("Timestamp (YYYY-MM-DD) or leave blank")
         cs = st.form_submit_button("Create Claim")
         if cs:
@@ -332,9 +587,12 @@ with tabs[3]:
                 st.error("Food_ID and Receiver_ID required")
             else:
                 try:
-                    exec_sql("INSERT INTO claims (Food_ID, Receiver_ID, Status, Timestamp) VALUES (?, ?, ?, ?)",
-                             (int(cf_food_id), int(cf_receiver_id), cf_status, cf_ts or None))
-                    st.success("Claim created.")
+                    claim_id = allocate(allocation.claim, int(cf_food_id), int(cf_receiver_id), int(cf_qty),
+                                        cf_status, cf_ts or None)
+                    refresh_matches(int(cf_food_id), int(cf_receiver_id))
+                    st.success(f"Claim {claim_id} created.")
+                except allocation.InsufficientQuantity as e:
+                    st.error(f"Not enough quantity: {e}")
                 except Exception as e:
                     st.error(f"Error: {e}")
 
@@ -348,8 +606,11 @@ with tabs[3]:
                 st.error("Provide Claim_ID")
             else:
                 try:
-                    exec_sql("UPDATE claims SET Status = ? WHERE Claim_ID = ?", (new_status, int(ucid)))
+                    allocate(allocation.set_status, int(ucid), new_status)
+                    refresh_matches(*claim_refs(int(ucid)))
                     st.success("Claim updated.")
+                except allocation.InsufficientQuantity as e:
+                    st.error(f"Not enough quantity: {e}")
                 except Exception as e:
                     st.error(f"Error: {e}")
 
@@ -361,125 +622,128 @@ with tabs[3]:
                 st.error("Provide Claim_ID")
             else:
                 try:
-                    exec_sql("DELETE FROM claims WHERE Claim_ID = ?", (int(dcid),))
+                    refs = claim_refs(int(dcid))
+                    allocate(allocation.delete_claim, int(dcid))
+                    refresh_matches(*refs)
                     st.success("Claim deleted.")
                 except Exception as e:
                     st.error(f"Error: {e}")
 
+    batch_editor("claims", "claims")
+
 # ---------------- QUERIES ----------------
 with tabs[4]:
     st.header("SQL Queries & Analysis")
 
-    predefined = {
-        "1 Providers & receivers per city": """
-            SELECT City,
-                   (SELECT COUNT(*) FROM providers p WHERE p.City = r.City) as providers_count,
-                   (SELECT COUNT(*) FROM receivers r2 WHERE r2.City = r.City) as receivers_count
-            FROM (
-                SELECT City FROM providers
-                UNION
-                SELECT City FROM receivers
-            ) r
-            GROUP BY City;
-        """,
-        "2 Top provider type by count": """
-            SELECT Type, COUNT(*) as cnt
-            FROM providers
-            GROUP BY Type
-            ORDER BY cnt DESC;
-        """,
-        "3 Provider contacts by city (parameterized)": "SELECT Name, Contact, Address, City FROM providers WHERE City = ?;",
-        "4 Receivers who claimed the most": """
-            SELECT r.Receiver_ID, r.Name, COUNT(c.Claim_ID) as claims_count
-            FROM receivers r
-            LEFT JOIN claims c ON r.Receiver_ID = c.Receiver_ID
-            GROUP BY r.Receiver_ID
-            ORDER BY claims_count DESC;
-        """,
-        "5 Total quantity available": "SELECT SUM(Quantity) as total_quantity FROM food_listings;",
-        "6 City with highest listings": """
-            SELECT Location as City, COUNT(*) as listings_count
-            FROM food_listings
-            GROUP BY Location
-            ORDER BY listings_count DESC;
-        """,
-        "7 Most common food types": """
-            SELECT Food_Type, COUNT(*) as cnt
-            FROM food_listings
-            GROUP BY Food_Type
-            ORDER BY cnt DESC;
-        """,
-        "8 Claims per food item": """
-            SELECT f.Food_ID, f.Food_Name, COUNT(c.Claim_ID) as claim_count
-            FROM food_listings f
-            LEFT JOIN claims c ON f.Food_ID = c.Food_ID
-            GROUP BY f.Food_ID
-            ORDER BY claim_count DESC;
-        """,
-        "9 Provider with most successful claims": """
-            SELECT p.Provider_ID, p.Name,
-                   SUM(CASE WHEN c.Status = 'Completed' THEN 1 ELSE 0 END) as completed_claims
-            FROM providers p
-            LEFT JOIN food_listings f ON p.Provider_ID = f.Provider_ID
-            LEFT JOIN claims c ON f.Food_ID = c.Food_ID
-            GROUP BY p.Provider_ID
-            ORDER BY completed_claims DESC;
-        """,
-        "10 Claims status percentage": """
-            SELECT Status, COUNT(*) * 1.0 / (SELECT COUNT(*) FROM claims) * 100 as pct
-            FROM claims
-            GROUP BY Status;
-        """,
-        "11 Avg quantity claimed per receiver": """
-            SELECT r.Receiver_ID, r.Name, 
-                   AVG(f.Quantity) as avg_quantity_claimed
-            FROM receivers r
-            JOIN claims c ON r.Receiver_ID = c.Receiver_ID
-            JOIN food_listings f ON c.Food_ID = f.Food_ID
-            GROUP BY r.Receiver_ID
-            ORDER BY avg_quantity_claimed DESC;
-        """,
-        "12 Most claimed meal type": """
-            SELECT f.Meal_Type, COUNT(c.Claim_ID) as claim_count
-            FROM food_listings f
-            JOIN claims c ON f.Food_ID = c.Food_ID
-            GROUP BY f.Meal_Type
-            ORDER BY claim_count DESC;
-        """,
-        "13 Total quantity donated per provider": """
-            SELECT p.Provider_ID, p.Name, SUM(f.Quantity) as total_donated
-            FROM providers p
-            LEFT JOIN food_listings f ON p.Provider_ID = f.Provider_ID
-            GROUP BY p.Provider_ID
-            ORDER BY total_donated DESC;
-        """,
-        "14 Monthly claims trend": """
-            SELECT substr(Timestamp, 1, 7) as month, COUNT(*) as claims_count
-            FROM claims
-            WHERE Timestamp IS NOT NULL
-            GROUP BY month
-            ORDER BY month;
-        """,
-        "15 Expired items still available": """
-            SELECT Food_ID, Food_Name, Quantity, Expiry_Date, Location
-            FROM food_listings
-            WHERE Expiry_Date IS NOT NULL AND DATE(Expiry_Date) < DATE('now') AND Quantity > 0;
-        """
-    }
-
-    q_choice = st.selectbox("Choose query to run", list(predefined.keys()))
-    sql = predefined[q_choice]
+    q_choice = st.selectbox("Choose query to run", list(PREDEFINED_QUERIES.keys()))
+    sql = PREDEFINED_QUERIES[q_choice]
+    # remember the last run so the export button below survives its own rerun
     if "parameterized" in q_choice:
         param = st.text_input("Enter city name (for query parameter)")
         if st.button("Run query"):
             if param.strip() == "":
                 st.error("Provide the city name parameter")
             else:
-                df_q = run_query(sql, params=(param,))
-                st.dataframe(df_q)
-                to_csv_download(df_q, name=f"query_{q_choice}.csv")
+                st.session_state.query_run = (q_choice, (param,))
     else:
         if st.button("Run query"):
-            df_q = run_query(sql)
-            st.dataframe(df_q)
-            to_csv_download(df_q, name=f"query_{q_choice}.csv")
+            st.session_state.query_run = (q_choice, ())
+
+    last_run = st.session_state.get("query_run")
+    if last_run and last_run[0] == q_choice:
+        snap = None if last_run[1] else snapshots.load(get_conn(), q_choice)
+        if snap is None:
+            df_q = run_query(sql, params=last_run[1])
+        else:
+            # served from the snapshot; a stale one is shown while it is rebuilt
+            df_q = snap["df"]
+            note = "" if snap["fresh"] else " (refreshing in the background)"
+            st.caption(f"Snapshot generation {snap['generation']}, built {snap['built_at']} UTC{note}")
+            if not snap["fresh"]:
+                get_refresher().request()
+        st.dataframe(df_q)
+        query_csv_download(sql, last_run[1], name=f"query_{q_choice}.csv")
+
+# ---------------- ADMIN ----------------
+with tabs[5]:
+    st.header("Data Refresh")
+    st.caption("Reruns pipeline.py on the CSVs into a staging file and swaps it in when it's done; the app keeps "
+               "serving the current data meanwhile. A full reload replaces everything, including changes made in "
+               "the app since the CSVs were written; incremental applies only rows that changed in the CSVs. "
+               "Requests made before a queued job starts are merged into it.")
+    r1, r2 = st.columns([1, 1])
+    ingest_mode = r1.selectbox("Mode", ["incremental", "full", "parallel"], key="ingest_mode")
+    if r2.button("Reload from CSVs"):
+        job = get_ingest().request(ingest_mode, requested_by=st.session_state.profile_session)
+        st.success(f"Queued as job {job['id']}" + (f" ({job['requests']} requests)" if job["requests"] > 1 else ""))
+    ingest_panel()
+
+    st.header("Claims Archive")
+    st.caption("Closes the months before the last N, counted back from the newest claim: their claims, except "
+               "pending ones, move to the read-only archive and its monthly rollup. The pipeline does this on "
+               "every run with its --hot-months.")
+    h1, h2 = st.columns([1, 1])
+    hot_months = h1.number_input("Months kept open", min_value=1, value=archive.HOT_MONTHS, key="hot_months")
+    if h2.button("Archive closed months"):
+        db = get_db()
+        try:
+            with db.write_lock, get_profiler().timed("archive.compact", "write"):
+                moved, dropped = archive.compact(db.write_conn, int(hot_months))
+        finally:
+            db.invalidate("claims")
+            get_refresher().request()
+        if moved:
+            st.success(f"Archived {sum(moved.values())} claims from {len(moved)} months "
+                       f"({min(moved)} to {max(moved)})")
+        else:
+            st.info(f"Nothing to archive before {archive.cutoff(get_conn(), int(hot_months))}")
+        if dropped:
+            st.warning(f"{dropped} reloaded claims were dropped: their Claim_IDs are archived already, "
+                       "and the archive is read-only")
+    hot, cold, months = archive.status(get_conn())
+    if months:
+        st.dataframe(pd.DataFrame(months, columns=["Month", "Claims"]))
+
+    st.header("Change Log")
+    log = changelog.status(get_conn())
+    kept = f"Seq {log['first']}–{log['head']}" if log["rows"] else f"up to Seq {log['head']}, all applied and pruned"
+    st.caption(f"Every write to the fact tables, in order ({log['rows']} kept, {kept}). The derived tables below "
+               "apply it in the background snapshot refresh; the match index applies it when it's next used.")
+    st.dataframe(pd.DataFrame(log["consumers"], columns=["Consumer", "Seq", "Behind", "Updated_At"]))
+
+    st.header("Query Profile")
+    profiler = get_profiler()
+    a1, a2, a3 = st.columns([1, 1, 2])
+    profiler.slow_ms = a1.number_input("Slow statement threshold (ms)", min_value=1, value=int(profiler.slow_ms))
+    if a2.button("Reset profile"):
+        profiler.reset()
+    report = profiler.report()
+    a3.caption(f"Recording since {report['since']} UTC; {len(report['runs'])} reruns kept")
+
+    st.markdown("### Statements")
+    df_stmt = pd.DataFrame(report["statements"], columns=["sql", "kind", "calls", "cache_hits", "total_ms", "avg_ms",
+                                                          "max_ms", "rows", "slow"])
+    st.dataframe(df_stmt)
+
+    # this session's last finished rerun (the current one is still running)
+    mine = [r for r in report["runs"] if r["session"] == st.session_state.profile_session]
+    done = [r for r in mine if r["wall_ms"] is not None]
+    if done or mine:
+        run = (done or mine)[-1]
+        st.markdown("### Last rerun of this session")
+        timed_ms = sum(s["ms"] for s in run["statements"])
+        st.caption(f"Rerun {run['run']} at {run['started']} UTC: {len(run['statements'])} statements, "
+                   f"{timed_ms:.1f} ms in SQL" + (f", {run['wall_ms']:.0f} ms wall" if run["wall_ms"] else ""))
+        st.dataframe(pd.DataFrame(run["statements"], columns=["sql", "kind", "calls", "ms", "rows"])
+                     .sort_values("ms", ascending=False))
+
+    slow = [s for s in report["statements"] if s["plan"]]
+    st.markdown(f"### Slow statements ({len(slow)})")
+    for s in slow:
+        st.write(f"max {s['max_ms']:.1f} ms, {s['slow']} of {s['calls']} calls over {report['slow_ms']} ms")
+        st.code(s["sql"] + "\n\n" + "\n".join(s["plan"]), language="sql")
+
+    st.download_button("Download profile JSON", data=profiler.to_json(), file_name="query_profile.json",
+                       mime="application/json", on_click="ignore")
+
+get_profiler().end_run()
@@ -0,0 +1,144 @@
+# archive.py
+# Month partitions for claims. `claims` is the hot partition: the open months
+# plus every claim still Pending, wherever it falls. compact() closes the months
+# older than HOT_MONTHS: their other claims move to `claims_archive`, which
+# triggers keep read-only, and are counted into `claims_rollup` (one row per
+# month, listing, receiver and status). Months are counted back from the newest
+# claim's month (never later than the current one), so loading an old export
+# archives nothing until newer claims arrive. The app's day-to-day reads (claims grid,
+# allocation, expiry and matching checks) only see the hot partition and the
+# archive's indexes, so adding history doesn't slow them down; the aggregate
+# queries read claims_counts, the hot rows plus the rollup.
+from datetime import date
+
+HOT_MONTHS = 3  # the newest claim's month and the ones before it that stay in claims
+
+ARCHIVE_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS claims_archive (
+        Claim_ID INTEGER PRIMARY KEY,
+        Food_ID INTEGER,
+        Receiver_ID INTEGER,
+        Status TEXT,
+        Timestamp DATETIME,
+        Claimed_Quantity INTEGER
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_claims_archive_food ON claims_archive(Food_ID, Status)",
+    "CREATE INDEX IF NOT EXISTS idx_claims_archive_timestamp ON claims_archive(Timestamp)",
+    """CREATE TABLE IF NOT EXISTS claims_rollup (
+        Month TEXT NOT NULL,
+        Food_ID INTEGER,
+        Receiver_ID INTEGER,
+        Status TEXT,
+        Cnt INTEGER NOT NULL,
+        UNIQUE (Month, Food_ID, Receiver_ID, Status)
+    )""",
+    # covering: the per-receiver / per-listing queries add these to the hot counts
+    "CREATE INDEX IF NOT EXISTS idx_claims_rollup_receiver ON claims_rollup(Receiver_ID, Cnt)",
+    "CREATE INDEX IF NOT EXISTS idx_claims_rollup_food ON claims_rollup(Food_ID, Status, Cnt)",
+    """CREATE TABLE IF NOT EXISTS archived_months (
+        Month TEXT PRIMARY KEY,
+        Claims INTEGER NOT NULL,
+        Archived_At TEXT NOT NULL
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS trg_claims_archive_no_update BEFORE UPDATE ON claims_archive
+    BEGIN
+        SELECT RAISE(ABORT, 'claims_archive is read-only: its months are closed');
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_claims_archive_no_delete BEFORE DELETE ON claims_archive
+    BEGIN
+        SELECT RAISE(ABORT, 'claims_archive is read-only: its months are closed');
+    END""",
+    # every claim, for exports and audits
+    """CREATE VIEW IF NOT EXISTS claims_history AS
+        SELECT Claim_ID, Food_ID, Receiver_ID, Status, Timestamp, Claimed_Quantity FROM claims
+        UNION ALL
+        SELECT Claim_ID, Food_ID, Receiver_ID, Status, Timestamp, Claimed_Quantity FROM claims_archive""",
+    # claim counts at the rollup's grain, for the aggregate queries
+    """CREATE VIEW IF NOT EXISTS claims_counts AS
+        SELECT substr(Timestamp, 1, 7) AS Month, Food_ID, Receiver_ID, Status, 1 AS Cnt FROM claims
+        UNION ALL
+        SELECT Month, Food_ID, Receiver_ID, Status, Cnt FROM claims_rollup""",
+]
+
+# claims that belong to a closed month; param: first hot month as 'YYYY-MM'
+CLOSED = "Timestamp IS NOT NULL AND substr(Timestamp, 1, 7) < ? AND Status IS NOT 'Pending'"
+
+
+def install(conn):
+    with conn:
+        for ddl in ARCHIVE_SCHEMA:
+            conn.execute(ddl)
+
+def first_hot_month(hot_months=HOT_MONTHS, today=None):
+    today = today or date.today()
+    months = today.year * 12 + today.month - 1 - (hot_months - 1)
+    return f"{months // 12:04d}-{months % 12 + 1:02d}"
+
+def newest_month(conn, today=None):
+    # first day of the newest claim's month, or of today's when that is
+    # earlier (a mistyped future timestamp must not close every month)
+    today = today or date.today()
+    month = conn.execute("SELECT substr(MAX(Timestamp), 1, 7) FROM claims").fetchone()[0]
+    try:
+        newest = date.fromisoformat(f"{month}-01")
+    except (TypeError, ValueError):
+        return today
+    return min(newest, today)
+
+def cutoff(conn, hot_months=HOT_MONTHS, today=None):
+    # the first month that stays hot, as 'YYYY-MM'
+    return first_hot_month(hot_months, newest_month(conn, today))
+
+def compact(conn, hot_months=HOT_MONTHS, today=None):
+    # moves the closed months' claims out of the hot partition in one
+    # transaction (the caller's, if one is open). -> ({month: claims moved},
+    # reloaded claims dropped because they are archived already)
+    own = not conn.in_transaction
+    if own:
+        conn.execute("BEGIN IMMEDIATE")
+    try:
+        hot_from = cutoff(conn, hot_months, today)
+        # a reload can bring back claims that were archived; the archived copy
+        # stands, and the caller reports how many reloaded rows that discarded
+        dropped = conn.execute("DELETE FROM claims WHERE Claim_ID IN (SELECT Claim_ID FROM claims_archive)").rowcount
+        moved = dict(conn.execute(
+            f"SELECT substr(Timestamp, 1, 7), COUNT(*) FROM claims WHERE {CLOSED} GROUP BY 1", (hot_from,)).fetchall())
+        if moved:
+            conn.execute(f"""
+                INSERT INTO claims_archive (Claim_ID, Food_ID, Receiver_ID, Status, Timestamp, Claimed_Quantity)
+                SELECT Claim_ID, Food_ID, Receiver_ID, Status, Timestamp, Claimed_Quantity FROM claims WHERE {CLOSED}
+            """, (hot_from,))
+            conn.execute(f"""
+                INSERT INTO claims_rollup (Month, Food_ID, Receiver_ID, Status, Cnt)
+                SELECT substr(Timestamp, 1, 7), Food_ID, Receiver_ID, Status, COUNT(*) FROM claims WHERE {CLOSED}
+                GROUP BY 1, 2, 3, 4
+                ON CONFLICT (Month, Food_ID, Receiver_ID, Status) DO UPDATE SET Cnt = Cnt + excluded.Cnt
+            """, (hot_from,))
+            conn.execute(f"DELETE FROM claims WHERE {CLOSED}", (hot_from,))
+            conn.executemany("""
+                INSERT INTO archived_months (Month, Claims, Archived_At) VALUES (?, ?, datetime('now'))
+                ON CONFLICT (Month) DO UPDATE SET Claims = Claims + excluded.Claims, Archived_At = excluded.Archived_At
+            """, moved.items())
+        if own:
+            conn.commit()
+    except BaseException:
+        if own:
+            conn.rollback()
+        raise
+    return moved, dropped
+
+def status(conn):
+    # -> (hot claims, archived claims, archived months as a list of (month, claims))
+    hot = conn.execute("SELECT COUNT(*) FROM claims").fetchone()[0]
+    months = conn.execute("SELECT Month, Claims FROM archived_months ORDER BY Month").fetchall()
+    return hot, sum(n for _, n in months), months
+
+def archived(conn, claim_id):
+    return conn.execute("SELECT 1 FROM claims_archive WHERE Claim_ID = ?", (claim_id,)).fetchone() is not None
+
+def next_claim_id(conn):
+    # rowid allocation only sees claims, and the highest Claim_ID may have been archived
+    return conn.execute("""
+        SELECT MAX(IFNULL((SELECT MAX(Claim_ID) FROM claims), 0),
+                   IFNULL((SELECT MAX(Claim_ID) FROM claims_archive), 0)) + 1
+    """).fetchone()[0]
@@ -0,0 +1,212 @@
+# batch_ops.py
+# Multi-row create / update / delete for the app's batch mode. Rows from an
+# uploaded CSV or the edit grid go through the pipeline's cleaning rules
+# (cleaning.py); rows that fail validation are reported and the rest are written
+# in one BEGIN IMMEDIATE transaction with executemany. If the batch statement
+# fails, its rows are replayed one by one under savepoints, so a bad row is
+# reported instead of aborting the good ones. Claims go row by row through
+# allocation.py, because every claim has to reserve its own stock.
+import sqlite3
+
+import pandas as pd
+
+import allocation
+from cleaning import clean_table
+
+ACTIONS = ("upsert", "delete")
+KEYS = {"providers": "Provider_ID", "receivers": "Receiver_ID", "food_listings": "Food_ID", "claims": "Claim_ID"}
+COLUMNS = {
+    "providers": ["Name", "Type", "Address", "City", "Contact"],
+    "receivers": ["Name", "Type", "City", "Contact"],
+    "food_listings": ["Food_Name", "Quantity", "Expiry_Date", "Provider_ID", "Provider_Type", "Location",
+                      "Food_Type", "Meal_Type"],
+    "claims": ["Food_ID", "Receiver_ID", "Status", "Timestamp", "Claimed_Quantity"],
+}
+REQUIRED = {"providers": ["Name"], "receivers": ["Name"], "food_listings": ["Food_Name"],
+            "claims": ["Food_ID", "Receiver_ID"]}
+NUMERIC = {"providers": [], "receivers": [], "food_listings": ["Quantity", "Provider_ID"],
+           "claims": ["Food_ID", "Receiver_ID", "Claimed_Quantity"]}
+DATES = {"providers": [], "receivers": [], "food_listings": ["Expiry_Date"], "claims": ["Timestamp"]}
+STATUSES = ("Pending", "Completed", "Cancelled")
+# tables a batch writes, for cache invalidation (claims move listing stock)
+WRITES = {"providers": ("providers",), "receivers": ("receivers",), "food_listings": ("food_listings",),
+          "claims": ("claims", "food_listings")}
+IN_CHUNK = 500  # ids per IN (...) lookup, under SQLite's variable limit
+
+
+def template(table, action="upsert"):
+    # column headers a batch for this table/action takes
+    return [KEYS[table]] if action == "delete" else [KEYS[table]] + COLUMNS[table]
+
+def read_csv(file):
+    # everything as text: validate() does the typing, like the pipeline does
+    return pd.read_csv(file, dtype=str, keep_default_na=False)
+
+def _blank(col):
+    return col.isna() | col.astype(str).str.strip().eq("")
+
+def _values(col):
+    return [None if pd.isna(v) else v for v in col.astype(object).tolist()]
+
+def _whole_numbers(df, columns, errors):
+    # the cleaners cast to Int64, which rejects 1.5; report those rows here and
+    # blank them so cleaning can't fail
+    for c in columns:
+        blank = _blank(df[c])
+        num = pd.to_numeric(df[c].where(~blank), errors="coerce")
+        bad = ~blank & (num.isna() | (num % 1 != 0))
+        for n in df.index[bad]:
+            errors.setdefault(n, []).append(f"{c} must be a whole number")
+        df[c] = pd.Series([None if b or x else int(v) for v, b, x in zip(num, blank, bad)],
+                          index=df.index, dtype=object)
+
+# ---------- validation ----------
+def validate(table, df, action="upsert"):
+    # -> (rows, errors). rows are (row number, params) for apply(); errors are
+    # (row number, message). Row numbers count data rows from 1, as in the CSV.
+    # Raises ValueError when the header itself is unusable.
+    if action not in ACTIONS:
+        raise ValueError(f"unknown action {action!r}")
+    key = KEYS[table]
+    df = df.copy()
+    df.columns = [str(c).strip() for c in df.columns]
+    df.index = range(1, len(df) + 1)
+    df = df.astype(object)
+    blank = df.apply(_blank)
+    df = df[~blank.all(axis=1)].copy()  # empty grid rows / trailing CSV lines
+    errors = {}
+
+    if action == "delete":
+        if key not in df.columns:
+            raise ValueError(f"missing column: {key}")
+        for n in df.index[_blank(df[key])]:
+            errors.setdefault(n, []).append(f"{key} is required")
+        _whole_numbers(df, [key], errors)
+        ok = df[~df.index.isin(list(errors))]
+        rows = [(n, (v,)) for n, v in zip(ok.index, ok[key])]
+        return rows, sorted((n, "; ".join(m)) for n, m in errors.items())
+
+    missing = [c for c in REQUIRED[table] if c not in df.columns]
+    if missing:
+        raise ValueError(f"missing column(s): {', '.join(missing)}")
+    for c in [key] + COLUMNS[table]:
+        if c not in df.columns:
+            df[c] = None
+    df = df[[key] + COLUMNS[table]].copy()
+    blank = df.apply(_blank)
+
+    # claims that already have a Claim_ID only change status
+    new = blank[key] if table == "claims" else pd.Series(True, index=df.index)
+    for c in REQUIRED[table]:
+        for n in df.index[blank[c] & new]:
+            errors.setdefault(n, []).append(f"{c} is required")
+    _whole_numbers(df, [key] + NUMERIC[table], errors)
+    # blank text would come out of the cleaners' astype(str) as "nan"
+    text = [c for c in COLUMNS[table] if c not in NUMERIC[table] + DATES[table] + ["Contact"]]
+    for c in text:
+        df.loc[blank[c], c] = ""
+    if table == "claims":
+        # a blank status is Pending for a new claim and "unchanged" for an existing one
+        df.loc[blank["Status"] & new, "Status"] = "Pending"
+
+    df = clean_table(table, df)
+
+    for c in DATES[table]:
+        for n in df.index[~blank[c] & df[c].isna()]:
+            errors.setdefault(n, []).append(f"{c} is not a date")
+    if table == "food_listings":
+        for n in df.index[df["Quantity"] < 0]:
+            errors.setdefault(n, []).append("Quantity can't be negative")
+    if table == "claims":
+        canonical = {s.lower(): s for s in STATUSES}
+        df["Status"] = df["Status"].str.lower().map(canonical)
+        for n in df.index[df["Status"].isna() & ~(blank["Status"] & ~new)]:
+            errors.setdefault(n, []).append(f"Status must be one of {', '.join(STATUSES)}")
+        qty = pd.to_numeric(df["Claimed_Quantity"], errors="coerce").fillna(1)
+        for n in df.index[qty < 1]:
+            errors.setdefault(n, []).append("Claimed_Quantity must be at least 1")
+        df["Claimed_Quantity"] = qty.astype(int)
+
+    ok = df[~df.index.isin(list(errors))]
+    params = list(zip(*[_values(ok[c]) for c in [key] + COLUMNS[table]]))
+    rows = list(zip(ok.index, params))
+    return rows, sorted((n, "; ".join(m)) for n, m in errors.items())
+
+# ---------- writing ----------
+def _sql(table, action):
+    key, columns = KEYS[table], COLUMNS[table]
+    if action == "delete":
+        return f"DELETE FROM {table} WHERE {key} = ?"
+    # a blank key lets INTEGER PRIMARY KEY pick one; a known key updates that row
+    updates = ", ".join(f"{c} = excluded.{c}" for c in columns)
+    return (f"INSERT INTO {table} ({', '.join([key] + columns)}) VALUES ({', '.join('?' * (len(columns) + 1))}) "
+            f"ON CONFLICT({key}) DO UPDATE SET {updates}")
+
+def _existing(conn, table, rows):
+    # splits delete rows into ids that exist and "no such id" errors
+    key = KEYS[table]
+    ids = [p[0] for _, p in rows]
+    found = set()
+    for i in range(0, len(ids), IN_CHUNK):
+        chunk = ids[i:i + IN_CHUNK]
+        found.update(r[0] for r in conn.execute(
+            f"SELECT {key} FROM {table} WHERE {key} IN ({', '.join('?' * len(chunk))})", chunk))
+    keep = [(n, p) for n, p in rows if p[0] in found]
+    missing = [(n, p[0]) for n, p in rows if p[0] not in found]
+    if table == "claims":
+        return keep, [(n, str(allocation._missing(conn, i))) for n, i in missing]
+    return keep, [(n, f"{key} {i} does not exist") for n, i in missing]
+
+def _per_row(conn, write, rows):
+    applied, errors = [], []
+    for n, params in rows:
+        conn.execute("SAVEPOINT batch_row")
+        try:
+            write(params)
+            conn.execute("RELEASE batch_row")
+            applied.append(n)
+        except (sqlite3.Error, ValueError) as e:
+            conn.execute("ROLLBACK TO batch_row")
+            conn.execute("RELEASE batch_row")
+            errors.append((n, str(e)))
+    return applied, errors
+
+def _many(conn, sql, rows):
+    conn.execute("SAVEPOINT batch")
+    try:
+        conn.executemany(sql, [p for _, p in rows])
+        conn.execute("RELEASE batch")
+        return [n for n, _ in rows], []
+    except sqlite3.Error:
+        conn.execute("ROLLBACK TO batch")
+        conn.execute("RELEASE batch")
+    return _per_row(conn, lambda params: conn.execute(sql, params), rows)
+
+def _claim_write(conn, action):
+    if action == "delete":
+        return lambda p: allocation._delete_claim(conn, p[0])
+
+    def write(p):
+        claim_id, food_id, receiver_id, status, timestamp, quantity = p
+        if claim_id is None:
+            allocation._claim(conn, food_id, receiver_id, quantity, status, timestamp)
+        elif status is None:
+            # a blank status leaves an existing claim as it is
+            if conn.execute("SELECT 1 FROM claims WHERE Claim_ID = ?", (claim_id,)).fetchone() is None:
+                raise allocation._missing(conn, claim_id)
+        else:
+            allocation._set_status(conn, claim_id, status)  # existing claims only change status
+    return write
+
+def apply(conn, table, action, rows, retries=allocation.RETRIES):
+    # -> ((applied row numbers, [(row number, message)]), lock retries used);
+    # the whole batch is one transaction
+    def work():
+        todo, errors = _existing(conn, table, rows) if action == "delete" else (rows, [])
+        if table == "claims":
+            applied, failed = _per_row(conn, _claim_write(conn, action), todo)
+        else:
+            applied, failed = _many(conn, _sql(table, action), todo)
+        return applied, sorted(errors + failed)
+
+    return allocation.immediate(conn, work, retries)
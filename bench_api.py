@@ -0,0 +1,138 @@
+# bench_api.py
+# Load test for api.py. Serves the database in-process (or hits a running
+# server with --url) and has --clients threads, each on one keep-alive
+# connection, request a fixed mix of URLs for --seconds: listings pages with
+# the Listings tab's filters, provider / receiver lookups and searches, and
+# the predefined analytics. Reports requests/sec, latency percentiles, and
+# how many answers came from the response cache or as 304s.
+# Passes: cache off, cache on, and clients revalidating with If-None-Match.
+import argparse
+import http.client
+import random
+import sqlite3
+import statistics
+import threading
+import time
+from urllib.parse import quote, urlsplit
+
+import api
+from pipeline import DB_PATH
+
+
+def url_mix(conn, size, seed=0):
+    # the same list of URLs every pass; drawn from values present in the data
+    rng = random.Random(seed)
+    def sample(sql, n):
+        values = [r[0] for r in conn.execute(sql) if r[0] is not None]
+        return rng.sample(values, min(n, len(values)))
+    cities = sample("SELECT DISTINCT Location FROM food_listings LIMIT 1000", 20)
+    types = sample("SELECT DISTINCT Food_Type FROM food_listings", 5)
+    providers = sample("SELECT Provider_ID FROM providers LIMIT 10000", 20)
+    receivers = sample("SELECT Receiver_ID FROM receivers LIMIT 10000", 20)
+    names = sample("SELECT Name FROM providers LIMIT 10000", 10)
+    urls = (["/listings", "/listings?sort=Expiry_Date", "/queries"]
+            + [f"/listings?city={quote(c)}" for c in cities]
+            + [f"/listings?food_type={quote(t)}&sort=Quantity&desc=1" for t in types]
+            + [f"/listings?city={quote(c)}&food_type={quote(t)}" for c, t in zip(cities, types)]
+            + [f"/providers/{p}" for p in providers] + [f"/receivers/{r}" for r in receivers]
+            + [f"/providers?q={quote(n.split()[0])}" for n in names]
+            + [f"/receivers?city={quote(c)}" for c in cities[:5]]
+            + [f"/queries/3?city={quote(c)}" for c in cities[:5]]
+            + [f"/queries/{n}" for n in api.QUERY_IDS if n != "3"])
+    return [rng.choice(urls) for _ in range(size)] if size else urls
+
+def client(host, port, urls, stop, conditional, results):
+    conn = http.client.HTTPConnection(host, port, timeout=600)
+    etags = {}
+    latencies, statuses, hits = [], {}, 0
+    i = 0
+    while not stop.is_set():
+        url = urls[i % len(urls)]
+        i += 1
+        headers = {"If-None-Match": etags[url]} if conditional and url in etags else {}
+        start = time.perf_counter()
+        conn.request("GET", url, headers=headers)
+        response = conn.getresponse()
+        response.read()
+        latencies.append(time.perf_counter() - start)
+        statuses[response.status] = statuses.get(response.status, 0) + 1
+        hits += response.getheader("X-Cache") == "hit"
+        if response.getheader("ETag"):
+            etags[url] = response.getheader("ETag")
+    conn.close()
+    results.append((latencies, statuses, hits))
+
+def run(host, port, urls, clients, seconds, conditional=False):
+    stop, results = threading.Event(), []
+    rng = random.Random(1)
+    threads = [threading.Thread(target=client, args=(host, port, rng.sample(urls, len(urls)), stop, conditional,
+                                                     results)) for _ in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    latencies = sorted(x for r in results for x in r[0])
+    statuses = {}
+    for r in results:
+        for status, n in r[1].items():
+            statuses[status] = statuses.get(status, 0) + n
+    return {"requests": len(latencies), "rps": len(latencies) / elapsed,
+            "p50": statistics.median(latencies) * 1000 if latencies else 0,
+            "p95": latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0,
+            "p99": latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0,
+            "hits": sum(r[2] for r in results), "statuses": statuses}
+
+def warm(host, port, urls):
+    # one request per distinct URL, so the cached passes measure steady state
+    conn = http.client.HTTPConnection(host, port, timeout=600)
+    for url in dict.fromkeys(urls):
+        conn.request("GET", url)
+        conn.getresponse().read()
+    conn.close()
+
+def report(name, r):
+    statuses = " ".join(f"{s}:{n}" for s, n in sorted(r["statuses"].items()))
+    print(f"{name:<14} {r['requests']:>9,} {r['rps']:>9.1f} {r['p50']:>8.1f} {r['p95']:>8.1f} {r['p99']:>8.1f} "
+          f"{r['hits'] / max(r['requests'], 1):>6.0%}  {statuses}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test the read-only JSON API.")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--url", default=None, help="a running api.py (default: serve --db in-process)")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--pool", type=int, default=api.POOL_SIZE)
+    parser.add_argument("--requests", type=int, default=0, help="length of the random URL sequence (0 = each URL once)")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    urls = url_mix(conn, args.requests)
+    conn.close()
+    print(f"{len(set(urls))} distinct URLs, {args.clients} clients, {args.seconds:.0f}s per pass")
+    print(f"{'pass':<14} {'requests':>9} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'cached':>6}  status")
+
+    if args.url:
+        target = urlsplit(args.url)
+        host, port = target.hostname, target.port or 80
+        warm(host, port, urls)
+        report("plain", run(host, port, urls, args.clients, args.seconds))
+        report("conditional", run(host, port, urls, args.clients, args.seconds, conditional=True))
+    else:
+        for name, cache, conditional in [("no cache", 0, False), ("cache", api.CACHE_ENTRIES, False),
+                                         ("conditional", api.CACHE_ENTRIES, True)]:
+            server_api = api.Api(args.db, args.pool, cache)
+            server = api.make_server(server_api, port=0)
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            host, port = server.server_address[:2]
+            if cache:
+                warm(host, port, urls)
+            report(name, run(host, port, urls, args.clients, args.seconds, conditional))
+            server.shutdown()
+            server.server_close()
+            server_api.close()
@@ -0,0 +1,68 @@
+# bench_bulk_load.py
+# Compares the DataFrame.to_sql write path with the bulk loader on the
+# cleaned CSVs, replicated --scale times (IDs shifted so keys stay unique).
+import argparse
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from bulk_load import LOAD_PRAGMAS, bulk_insert, create_indexes, load_pragmas
+from cleaning import clean_table
+from pipeline import CSV_FILES, INDEXES, PRIMARY_KEYS, fresh_db
+
+ID_COLUMNS = ["Provider_ID", "Receiver_ID", "Food_ID", "Claim_ID"]
+
+
+def scaled_frames(scale):
+    frames = {}
+    for table, path in CSV_FILES.items():
+        df = clean_table(table, pd.read_csv(path))
+        step = int(df[PRIMARY_KEYS[table]].max())
+        copies = []
+        for i in range(scale):
+            part = df.copy()
+            for col in ID_COLUMNS:
+                if col in part.columns:
+                    part[col] = part[col] + i * step
+            copies.append(part)
+        frames[table] = pd.concat(copies, ignore_index=True)
+    return frames
+
+def time_load(frames, loader, db_path):
+    conn = fresh_db(db_path)
+    start = time.perf_counter()
+    with load_pragmas(conn, LOAD_PRAGMAS if loader == "bulk" else {}):
+        for table, df in frames.items():
+            if loader == "bulk":
+                bulk_insert(conn, table, df)
+            else:
+                df.to_sql(table, conn, if_exists='append', index=False)
+    create_indexes(conn, INDEXES)
+    elapsed = time.perf_counter() - start
+    conn.close()
+    return elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark to_sql against the bulk loader.")
+    parser.add_argument("--scale", type=int, nargs="+", default=[1, 10, 100],
+                        help="how many copies of the CSVs to load")
+    parser.add_argument("--dir", default=None,
+                        help="where to write the scratch databases (default: a temp dir); "
+                             "point it at the ingest disk so fsync costs are measured")
+    args = parser.parse_args()
+
+    print(f"{'scale':>6} {'rows':>10} {'to_sql s':>10} {'bulk s':>10} {'speedup':>8}")
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        for scale in args.scale:
+            frames = scaled_frames(scale)
+            rows = sum(len(df) for df in frames.values())
+            timings = {}
+            for loader in ("to_sql", "bulk"):
+                db_path = os.path.join(tmp, f"{loader}_{scale}.db")
+                timings[loader] = time_load(frames, loader, db_path)
+                os.remove(db_path)
+            speedup = timings["to_sql"] / timings["bulk"] if timings["bulk"] else 0
+            print(f"{scale:>6} {rows:>10} {timings['to_sql']:>10.2f} {timings['bulk']:>10.2f} {speedup:>7.1f}x")
@@ -0,0 +1,113 @@
+# bench_claims.py
+# Multi-threaded claim load test. Worker threads, each with its own connection,
+# claim random units from a small set of listings for --seconds. Afterwards every
+# listing must satisfy: stock left + units reserved by claims == starting stock,
+# and stock left >= 0. --naive runs the old read-then-write path for comparison.
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+import allocation
+from pipeline import DB_PATH
+
+
+def naive_claim(conn, food_id, receiver_id, quantity):
+    # what exec_sql did before: check, then write, in a deferred transaction
+    left = conn.execute("SELECT Quantity FROM food_listings WHERE Food_ID = ?", (food_id,)).fetchone()[0]
+    if left < quantity:
+        raise allocation.InsufficientQuantity(f"{left} left")
+    time.sleep(0)  # yield between the read and the write, as a busy server would
+    conn.execute("UPDATE food_listings SET Quantity = ? WHERE Food_ID = ?", (left - quantity, food_id))
+    conn.execute("INSERT INTO claims (Food_ID, Receiver_ID, Status, Claimed_Quantity) VALUES (?, ?, 'Pending', ?)",
+                 (food_id, receiver_id, quantity))
+    conn.commit()
+    return None, 0
+
+def worker(db_path, food_ids, seconds, naive, stats, lock, seed):
+    rng = random.Random(seed)
+    conn = sqlite3.connect(db_path, timeout=allocation.BUSY_TIMEOUT_MS / 1000) if naive else allocation.connect(db_path)
+    mine = {"ok": 0, "short": 0, "retries": 0, "errors": 0}
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        food_id, quantity = rng.choice(food_ids), rng.randint(1, 3)
+        try:
+            if naive:
+                _, retries = naive_claim(conn, food_id, rng.randint(1, 1000), quantity)
+            else:
+                _, retries = allocation.claim(conn, food_id, rng.randint(1, 1000), quantity)
+            mine["ok"] += 1
+            mine["retries"] += retries
+        except allocation.InsufficientQuantity:
+            mine["short"] += 1
+        except sqlite3.OperationalError:
+            conn.rollback()
+            mine["errors"] += 1
+    conn.close()
+    with lock:
+        for k, v in mine.items():
+            stats[k] += v
+
+def check(db_path, food_ids, start_stock):
+    conn = sqlite3.connect(db_path)
+    bad = []
+    for food_id in food_ids:
+        left = conn.execute("SELECT Quantity FROM food_listings WHERE Food_ID = ?", (food_id,)).fetchone()[0]
+        reserved = conn.execute("SELECT IFNULL(SUM(Claimed_Quantity), 0) FROM claims WHERE Food_ID = ? "
+                                "AND Status IN ('Pending', 'Completed')", (food_id,)).fetchone()[0]
+        if left < 0 or left + reserved != start_stock:
+            bad.append((food_id, left, reserved))
+    conn.close()
+    return bad
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent claim load test against a copy of the database.")
+    parser.add_argument("--db", default=DB_PATH, help="database to copy (it is never modified)")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--listings", type=int, default=20, help="how many listings the threads fight over")
+    parser.add_argument("--stock", type=int, default=100_000, help="starting Quantity of each contested listing")
+    parser.add_argument("--naive", action="store_true", help="use unlocked read-then-write claims instead")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "claims_bench.db")
+        src = sqlite3.connect(args.db)
+        conn = sqlite3.connect(db_path)
+        src.backup(conn)  # consistent copy even while the app has the WAL open
+        src.close()
+        conn.close()
+        conn = allocation.connect(db_path)
+        allocation.install(conn)
+        food_ids = [r[0] for r in conn.execute("SELECT Food_ID FROM food_listings ORDER BY Food_ID LIMIT ?",
+                                               (args.listings,))]
+        with conn:
+            conn.executemany("UPDATE food_listings SET Quantity = ? WHERE Food_ID = ?",
+                             [(args.stock, f) for f in food_ids])
+            conn.execute("UPDATE claims SET Claimed_Quantity = NULL")
+        conn.close()
+
+        stats = {"ok": 0, "short": 0, "retries": 0, "errors": 0}
+        lock = threading.Lock()
+        threads = [threading.Thread(target=worker, args=(db_path, food_ids, args.seconds, args.naive, stats, lock, i))
+                   for i in range(args.threads)]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+
+        bad = check(db_path, food_ids, args.stock)
+        mode = "naive" if args.naive else "BEGIN IMMEDIATE"
+        print(f"{mode}: {args.threads} threads, {elapsed:.1f}s")
+        print(f"  claims ok {stats['ok']} ({stats['ok'] / elapsed:,.0f}/s), out of stock {stats['short']}, "
+              f"lock retries {stats['retries']}, lock errors {stats['errors']}")
+        if bad:
+            print(f"  OVER-ALLOCATED or lost units on {len(bad)} listings, e.g. (Food_ID, left, reserved) {bad[:3]}")
+        else:
+            print(f"  all {len(food_ids)} listings consistent: left + reserved == {args.stock}, none negative")
@@ -0,0 +1,72 @@
+# bench_columnar.py
+# Times the grouped analytics on the Arrow store (columnar.py) against the same
+# questions asked of SQLite, and full-table loads into pandas both ways.
+# Every store result is checked against the SQLite one.
+import argparse
+import sqlite3
+import statistics
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import columnar
+from pipeline import DB_PATH
+
+
+def timed(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return result, statistics.median(times) * 1000
+
+def same(a, b):
+    # same rows regardless of order; numbers compared with a tolerance (a group
+    # whose values are all NULL sums to NULL on both sides)
+    if list(a.columns) != list(b.columns) or len(a) != len(b):
+        return False
+    key = a.columns[0]
+    a = a.astype({key: object}).sort_values(key, na_position="first", ignore_index=True)
+    b = b.astype({key: object}).sort_values(key, na_position="first", ignore_index=True)
+    if not a[key].equals(b[key]):
+        return False
+    return all(np.allclose(a[c].astype(float), b[c].astype(float), equal_nan=True) for c in a.columns[1:])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the Arrow analytics store against SQLite.")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--store", default=None, help="existing columnar directory (default: export to a temp dir)")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.store or tmp
+        if args.store is None:
+            start = time.perf_counter()
+            manifest = columnar.export(conn, path)
+            rows = sum(t["rows"] for t in manifest["tables"].values())
+            size = sum(t["bytes"] for t in manifest["tables"].values())
+            print(f"exported {rows:,} rows ({size / 1e6:.1f} MB) in {time.perf_counter() - start:.2f}s")
+        store = columnar.Store(path)
+
+        print(f"{'query':<28} {'sqlite ms':>10} {'arrow ms':>10} {'speedup':>8}  check")
+        for name, (call, sql) in columnar.ANALYTICS.items():
+            expected, sql_ms = timed(lambda: pd.read_sql_query(sql, conn), args.repeat)
+            got, arrow_ms = timed(lambda: call(store), args.repeat)
+            ok = "ok" if same(got, expected) else "MISMATCH"
+            print(f"{name:<28} {sql_ms:>10.2f} {arrow_ms:>10.2f} {sql_ms / arrow_ms:>7.1f}x  {ok}")
+
+        print(f"\n{'full table to pandas':<28} {'sqlite ms':>10} {'arrow ms':>10} {'sqlite MB':>10} {'arrow MB':>10}")
+        for table in columnar.SCHEMAS:
+            df_sql, sql_ms = timed(lambda: pd.read_sql_query(f"SELECT * FROM {table}", conn), args.repeat)
+            df_arrow, arrow_ms = timed(lambda: store.to_pandas(table), args.repeat)
+            print(f"{table:<28} {sql_ms:>10.1f} {arrow_ms:>10.1f} "
+                  f"{df_sql.memory_usage(deep=True).sum() / 1e6:>10.1f} "
+                  f"{df_arrow.memory_usage(deep=True).sum() / 1e6:>10.1f}")
+        store.tables.clear()  # unmap before the temp dir goes
+    conn.close()
@@ -0,0 +1,101 @@
+# bench_records.py
+# Memory per row and load / iteration time of the compact stores (records.py)
+# against a pandas DataFrame from pd.read_sql_query (with pandas' default
+# string dtype and with object strings) and a plain fetchall() list of tuples,
+# per table; then the match index's footprint.
+# Table sizes are counted object by object (DataFrame.memory_usage(deep=True)
+# and its equivalent for tuples); the index is measured with tracemalloc.
+import argparse
+import gc
+import sqlite3
+import sys
+import time
+import tracemalloc
+from datetime import date
+
+import pandas as pd
+
+import records
+from matching import Matcher
+from pipeline import DB_PATH
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+def object_frame(sql, conn):
+    try:
+        with pd.option_context("future.infer_string", False):
+            return pd.read_sql_query(sql, conn)
+    except pd.errors.OptionError:  # pandas without the option: object is the only string dtype
+        return pd.read_sql_query(sql, conn)
+
+def tuples_size(rows):
+    # the list, its tuples and every distinct value object they hold
+    seen, size = set(), sys.getsizeof(rows)
+    for row in rows:
+        size += sys.getsizeof(row)
+        for v in row:
+            if id(v) not in seen:
+                seen.add(id(v))
+                size += sys.getsizeof(v)
+    return size
+
+def iterate(rows):
+    # touch every field once, as an index build would
+    start = time.perf_counter()
+    n = 0
+    for row in rows:
+        n += len(row)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the compact record stores against DataFrames.")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--as-of", default=None, help="match date for the index (YYYY-MM-DD, default today)")
+    parser.add_argument("--no-matcher", action="store_true", help="skip loading the match index")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    print(f"{'table':<14} {'rows':>9} {'':<10} {'B/row':>7} {'MB':>8} {'load s':>7} {'iter s':>7}")
+    strings = records.Dictionary()
+    for table in records.SCHEMAS:
+        columns = [c for c, _ in records.SCHEMAS[table]
+                   if c in {r[1] for r in conn.execute(f"PRAGMA table_info({table})")}]
+        sql = f"SELECT {', '.join(columns)} FROM {table}"
+        n = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] or 1
+        dict_before = strings.nbytes()
+        for name, load, size, rows in [
+            # pandas' default string dtype (Arrow-backed on pandas 3), then the object dtype of earlier versions
+            ("DataFrame", lambda: pd.read_sql_query(sql, conn), lambda df: df.memory_usage(deep=True).sum(),
+             lambda df: df.itertuples(index=False, name=None)),
+            ("DF object", lambda: object_frame(sql, conn), lambda df: df.memory_usage(deep=True).sum(),
+             lambda df: df.itertuples(index=False, name=None)),
+            ("tuples", lambda: conn.execute(sql).fetchall(), tuples_size, iter),
+            # this table's arrays plus the strings it added to the shared dictionary
+            ("Store", lambda: records.Store.load(conn, table, columns, strings),
+             lambda s: s.nbytes() + strings.nbytes() - dict_before, lambda s: s.rows()),
+        ]:
+            result, seconds = timed(load)
+            nbytes = size(result)
+            print(f"{table:<14} {n:>9,} {name:<10} {nbytes / n:>7.0f} {nbytes / 1e6:>8.1f} {seconds:>7.2f} "
+                  f"{iterate(rows(result)):>7.2f}")
+            del result
+            gc.collect()
+    print(f"dictionary: {len(strings):,} distinct strings, {strings.nbytes() / 1e6:.1f} MB")
+    del strings
+
+    if not args.no_matcher:
+        as_of = date.fromisoformat(args.as_of) if args.as_of else None
+        tracemalloc.start()
+        matcher, seconds = timed(lambda: Matcher().load(conn, as_of))
+        gc.collect()
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        print(f"match index: {len(matcher.listings):,} open listings, {len(matcher.receivers):,} receivers, "
+              f"{size / 1e6:.0f} MB ({matcher.store.nbytes() / 1e6:.1f} MB in the listing store), "
+              f"loaded in {seconds:.1f}s under tracemalloc")
+    conn.close()
@@ -0,0 +1,152 @@
+# benchmarks.py
+# Times pipeline.py ingest and the app's read queries (dashboard, listing
+# filters, the 15 predefined queries) on synthetic data from synth_data.py, at
+# each --scale, and writes the results as JSON. --compare prints how a run
+# moved against an earlier results file.
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import pandas as pd
+
+import synth_data
+from pipeline import run_pipeline
+from queries import (COMMON_FOOD_TYPES_SQL, MONTHLY_CLAIMS_SQL, PREDEFINED_QUERIES, PROVIDER_ID_BY_NAME_SQL,
+                     TOTALS_SQL, distinct_sql, expiring_sql, listings_filter_sql)
+
+MODES = ("full", "stream", "parallel")
+
+
+def workload(conn):
+    # (group, name, sql, params), with parameter values taken from the data so
+    # the filters return rows the way the app's selections do
+    city = conn.execute("SELECT City FROM summary_cities WHERE Kind = 'food_listings' "
+                        "ORDER BY Cnt DESC LIMIT 1").fetchone()[0]
+    food_type = conn.execute("SELECT Food_Type FROM summary_food_types ORDER BY Cnt DESC LIMIT 1").fetchone()[0]
+    food_name, provider_id, provider_name, provider_city = conn.execute(
+        "SELECT f.Food_Name, f.Provider_ID, p.Name, p.City FROM food_listings f "
+        "JOIN providers p ON p.Provider_ID = f.Provider_ID WHERE f.Location = ? LIMIT 1", (city,)).fetchone()
+    window = conn.execute("SELECT MIN(Expiry_Date), MAX(Expiry_Date) FROM food_listings").fetchone()
+
+    yield "dashboard", "totals", TOTALS_SQL, ()
+    yield "dashboard", "common food types", COMMON_FOOD_TYPES_SQL, ()
+    yield "dashboard", "monthly claims", MONTHLY_CLAIMS_SQL, ()
+    for table, column in [("food_listings", "Location"), ("food_listings", "Food_Type"),
+                          ("food_listings", "Food_Name"), ("providers", "Name")]:
+        yield "dashboard", f"distinct {table}.{column}", distinct_sql(table, column), ()
+
+    yield "filters", "provider name lookup", PROVIDER_ID_BY_NAME_SQL, (provider_name,)
+    for label, kwargs in [("city", {"city": city}),
+                          ("city + food type", {"city": city, "food_type": food_type}),
+                          ("food type", {"food_type": food_type}),
+                          ("food name", {"food_name": food_name}),
+                          ("provider", {"provider_id": provider_id})]:
+        sql, params = listings_filter_sql(**kwargs)
+        yield "filters", f"listings by {label}", sql, tuple(params)
+    yield "filters", "expiring soon", expiring_sql(), (window[0], window[1], 10)
+    yield "filters", "expiring soon in city", expiring_sql(city), (window[0], window[1], city, 10)
+
+    for name, sql in PREDEFINED_QUERIES.items():
+        yield "predefined", name, sql, (provider_city,) * sql.count("?")
+
+def time_query(conn, sql, params, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = len(conn.execute(sql, params).fetchall())
+        times.append((time.perf_counter() - start) * 1000)
+    return {"min_ms": round(min(times), 3), "median_ms": round(statistics.median(times), 3), "rows": rows}
+
+def bench_scale(scale, work_dir, modes, repeat, seed=0, messy=0.0, workers=None):
+    data_dir = os.path.join(work_dir, f"x{scale}")
+    start = time.perf_counter()
+    synth_data.write(synth_data.generate(scale, seed, messy), data_dir)
+    result = {"scale": scale, "rows_per_table": synth_data.BASE_ROWS * scale,
+              "generate_s": round(time.perf_counter() - start, 3),
+              "csv_bytes": sum(os.path.getsize(os.path.join(data_dir, f)) for f in os.listdir(data_dir)),
+              "ingest_s": {}, "queries": []}
+
+    db_path = None
+    for mode in modes:
+        path = os.path.join(work_dir, f"x{scale}_{mode}.db")
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            run_pipeline(path, mode, workers=workers, csv_dir=data_dir, columnar_dir=None)
+        result["ingest_s"][mode] = round(time.perf_counter() - start, 3)
+        if db_path is None:
+            db_path = path
+        else:
+            os.remove(path)
+
+    conn = sqlite3.connect(db_path)
+    for group, name, sql, params in list(workload(conn)):
+        result["queries"].append({"group": group, "name": name, **time_query(conn, sql, params, repeat)})
+    conn.close()
+    result["db_bytes"] = os.path.getsize(db_path)
+    return result
+
+def compare(old, new):
+    # (scale, what, old value, new value) for everything measured in both runs
+    before = {r["scale"]: r for r in old["results"]}
+    rows = []
+    for r in new["results"]:
+        b = before.get(r["scale"])
+        if b is None:
+            continue
+        for mode, s in r["ingest_s"].items():
+            if mode in b["ingest_s"]:
+                rows.append((r["scale"], f"ingest {mode} (s)", b["ingest_s"][mode], s))
+        old_q = {(q["group"], q["name"]): q for q in b["queries"]}
+        for q in r["queries"]:
+            if (q["group"], q["name"]) in old_q:
+                rows.append((r["scale"], f"{q['group']}: {q['name']} (ms)",
+                             old_q[(q["group"], q["name"])]["median_ms"], q["median_ms"]))
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark ingest and queries on synthetic data.")
+    parser.add_argument("--scale", type=int, nargs="+", default=[10, 100],
+                        help="data sizes as multiples of the shipped 1,000-row CSVs (e.g. 10 100 1000)")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=["full"], help="pipeline modes to time")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per query; min and median are reported")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes for parallel mode")
+    parser.add_argument("--messy", type=float, default=0.0, help="see synth_data.py --messy")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--dir", default=None, help="scratch directory for CSVs and databases (default: temp)")
+    parser.add_argument("--out", default="benchmarks.json", help="results file")
+    parser.add_argument("--compare", default=None, help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    report = {"generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+              "python": platform.python_version(), "sqlite": sqlite3.sqlite_version, "pandas": pd.__version__,
+              "platform": platform.platform(), "cpus": os.cpu_count(), "repeat": args.repeat,
+              "messy": args.messy, "seed": args.seed, "results": []}
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        for scale in args.scale:
+            r = bench_scale(scale, tmp, args.modes, args.repeat, args.seed, args.messy, args.workers)
+            report["results"].append(r)
+            ingest = "  ".join(f"{m} {s:.2f}s" for m, s in r["ingest_s"].items())
+            print(f"x{scale}: {r['rows_per_table']:,} rows/table, generated in {r['generate_s']:.1f}s, "
+                  f"ingest {ingest}")
+            for q in r["queries"]:
+                print(f"  {q['group']:<10} {q['name'][:45]:<45} {q['median_ms']:>10.2f} ms  {q['rows']:>8} rows")
+
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"results written to {args.out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            old = json.load(f)
+        for scale, what, before, after in compare(old, report):
+            ratio = after / before if before else float("inf")
+            print(f"x{scale:<5} {what[:60]:<60} {before:>10.2f} -> {after:>10.2f}  {ratio:5.2f}x")
@@ -0,0 +1,78 @@
+# bulk_load.py
+# Fast path for filling SQLite: one transaction per table, executemany over a
+# single prepared INSERT, and load-time PRAGMAs that are put back afterwards.
+from contextlib import contextmanager
+
+# journal kept in memory (not OFF) so a failed table load can still roll back
+LOAD_PRAGMAS = {
+    "journal_mode": "MEMORY",
+    "synchronous": "OFF",
+    "cache_size": -262144,  # KiB, i.e. 256 MB of page cache
+    "temp_store": "MEMORY",
+}
+
+BATCH_ROWS = 10_000
+
+
+def column_buffers(df):
+    # one buffer per column: the numpy array when nothing is missing (compact to
+    # pickle between processes), else a list with NaN / pd.NA turned into None
+    buffers = []
+    for name in df.columns:
+        col = df[name]
+        if col.hasnans:
+            buffers.append(col.astype(object).where(col.notna(), None).tolist())
+        else:
+            buffers.append(col.to_numpy())
+    return buffers
+
+def buffer_rows(buffers):
+    # plain Python values for sqlite3; zipping columns is cheaper than itertuples
+    return zip(*(b.tolist() if hasattr(b, "tolist") else b for b in buffers))
+
+def df_rows(df):
+    return buffer_rows(column_buffers(df))
+
+def insert_sql(table, columns):
+    cols = ", ".join(columns)
+    marks = ", ".join("?" for _ in columns)
+    return f"INSERT INTO {table} ({cols}) VALUES ({marks})"
+
+@contextmanager
+def load_pragmas(conn, pragmas=LOAD_PRAGMAS):
+    saved = {name: conn.execute(f"PRAGMA {name}").fetchone()[0] for name in pragmas}
+    for name, value in pragmas.items():
+        conn.execute(f"PRAGMA {name} = {value}")
+    try:
+        yield conn
+    finally:
+        conn.commit()
+        for name, value in saved.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+
+def insert_batches(conn, table, columns, rows, batch_rows=BATCH_ROWS):
+    # caller owns the transaction; rows is any iterable of tuples
+    sql = insert_sql(table, columns)
+    cur = conn.cursor()
+    batch = []
+    written = 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_rows:
+            cur.executemany(sql, batch)
+            written += len(batch)
+            batch = []
+    if batch:
+        cur.executemany(sql, batch)
+        written += len(batch)
+    return written
+
+def bulk_insert(conn, table, df):
+    with conn:  # whole table in one transaction
+        return insert_batches(conn, table, list(df.columns), df_rows(df))
+
+def create_indexes(conn, statements):
+    # run after the data is in: one sorted build per index instead of per-row updates
+    with conn:
+        for ddl in statements:
+            conn.execute(ddl)
@@ -0,0 +1,237 @@
+# changelog.py
+# Change data capture for the fact tables. Triggers append every insert, update
+# and delete to change_log with a monotonic Seq (AUTOINCREMENT: never reused,
+# and a rolled-back write takes its rows with it) and the row before and after
+# as JSON. Consumers remember the last Seq they applied:
+#
+#   - the derived_* tables below (VIEWS), moved forward by catch_up() from the
+#     snapshot refresher and the pipeline; their offsets live in change_consumers
+#   - in-memory indexes (matching.Matcher) keep a (Log_ID, Seq) cursor and call read()
+#
+# Each database file gets its own Log_ID, so a cursor taken on a file that has
+# since been rebuilt or swapped is recognised as foreign. prune() drops rows
+# every stored consumer has applied, keeping the last KEEP for the in-memory ones;
+# a consumer that falls further behind than that rebuilds from the tables.
+import json
+import uuid
+
+LOGGED = {  # table -> primary key
+    "providers": "Provider_ID",
+    "receivers": "Receiver_ID",
+    "food_listings": "Food_ID",
+    "claims": "Claim_ID",
+    "claims_archive": "Claim_ID",
+}
+KEEP = 100_000  # rows kept after every stored consumer has applied them
+
+CHANGELOG_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS change_log (
+        Seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        Tbl TEXT NOT NULL,
+        Op TEXT NOT NULL,
+        Row_ID INTEGER,
+        Old TEXT,
+        New TEXT
+    )""",
+    """CREATE TABLE IF NOT EXISTS change_log_info (
+        Log_ID TEXT NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS change_consumers (
+        Name TEXT PRIMARY KEY,
+        Seq INTEGER NOT NULL,
+        Updated_At TEXT NOT NULL
+    )""",
+]
+
+# Aggregates kept from the log instead of re-scanning their tables. Each change
+# adds its new row's values and subtracts its old row's; "keys" and "values"
+# are expressions over {row}, the JSON image. A group whose first value drops
+# to 0 is deleted. "sources" are the table_versions entries that cover the view
+# (claims_archive only changes along with claims).
+VIEWS = {
+    # query #10: claims per status, archived months included
+    "derived_claim_status": {
+        "ddl": """CREATE TABLE IF NOT EXISTS derived_claim_status (
+            Status TEXT UNIQUE,
+            Cnt INTEGER NOT NULL
+        )""",
+        "tables": ("claims", "claims_archive"),
+        "sources": ("claims",),
+        "keys": {"Status": "json_extract({row}, '$.Status')"},
+        "values": {"Cnt": "1"},
+        "rebuild": "SELECT Status, COUNT(*) FROM claims_history GROUP BY Status",
+    },
+    # query #13: listings and quantity per provider (Counted: listings with a
+    # Quantity, so an all-NULL provider still sums to NULL)
+    "derived_provider_donated": {
+        "ddl": """CREATE TABLE IF NOT EXISTS derived_provider_donated (
+            Provider_ID INTEGER PRIMARY KEY,
+            Listings INTEGER NOT NULL,
+            Counted INTEGER NOT NULL,
+            Total INTEGER NOT NULL
+        )""",
+        "tables": ("food_listings",),
+        "sources": ("food_listings",),
+        "keys": {"Provider_ID": "json_extract({row}, '$.Provider_ID')"},
+        "values": {"Listings": "1",
+                   "Counted": "json_extract({row}, '$.Quantity') IS NOT NULL",
+                   "Total": "IFNULL(json_extract({row}, '$.Quantity'), 0)"},
+        "where": "json_extract({row}, '$.Provider_ID') IS NOT NULL",
+        "rebuild": """SELECT Provider_ID, COUNT(*), COUNT(Quantity), IFNULL(SUM(Quantity), 0)
+            FROM food_listings WHERE Provider_ID IS NOT NULL GROUP BY Provider_ID""",
+    },
+}
+
+
+def _image(conn, table, row):
+    columns = [r[1] for r in conn.execute(f"PRAGMA table_info({table})")]
+    return "json_object(" + ", ".join(f"'{c}', {row}.{c}" for c in columns) + ")"
+
+def trigger_sql(conn):
+    # the column lists are read from the tables, so this runs after any
+    # migration that adds a column (allocation.install)
+    stmts = []
+    for table, pk in LOGGED.items():
+        new, old = _image(conn, table, "NEW"), _image(conn, table, "OLD")
+        for event, op, row_id, images in [("INSERT", "I", "NEW", f"NULL, {new}"),
+                                          ("UPDATE", "U", "NEW", f"{old}, {new}"),
+                                          ("DELETE", "D", "OLD", f"{old}, NULL")]:
+            stmts.append(f"""CREATE TRIGGER IF NOT EXISTS trg_change_{table}_{op.lower()} AFTER {event} ON {table}
+    BEGIN
+        INSERT INTO change_log (Tbl, Op, Row_ID, Old, New) VALUES ('{table}', '{op}', {row_id}.{pk}, {images});
+    END""")
+    return stmts
+
+def install(conn):
+    # idempotent. Views are rebuilt when the triggers are new: whatever was
+    # written before then never reached the log
+    fresh = conn.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'trg_change_%'"
+    ).fetchone()[0] == 0
+    with conn:
+        for ddl in CHANGELOG_SCHEMA + [v["ddl"] for v in VIEWS.values()] + trigger_sql(conn):
+            conn.execute(ddl)
+        if conn.execute("SELECT COUNT(*) FROM change_log_info").fetchone()[0] == 0:
+            conn.execute("INSERT INTO change_log_info (Log_ID) VALUES (?)", (uuid.uuid4().hex,))
+        if fresh:
+            for name in VIEWS:
+                rebuild(conn, name)
+
+# ---------- reading ----------
+def head(conn):
+    # -> (Log_ID, last Seq written): a cursor at the end of the log
+    log_id = conn.execute("SELECT Log_ID FROM change_log_info").fetchone()[0]
+    seq = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'change_log'").fetchone()
+    return log_id, seq[0] if seq else 0
+
+def _complete_after(conn, seq, last):
+    # every row in (seq, last] is still in the log
+    if seq >= last:
+        return True
+    first = conn.execute("SELECT MIN(Seq) FROM change_log").fetchone()[0]
+    return first is not None and first <= seq + 1
+
+def read(conn, cursor, tables=None, limit=None):
+    # changes after cursor -> (new cursor, [(Seq, Tbl, Op, Row_ID, old dict, new dict)]),
+    # or None when cursor is from another log, was pruned past, or more than
+    # limit rows of `tables` have been written since: rebuild instead
+    log_id, last = head(conn)
+    if cursor is None or cursor[0] != log_id or cursor[1] > last or not _complete_after(conn, cursor[1], last):
+        return None
+    sql = "SELECT Seq, Tbl, Op, Row_ID, Old, New FROM change_log WHERE Seq > ? AND Seq <= ?"
+    params = [cursor[1], last]
+    if tables:
+        sql += f" AND Tbl IN ({', '.join('?' for _ in tables)})"
+        params += list(tables)
+    if limit is not None:
+        sql += f" ORDER BY Seq LIMIT {limit + 1}"
+    rows = conn.execute(sql, params).fetchall()
+    if limit is not None and len(rows) > limit:
+        return None
+    return (log_id, last), [(seq, tbl, op, row_id, old and json.loads(old), new and json.loads(new))
+                            for seq, tbl, op, row_id, old, new in rows]
+
+def status(conn):
+    log_id, last = head(conn)
+    first, rows = conn.execute("SELECT MIN(Seq), COUNT(*) FROM change_log").fetchone()
+    consumers = conn.execute("SELECT Name, Seq, ? - Seq, Updated_At FROM change_consumers ORDER BY Name",
+                             (last,)).fetchall()
+    return {"log_id": log_id, "head": last, "first": first, "rows": rows, "consumers": consumers}
+
+# ---------- derived views ----------
+# These run in the caller's transaction (the refresher's db.transaction, the
+# pipeline's connection), which must be able to write.
+def _offset(conn, name, seq):
+    conn.execute("""
+        INSERT INTO change_consumers (Name, Seq, Updated_At) VALUES (?, ?, datetime('now'))
+        ON CONFLICT(Name) DO UPDATE SET Seq=excluded.Seq, Updated_At=excluded.Updated_At
+    """, (name, seq))
+
+def rebuild(conn, name):
+    view = VIEWS[name]
+    columns = list(view["keys"]) + list(view["values"])
+    conn.execute(f"DELETE FROM {name}")
+    conn.execute(f"INSERT INTO {name} ({', '.join(columns)}) {view['rebuild']}")
+    _offset(conn, name, head(conn)[1])
+
+def _delta_sql(view):
+    # net change per group over a Seq range; params: (after, last) for each side
+    def side(row, sign):
+        exprs = [f"{e.format(row=row)} AS {k}" for k, e in view["keys"].items()]
+        exprs += [f"{sign}({e.format(row=row)}) AS {k}" for k, e in view["values"].items()]
+        where = f" AND {view['where'].format(row=row)}" if "where" in view else ""
+        tables = ", ".join(f"'{t}'" for t in view["tables"])
+        return (f"SELECT {', '.join(exprs)} FROM change_log "
+                f"WHERE Seq > ? AND Seq <= ? AND Tbl IN ({tables}) AND {row} IS NOT NULL{where}")
+    keys = ", ".join(view["keys"])
+    sums = ", ".join(f"SUM({k})" for k in view["values"])
+    return f"SELECT {keys}, {sums} FROM ({side('New', '+')} UNION ALL {side('Old', '-')}) GROUP BY {keys}"
+
+def _apply(conn, name, view, deltas):
+    # NULL-safe "update, else insert" per group, as summary._bump
+    keys, values = list(view["keys"]), list(view["values"])
+    match = " AND ".join(f"{k} IS ?" for k in keys)
+    sets = ", ".join(f"{v} = {v} + ?" for v in values)
+    for row in deltas:
+        key, delta = row[:len(keys)], row[len(keys):]
+        if not any(delta):
+            continue
+        if conn.execute(f"UPDATE {name} SET {sets} WHERE {match}", (*delta, *key)).rowcount == 0:
+            conn.execute(f"INSERT INTO {name} ({', '.join(keys + values)}) VALUES "
+                         f"({', '.join('?' for _ in keys + values)})", (*key, *delta))
+        conn.execute(f"DELETE FROM {name} WHERE {match} AND {values[0]} <= 0", key)
+
+def catch_up(conn, names=None):
+    # moves each view to the end of the log -> {view: changed groups, or "rebuilt"}
+    last = head(conn)[1]
+    offsets = dict(conn.execute("SELECT Name, Seq FROM change_consumers").fetchall())
+    done = {}
+    for name in names or VIEWS:
+        seq = offsets.get(name)
+        if seq == last:
+            continue
+        if seq is None or seq > last or not _complete_after(conn, seq, last):
+            rebuild(conn, name)
+            done[name] = "rebuilt"
+            continue
+        deltas = conn.execute(_delta_sql(VIEWS[name]), (seq, last, seq, last)).fetchall()
+        _apply(conn, name, VIEWS[name], deltas)
+        _offset(conn, name, last)
+        done[name] = len(deltas)
+    return done
+
+def behind(conn, tables):
+    # the views among `tables` that haven't applied the whole log
+    names = [t for t in tables if t in VIEWS]
+    if not names:
+        return []
+    last = head(conn)[1]
+    offsets = dict(conn.execute("SELECT Name, Seq FROM change_consumers").fetchall())
+    return [n for n in names if offsets.get(n) != last]
+
+def prune(conn, keep=KEEP):
+    # -> rows deleted
+    last = head(conn)[1]
+    applied = conn.execute("SELECT MIN(Seq) FROM change_consumers").fetchone()[0]
+    upto = min(last - keep, last if applied is None else applied)
+    return conn.execute("DELETE FROM change_log WHERE Seq <= ?", (upto,)).rowcount if upto > 0 else 0
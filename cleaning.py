@@ -0,0 +1,167 @@
+# cleaning.py
+import numpy as np
+import pandas as pd
+from datetime import datetime
+import re
+
+DATE_FORMATS = ("%Y-%m-%d", "%d-%m-%Y", "%d/%m/%Y", "%Y/%m/%d", "%m/%d/%Y")
+
+# Shapes that only reach the pd.to_datetime fallback in parse_date (e.g. the
+# claims export's "3/5/2025 5:26"). Each one parses month-first, the same way
+# pd.to_datetime does, so trying them column-wise gives identical dates.
+FALLBACK_FORMATS = ("%m/%d/%Y %H:%M", "%m/%d/%Y %H:%M:%S", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M")
+
+
+# ---------- Row-wise reference functions ----------
+def clean_phone(phone):
+    if pd.isna(phone):
+        return None
+    s = str(phone)
+    digits = re.sub(r'\D', '', s)  # keep digits only
+    return digits if digits else None
+
+def parse_date(val):
+    if pd.isna(val):
+        return None
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(str(val).strip(), fmt).date().isoformat()
+        except:
+            continue
+    try:
+        return pd.to_datetime(val).date().isoformat()
+    except:
+        return None
+
+
+# ---------- Vectorized column cleaning ----------
+def _empty_like(col):
+    return pd.Series(np.full(len(col), None, dtype=object), index=col.index)
+
+def clean_phone_column(col):
+    mask = col.notna()
+    if not mask.any():
+        return col.apply(clean_phone)  # nothing to clean, keep apply's dtype
+    text = col[mask].astype(str)
+    if getattr(text.dtype, "storage", None) == "pyarrow":
+        # RE2 spelling of Python's unicode-aware \D, runs inside Arrow
+        digits = text.str.replace(r'[^\p{Nd}]', '', regex=True)
+    else:
+        digits = text.astype(object).str.replace(r'\D', '', regex=True)
+    digits = digits[digits.str.len() > 0]
+    out = _empty_like(col)
+    out[digits.index] = digits
+    return out.infer_objects()
+
+def _shape(fmt):
+    # loose regex for a numeric format: every row strptime could accept matches it
+    pattern = ""
+    for part in re.split(r'(%[A-Za-z]|\s+)', fmt):
+        if part.startswith('%'):
+            pattern += r'\s*\d+'
+        elif part.isspace():
+            pattern += r'\s+'
+        else:
+            pattern += re.escape(part)
+    return re.compile(pattern)
+
+def _try_format(text, fmt):
+    # cheap shape check first, so rows that can't match skip the datetime parser
+    text = text[text.str.fullmatch(_shape(fmt))]
+    if text.empty:
+        return text
+    parsed = pd.to_datetime(text, format=fmt, exact=True, errors='coerce')
+    return parsed[parsed.notna()]
+
+def _isoformat(parsed):
+    # date.isoformat() zero-pads the year, strftime("%Y") does not
+    return (parsed.dt.year.astype(str).str.zfill(4) + "-"
+            + parsed.dt.month.astype(str).str.zfill(2) + "-"
+            + parsed.dt.day.astype(str).str.zfill(2)).astype(object)
+
+def parse_date_column(col):
+    mask = col.notna()
+    if not mask.any():
+        return col.apply(parse_date)  # nothing to parse, keep apply's dtype
+    # date columns repeat heavily, so parse each distinct string once
+    codes, uniques = pd.factorize(col[mask].astype(str))
+    text = pd.Series([u.strip() for u in uniques], dtype=object)
+    dates = np.full(len(text), None, dtype=object)
+
+    # each format is tried once over the values still unparsed, in parse_date order
+    for fmt in DATE_FORMATS + FALLBACK_FORMATS:
+        if text.empty:
+            break
+        parsed = _try_format(text, fmt)
+        if not parsed.empty:
+            dates[parsed.index] = _isoformat(parsed)
+            text = text.drop(parsed.index)
+
+    out = _empty_like(col)
+    out[mask] = dates[codes]
+    # whatever is left goes through the row-wise function, once per distinct value
+    if not text.empty:
+        left = np.isin(codes, text.index.to_numpy())
+        leftover = col[mask][left]
+        lookup = {v: parse_date(v) for v in leftover.unique()}
+        out[leftover.index] = [lookup[v] for v in leftover]
+    return out.infer_objects()
+
+
+# ---------- Table cleaning rules ----------
+# text columns are read as text: type inference runs per chunk in stream and
+# parallel mode, and a chunk whose phone numbers all look numeric would lose
+# their leading zeros
+CSV_DTYPES = {c: str for c in ["Name", "Type", "Address", "City", "Contact", "Food_Name", "Provider_Type",
+                               "Location", "Food_Type", "Meal_Type", "Status"]}
+
+def clean_providers(providers):
+    providers.columns = [c.strip() for c in providers.columns]
+    providers['Provider_ID'] = pd.to_numeric(providers['Provider_ID'], errors='coerce').astype('Int64')
+    providers['Name'] = providers['Name'].astype(str).str.strip()
+    providers['Type'] = providers['Type'].astype(str).str.strip()
+    providers['City'] = providers['City'].astype(str).str.strip()
+    providers['Contact'] = clean_phone_column(providers['Contact'])
+    providers['Address'] = providers.get('Address', '').fillna('').astype(str).str.strip()
+    return providers
+
+def clean_receivers(receivers):
+    receivers.columns = [c.strip() for c in receivers.columns]
+    receivers['Receiver_ID'] = pd.to_numeric(receivers['Receiver_ID'], errors='coerce').astype('Int64')
+    receivers['Name'] = receivers['Name'].astype(str).str.strip()
+    receivers['Type'] = receivers['Type'].astype(str).str.strip()
+    receivers['City'] = receivers['City'].astype(str).str.strip()
+    receivers['Contact'] = clean_phone_column(receivers['Contact'])
+    return receivers
+
+def clean_food(food):
+    food.columns = [c.strip() for c in food.columns]
+    food['Food_ID'] = pd.to_numeric(food['Food_ID'], errors='coerce').astype('Int64')
+    food['Food_Name'] = food['Food_Name'].astype(str).str.strip()
+    food['Quantity'] = pd.to_numeric(food['Quantity'], errors='coerce').fillna(0).astype(int)
+    food['Expiry_Date'] = parse_date_column(food.get('Expiry_Date', None))
+    food['Provider_ID'] = pd.to_numeric(food['Provider_ID'], errors='coerce').astype('Int64')
+    food['Provider_Type'] = food.get('Provider_Type', '').astype(str).str.strip()
+    food['Location'] = food.get('Location', '').astype(str).str.strip()
+    food['Food_Type'] = food.get('Food_Type', '').astype(str).str.strip()
+    food['Meal_Type'] = food.get('Meal_Type', '').astype(str).str.strip()
+    return food
+
+def clean_claims(claims):
+    claims.columns = [c.strip() for c in claims.columns]
+    claims['Claim_ID'] = pd.to_numeric(claims['Claim_ID'], errors='coerce').astype('Int64')
+    claims['Food_ID'] = pd.to_numeric(claims['Food_ID'], errors='coerce').astype('Int64')
+    claims['Receiver_ID'] = pd.to_numeric(claims['Receiver_ID'], errors='coerce').astype('Int64')
+    claims['Status'] = claims['Status'].astype(str).str.strip().fillna('Pending')
+    claims['Timestamp'] = parse_date_column(claims.get('Timestamp', None))
+    return claims
+
+CLEANERS = {
+    "providers": clean_providers,
+    "receivers": clean_receivers,
+    "food_listings": clean_food,
+    "claims": clean_claims,
+}
+
+def clean_table(table, df):
+    return CLEANERS[table](df)
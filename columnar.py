@@ -0,0 +1,180 @@
+# columnar.py
+# Column-store copy of the four tables for analytics. pipeline.py exports them
+# as uncompressed Arrow IPC files, which open memory-mapped: columns are read
+# straight from the page cache without parsing or copying. City / type / status
+# columns are dictionary-encoded, so they come out of to_pandas() as
+# categoricals and group-bys run over small integer codes.
+# The grouped queries below are vectorized pyarrow scans; each one has the
+# SQLite query it answers in ANALYTICS, which bench_columnar.py times it against.
+import json
+import os
+from datetime import datetime, timezone
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.ipc as ipc
+
+from snapshots import versions
+
+COLUMNAR_DIR = "columnar"
+MANIFEST = "manifest.json"
+BATCH_ROWS = 100_000  # rows fetched from SQLite per step while exporting
+SOURCES = {"claims": "claims_history"}  # archived months included (archive.py)
+
+SCHEMAS = {
+    "providers": [("Provider_ID", pa.int64()), ("Name", pa.string()), ("Type", "category"),
+                  ("Address", pa.string()), ("City", "category"), ("Contact", pa.string())],
+    "receivers": [("Receiver_ID", pa.int64()), ("Name", pa.string()), ("Type", "category"),
+                  ("City", "category"), ("Contact", pa.string())],
+    "food_listings": [("Food_ID", pa.int64()), ("Food_Name", "category"), ("Quantity", pa.int64()),
+                      ("Expiry_Date", "date"), ("Provider_ID", pa.int64()), ("Provider_Type", "category"),
+                      ("Location", "category"), ("Food_Type", "category"), ("Meal_Type", "category")],
+    "claims": [("Claim_ID", pa.int64()), ("Food_ID", pa.int64()), ("Receiver_ID", pa.int64()),
+               ("Status", "category"), ("Timestamp", "date"), ("Claimed_Quantity", pa.int64())],
+}
+
+
+# ---------- export ----------
+def _array(values, kind):
+    if kind == "category":
+        return pa.array(values, type=pa.string(), from_pandas=True).dictionary_encode()
+    if kind == "date":
+        # cleaned dates are ISO text; anything the app let through that isn't becomes null
+        text = pa.array(values, type=pa.string(), from_pandas=True)
+        parsed = pc.strptime(pc.utf8_slice_codeunits(text, 0, 10), format="%Y-%m-%d", unit="s", error_is_null=True)
+        return parsed.cast(pa.date32())
+    return pa.array(values, type=kind, from_pandas=True)
+
+def table_from_sqlite(conn, table):
+    source = SOURCES.get(table, table)
+    spec = [(c, k) for c, k in SCHEMAS[table]
+            if c in {r[1] for r in conn.execute(f"PRAGMA table_info({source})")}]
+    cur = conn.execute(f"SELECT {', '.join(c for c, _ in spec)} FROM {source}")
+    columns = [[] for _ in spec]
+    while True:
+        rows = cur.fetchmany(BATCH_ROWS)
+        if not rows:
+            break
+        for i, values in enumerate(zip(*rows)):
+            columns[i].extend(values)
+    return pa.table({c: _array(values, k) for (c, k), values in zip(spec, columns)})
+
+def export(conn, out_dir=COLUMNAR_DIR):
+    # files are written next to their final name and swapped in, manifest last,
+    # so a reader never maps a half-written file
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = {"built_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "versions": versions(conn), "tables": {}}
+    for table in SCHEMAS:
+        t = table_from_sqlite(conn, table)
+        path = os.path.join(out_dir, f"{table}.arrow")
+        with pa.OSFile(path + ".tmp", "wb") as sink, ipc.new_file(sink, t.schema) as writer:
+            writer.write_table(t)
+        os.replace(path + ".tmp", path)
+        manifest["tables"][table] = {"rows": t.num_rows, "bytes": os.path.getsize(path)}
+    with open(os.path.join(out_dir, MANIFEST + ".tmp"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(os.path.join(out_dir, MANIFEST + ".tmp"), os.path.join(out_dir, MANIFEST))
+    return manifest
+
+
+# ---------- reading ----------
+class Store:
+    def __init__(self, path=COLUMNAR_DIR):
+        self.path = path
+        with open(os.path.join(path, MANIFEST)) as f:
+            self.manifest = json.load(f)
+        self.tables = {}
+
+    def table(self, name):
+        # memory-mapped and zero-copy; opened on first use
+        if name not in self.tables:
+            source = pa.memory_map(os.path.join(self.path, f"{name}.arrow"))
+            self.tables[name] = ipc.open_file(source).read_all()
+        return self.tables[name]
+
+    def to_pandas(self, name, columns=None):
+        # the replacement for run_query("SELECT * FROM ..."): categoricals for the
+        # dictionary columns, dates as datetime64
+        t = self.table(name)
+        return (t.select(columns) if columns else t).to_pandas(date_as_object=False)
+
+    def fresh(self, conn):
+        # False once the database was written after the export
+        return self.manifest["versions"] == versions(conn)
+
+    # ---------- vectorized analytics ----------
+    def count_by(self, name, column):
+        t = self.table(name)
+        out = t.group_by(column).aggregate([([], "count_all")]).rename_columns([column, "Cnt"])
+        return _frame(out, "Cnt")
+
+    def sum_by(self, name, column, value):
+        out = self.table(name).group_by(column).aggregate([(value, "sum")]).rename_columns([column, "Total"])
+        return _frame(out, "Total")
+
+    def monthly_claims(self):
+        # group on year * 100 + month as integers and format only the groups;
+        # strftime over every row is the slow part otherwise
+        stamps = self.table("claims")["Timestamp"].drop_null()
+        key = pc.add(pc.multiply(pc.year(stamps), 100), pc.month(stamps))
+        out = pa.table({"key": key}).group_by("key").aggregate([([], "count_all")]).to_pandas()
+        out = out.sort_values("key", ignore_index=True)
+        months = (out["key"] // 100).astype(str).str.zfill(4) + "-" + (out["key"] % 100).astype(str).str.zfill(2)
+        return pd.DataFrame({"month": months.astype(object), "claims_count": out["count_all"]})
+
+    def claims_by(self, column):
+        # claims joined to their listing's column: positions of each claim's
+        # Food_ID in the listings table, then a gather; claims whose listing is
+        # gone drop out, as in the inner JOIN
+        food, claims = self.table("food_listings"), self.table("claims")
+        at = pc.index_in(claims["Food_ID"], value_set=food["Food_ID"])
+        keep = pc.is_valid(at)
+        values = food[column].take(at.filter(keep))
+        out = pa.table({column: values}).group_by(column).aggregate([([], "count_all")])
+        return _frame(out.rename_columns([column, "claim_count"]), "claim_count")
+
+    def status_share(self):
+        status = self.table("claims")["Status"]
+        out = self.count_by("claims", "Status")
+        out["pct"] = out.pop("Cnt") * 100.0 / len(status)
+        return out
+
+def _frame(t, by):
+    # biggest first, ties by key, like the SQL versions' ORDER BY
+    df = t.to_pandas()
+    key = df.columns[0]
+    df[key] = df[key].astype(object)
+    return df.sort_values([by, key], ascending=[False, True], na_position="first", ignore_index=True)
+
+
+# name -> (store call, SQLite query over the base tables that answers the same question)
+ANALYTICS = {
+    "listings per city": (lambda s: s.count_by("food_listings", "Location"),
+                          "SELECT Location, COUNT(*) AS Cnt FROM food_listings GROUP BY Location"),
+    "providers per city": (lambda s: s.count_by("providers", "City"),
+                           "SELECT City, COUNT(*) AS Cnt FROM providers GROUP BY City"),
+    "receivers per city": (lambda s: s.count_by("receivers", "City"),
+                           "SELECT City, COUNT(*) AS Cnt FROM receivers GROUP BY City"),
+    "providers per type": (lambda s: s.count_by("providers", "Type"),
+                           "SELECT Type, COUNT(*) AS Cnt FROM providers GROUP BY Type"),
+    "listings per food type": (lambda s: s.count_by("food_listings", "Food_Type"),
+                               "SELECT Food_Type, COUNT(*) AS Cnt FROM food_listings GROUP BY Food_Type"),
+    "quantity per city": (lambda s: s.sum_by("food_listings", "Location", "Quantity"),
+                          "SELECT Location, SUM(Quantity) AS Total FROM food_listings GROUP BY Location"),
+    "quantity per meal type": (lambda s: s.sum_by("food_listings", "Meal_Type", "Quantity"),
+                               "SELECT Meal_Type, SUM(Quantity) AS Total FROM food_listings GROUP BY Meal_Type"),
+    "claims per meal type": (lambda s: s.claims_by("Meal_Type"),
+                             "SELECT f.Meal_Type, COUNT(c.Claim_ID) AS claim_count FROM food_listings f "
+                             "JOIN claims_history c ON f.Food_ID = c.Food_ID GROUP BY f.Meal_Type"),
+    "claims per city": (lambda s: s.claims_by("Location"),
+                        "SELECT f.Location, COUNT(c.Claim_ID) AS claim_count FROM food_listings f "
+                        "JOIN claims_history c ON f.Food_ID = c.Food_ID GROUP BY f.Location"),
+    "claims status share": (lambda s: s.status_share(),
+                            "SELECT Status, COUNT(*) * 1.0 / (SELECT COUNT(*) FROM claims_history) * 100 AS pct "
+                            "FROM claims_history GROUP BY Status"),
+    "monthly claims": (lambda s: s.monthly_claims(),
+                       "SELECT substr(Timestamp, 1, 7) AS month, COUNT(*) AS claims_count FROM claims_history "
+                       "WHERE Timestamp IS NOT NULL GROUP BY month ORDER BY month"),
+}
@@ -0,0 +1,85 @@
+# conftest.py
+# Shared pytest fixtures: small synthetic CSVs (synth_data.py) and a database
+# built from them by pipeline.py, once per session; each test gets its own copy.
+# churn() makes a random mix of the app's writes, for tests of what triggers and
+# change-log consumers keep up to date.
+import random
+import shutil
+import sqlite3
+
+import pytest
+
+import allocation
+import archive
+import synth_data
+from pipeline import run_pipeline
+
+SCALE = 1  # synth_data.BASE_ROWS rows per table
+
+
+@pytest.fixture(scope="session")
+def csv_dir(tmp_path_factory):
+    out = str(tmp_path_factory.mktemp("csv"))
+    synth_data.write(synth_data.generate(SCALE, seed=0), out)
+    return out
+
+@pytest.fixture(scope="session")
+def built_db(tmp_path_factory, csv_dir):
+    path = str(tmp_path_factory.mktemp("built") / "local_food_wastage.db")
+    run_pipeline(path, csv_dir=csv_dir, columnar_dir=None)
+    return path
+
+@pytest.fixture
+def db_path(tmp_path, built_db):
+    path = str(tmp_path / "local_food_wastage.db")
+    shutil.copy(built_db, path)
+    return path
+
+@pytest.fixture
+def conn(db_path):
+    c = sqlite3.connect(db_path)
+    yield c
+    c.close()
+
+
+def _churn(conn, seed=0, rounds=100):
+    # edits that move rows between groups (cities, types, months; NULL included),
+    # inserts, deletes, claims through allocation.py, and an archive run
+    rng = random.Random(seed)
+    ids = {t: [r[0] for r in conn.execute(f"SELECT {k} FROM {t}")]
+           for t, k in [("providers", "Provider_ID"), ("receivers", "Receiver_ID"), ("food_listings", "Food_ID")]}
+    cities = [r[0] for r in conn.execute("SELECT City FROM providers LIMIT 20")] + [None, "New City"]
+    types = [r[0] for r in conn.execute("SELECT DISTINCT Food_Type FROM food_listings")] + [None]
+    for i in range(rounds):
+        with conn:
+            conn.execute("UPDATE providers SET City = ? WHERE Provider_ID = ?",
+                         (rng.choice(cities), rng.choice(ids["providers"])))
+            conn.execute("UPDATE receivers SET City = ? WHERE Receiver_ID = ?",
+                         (rng.choice(cities), rng.choice(ids["receivers"])))
+            conn.execute("UPDATE food_listings SET Location = ?, Food_Type = ?, Quantity = ? WHERE Food_ID = ?",
+                         (rng.choice(cities), rng.choice(types), rng.choice([None, 0, 5, 40]),
+                          rng.choice(ids["food_listings"])))
+            if i % 10 == 0:
+                conn.execute("INSERT INTO providers (Name, City) VALUES (?, ?)", (f"Churn {i}", rng.choice(cities)))
+                conn.execute("INSERT INTO food_listings (Food_Name, Quantity, Provider_ID, Location, Food_Type) "
+                             "VALUES (?, ?, ?, ?, ?)", (f"Churn {i}", 10, rng.choice(ids["providers"]),
+                                                        rng.choice(cities), rng.choice(types)))
+                conn.execute("DELETE FROM receivers WHERE Receiver_ID = ?", (ids["receivers"].pop(),))
+                conn.execute("DELETE FROM food_listings WHERE Food_ID = ?", (ids["food_listings"].pop(),))
+            claim_id = rng.choice([r[0] for r in conn.execute("SELECT Claim_ID FROM claims LIMIT 50")])
+            conn.execute("UPDATE claims SET Timestamp = ? WHERE Claim_ID = ?",
+                         (rng.choice([None, "2025-01-15 09:00:00", "2025-06-01 12:00:00"]), claim_id))
+        try:
+            allocation.claim(conn, rng.choice(ids["food_listings"]), rng.choice(ids["receivers"]),
+                             rng.randint(1, 3), rng.choice(["Pending", "Completed", "Cancelled"]))
+            claim_id = conn.execute("SELECT MAX(Claim_ID) FROM claims").fetchone()[0]
+            allocation.set_status(conn, claim_id, rng.choice(["Pending", "Completed", "Cancelled"]))
+        except allocation.InsufficientQuantity:
+            pass
+        if i % 7 == 0:
+            allocation.delete_claim(conn, claim_id)
+    archive.compact(conn)
+
+@pytest.fixture
+def churn():
+    return _churn
@@ -0,0 +1,157 @@
+# db.py
+# Shared connections and a query-result cache for app.py.
+# Reads go through one connection per Streamlit session; every write goes
+# through a single WAL-mode connection, which bumps a version counter for the
+# table it touched so cached results that read that table are dropped.
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import pandas as pd
+
+READ_TABLES = re.compile(r"\b(?:FROM|JOIN)\s+(\w+)", re.IGNORECASE)
+WRITE_TABLE = re.compile(r"^\s*(?:INSERT(?:\s+OR\s+\w+)?\s+INTO|REPLACE\s+INTO|UPDATE(?:\s+OR\s+\w+)?|DELETE\s+FROM)\s+(\w+)",
+                         re.IGNORECASE)
+
+
+def tables_read(sql):
+    return frozenset(t.lower() for t in READ_TABLES.findall(sql))
+
+def table_written(sql):
+    m = WRITE_TABLE.match(sql)
+    return m.group(1).lower() if m else None
+
+def connect(db_path, wal=False):
+    # Streamlit reruns a session's script on different threads
+    conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+    if wal:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class Database:
+    def __init__(self, db_path, max_entries=256, derived=None):
+        self.db_path = db_path
+        self.derived = derived or {}  # table -> tables its triggers also write
+        self.max_entries = max_entries
+        self.write_conn = connect(db_path, wal=True)
+        self.write_lock = threading.Lock()
+        self.cache_lock = threading.Lock()
+        self.cache = OrderedDict()  # (sql, params) -> (table versions, DataFrame)
+        self.versions = {}          # table -> bumped on every committed write
+        self.data_version = self._data_version()
+        self.generation = 0         # bumped by reopen(); long-lived readers reconnect when it moves
+
+    def reader(self):
+        return connect(self.db_path)
+
+    def reopen(self):
+        # after the file was overwritten under the open connections (jobs.py's
+        # swap): a connection from before can keep stale schema state, and its
+        # next write through an FTS trigger fails with "no such table".
+        # Callers hold write_lock.
+        self.write_conn.close()
+        self.write_conn = connect(self.db_path, wal=True)
+        self.data_version = self._data_version()
+        self.generation += 1
+
+    # ---------- cache bookkeeping ----------
+    def _data_version(self):
+        # changes when another process (e.g. pipeline.py) commits to the file
+        return self.write_conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _check_external_writes(self):
+        with self.write_lock:
+            version = self._data_version()
+        if version != self.data_version:
+            with self.cache_lock:
+                self.data_version = version
+                self.cache.clear()
+
+    def _stamp(self, tables):
+        return tuple(sorted((t, self.versions.get(t, 0)) for t in tables))
+
+    def invalidate(self, *tables):
+        with self.cache_lock:
+            touched = {t.lower() for t in tables}
+            for t in list(touched):
+                touched |= self.derived.get(t, set())
+            for t in touched:
+                self.versions[t] = self.versions.get(t, 0) + 1
+
+    def clear(self):
+        with self.cache_lock:
+            self.cache.clear()
+
+    # ---------- reads ----------
+    def query(self, conn, sql, params=None, stats=None):
+        # returned frames are shared between sessions: callers must not mutate them.
+        # stats, if given, gets stats["cached"] = whether the cache answered
+        params = tuple(params or ())
+        key = (sql, params)
+        tables = tables_read(sql)
+        self._check_external_writes()
+        with self.cache_lock:
+            hit = self.cache.get(key)
+            stamp = self._stamp(tables)
+            if hit and hit[0] == stamp:
+                self.cache.move_to_end(key)
+                if stats is not None:
+                    stats["cached"] = True
+                return hit[1]
+
+        df = pd.read_sql_query(sql, conn, params=params)
+
+        with self.cache_lock:
+            # a write that landed while we were reading makes this result stale
+            if self._stamp(tables) == stamp:
+                self.cache[key] = (stamp, df)
+                self.cache.move_to_end(key)
+                while len(self.cache) > self.max_entries:
+                    self.cache.popitem(last=False)
+        return df
+
+    # ---------- writes ----------
+    def execute(self, sql, params=None):
+        with self.transaction() as conn:
+            cur = conn.execute(sql, params or ())
+        return cur
+
+    @contextmanager
+    def transaction(self, *tables):
+        # statements run through the yielded connection are committed together;
+        # the tables they write (plus any named here) are invalidated afterwards
+        touched = set(tables)
+        with self.write_lock:
+            conn = _TrackingConnection(self.write_conn, touched)
+            try:
+                yield conn
+                self.write_conn.commit()
+            except Exception:
+                self.write_conn.rollback()
+                raise
+            finally:
+                self.invalidate(*touched)
+
+
+class _TrackingConnection:
+    # records which tables the statements executed through it write to
+    def __init__(self, conn, touched):
+        self._conn = conn
+        self._touched = touched
+
+    def _track(self, sql):
+        table = table_written(sql)
+        if table:
+            self._touched.add(table)
+
+    def execute(self, sql, params=()):
+        self._track(sql)
+        return self._conn.execute(sql, params)
+
+    def executemany(self, sql, rows):
+        self._track(sql)
+        return self._conn.executemany(sql, rows)
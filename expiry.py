@@ -0,0 +1,34 @@
+# expiry.py
+# "What expires next?" for dispatchers: live listings (stock left, no completed
+# claim) in Expiry_Date order, optionally for one city and within a time window.
+# The queue is a pair of partial indexes, so SQLite keeps it current on every
+# insert, update, delete and claim, and a lookup reads O(log n + N) index entries.
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from bulk_load import create_indexes
+from queries import expiring_sql
+
+EXPIRY_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_food_listings_expiry_city ON food_listings(Location, Expiry_Date) WHERE Quantity > 0",
+    "CREATE INDEX IF NOT EXISTS idx_food_listings_expiry ON food_listings(Expiry_Date) WHERE Quantity > 0",
+]
+
+
+def install(conn):
+    create_indexes(conn, EXPIRY_INDEXES)
+
+def expiry_window(hours, now=None):
+    # Expiry_Date is a day: a listing is still good on that date, so the window
+    # starts at today's date and ends `hours` from now
+    now = now or datetime.now()
+    return now.strftime("%Y-%m-%d"), (now + timedelta(hours=hours)).strftime("%Y-%m-%d %H:%M:%S")
+
+def expiring_query(n=10, city=None, hours=48, now=None):
+    start, end = expiry_window(hours, now)
+    return expiring_sql(city), [start, end] + ([city] if city else []) + [n]
+
+def next_expiring(conn, n=10, city=None, hours=48, now=None):
+    sql, params = expiring_query(n, city, hours, now)
+    return pd.read_sql_query(sql, conn, params=params)
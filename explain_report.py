@@ -0,0 +1,105 @@
+# explain_report.py
+# EXPLAIN QUERY PLAN for the app's queries with and without the indexes from
+# pipeline.INDEXES, showing which ones went from a full SCAN to a SEARCH.
+import argparse
+import json
+import re
+import sqlite3
+
+import summary
+from pipeline import DB_PATH, INDEXES
+from queries import (CLAIMS_VIEW_SQL, COMMON_FOOD_TYPES_SQL, MONTHLY_CLAIMS_SQL, PREDEFINED_QUERIES,
+                     PROVIDER_ID_BY_NAME_SQL, TOTALS_SQL, distinct_sql, expiring_sql,
+                     listings_filter_sql)
+
+
+def workload():
+    yield "Dashboard totals", TOTALS_SQL, ()
+    yield "Dashboard food types", COMMON_FOOD_TYPES_SQL, ()
+    yield "Dashboard monthly claims", MONTHLY_CLAIMS_SQL, ()
+    for table, column in [("food_listings", "Location"), ("food_listings", "Food_Type"),
+                          ("food_listings", "Food_Name"), ("providers", "Name")]:
+        yield f"Distinct {table}.{column}", distinct_sql(table, column), ()
+    yield "Provider name lookup", PROVIDER_ID_BY_NAME_SQL, ("x",)
+    for label, kwargs in [("city", {"city": "x"}),
+                          ("city + food type", {"city": "x", "food_type": "x"}),
+                          ("food type", {"food_type": "x"}),
+                          ("food name", {"food_name": "x"}),
+                          ("provider", {"provider_id": 1})]:
+        sql, params = listings_filter_sql(**kwargs)
+        yield f"Listings by {label}", sql, tuple(params)
+    yield "Claims view", CLAIMS_VIEW_SQL, ()
+    yield "Expiring soon", expiring_sql(), ("x", "x", 10)
+    yield "Expiring soon in city", expiring_sql("x"), ("x", "x", "x", 10)
+    for name, sql in PREDEFINED_QUERIES.items():
+        yield f"Query {name}", sql, ("x",) * sql.count("?")
+
+def plan(conn, sql, params):
+    rows = conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+    return [r[3] for r in rows]
+
+def access(details):
+    # table -> "SEARCH" if any step reaches it through an index lookup, else "SCAN".
+    # An AUTOMATIC index is built by scanning the table on every run, so it counts as a SCAN.
+    seen = {}
+    for d in details:
+        m = re.match(r"(SCAN|SEARCH) (\w+)", d)
+        if m:
+            kind, table = m.groups()
+            if "AUTOMATIC" in d:
+                kind = "SCAN"
+            if seen.get(table) != "SEARCH":
+                seen[table] = kind
+    return seen
+
+def index_names():
+    return [re.search(r"INDEX IF NOT EXISTS (\w+)", ddl).group(1) for ddl in INDEXES]
+
+def build_report(db_path=DB_PATH):
+    # work on an in-memory copy so the real database is never touched
+    conn = sqlite3.connect(":memory:")
+    src = sqlite3.connect(db_path)
+    src.backup(conn)
+    src.close()
+    summary.install(conn)  # older databases predate the summary tables
+
+    for name in index_names():
+        conn.execute(f"DROP INDEX IF EXISTS {name}")
+    conn.execute("DROP TABLE IF EXISTS sqlite_stat1")
+    before = {label: plan(conn, sql, params) for label, sql, params in workload()}
+
+    for ddl in INDEXES:
+        conn.execute(ddl)
+    conn.execute("ANALYZE")
+    report = []
+    for label, sql, params in workload():
+        after = plan(conn, sql, params)
+        was, now = access(before[label]), access(after)
+        switched = sorted(t for t, kind in now.items() if kind == "SEARCH" and was.get(t) == "SCAN")
+        report.append({
+            "query": label,
+            "before": before[label],
+            "after": after,
+            "scan_to_search": switched,
+        })
+    conn.close()
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show which app queries the indexes turn from SCAN into SEARCH.")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--json", action="store_true", help="print the full plans as JSON")
+    args = parser.parse_args()
+
+    report = build_report(args.db)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for entry in report:
+            mark = ", ".join(entry["scan_to_search"]) or "-"
+            print(f"{entry['query'][:48]:<48}  SCAN->SEARCH: {mark}")
+            for d in entry["after"]:
+                print(f"{'':<50}{d}")
+        switched = sum(1 for e in report if e["scan_to_search"])
+        print(f"\n{switched} of {len(report)} queries switched at least one table from SCAN to SEARCH")
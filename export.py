@@ -0,0 +1,47 @@
+# export.py
+# CSV export straight from a SQLite cursor: rows are fetched and encoded a
+# chunk at a time (optionally gzip-compressed), so the full result never sits
+# in memory as a DataFrame plus a rendered string plus its bytes.
+import csv
+import io
+import tempfile
+import zlib
+
+CHUNK_ROWS = 5000
+
+
+def iter_csv(conn, sql, params=(), chunk_rows=CHUNK_ROWS, compress=False):
+    cur = conn.execute(sql, params or ())
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    gz = zlib.compressobj(wbits=31) if compress else None  # wbits=31 -> gzip container
+
+    def drain():
+        data = buf.getvalue().encode("utf-8")
+        buf.seek(0)
+        buf.truncate()
+        return gz.compress(data) if gz else data
+
+    writer.writerow([d[0] for d in cur.description])
+    while True:
+        rows = cur.fetchmany(chunk_rows)
+        if not rows:
+            break
+        writer.writerows(rows)
+        chunk = drain()
+        if chunk:
+            yield chunk
+    tail = drain()
+    if gz:
+        tail += gz.flush()
+    if tail:
+        yield tail
+
+def export_csv(conn, sql, params=(), compress=False, chunk_rows=CHUNK_ROWS):
+    # chunks go to an unbuffered temp file on disk; the returned raw file is
+    # positioned at the start, ready for st.download_button
+    out = tempfile.TemporaryFile(buffering=0)
+    for chunk in iter_csv(conn, sql, params, chunk_rows, compress):
+        out.write(chunk)
+    out.seek(0)
+    return out
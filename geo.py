@@ -0,0 +1,182 @@
+# geo.py
+# Cities and distances between them. The pipeline loads `cities`, one row per
+# normalized city name (case, accents and spacing folded) with coordinates when
+# cities.csv supplies them; cities seen only in the data get a row without.
+# CityIndex buckets the located cities in a lat/lon grid so "cities within R km"
+# reads the few cells the circle overlaps, then the listings query is an IN on
+# the indexed Location column with every spelling of those cities.
+import json
+import math
+import os
+import threading
+
+import pandas as pd
+
+from search import fold
+from snapshots import versions
+
+CITIES_FILE = "cities.csv"  # City, Latitude, Longitude[, Region]; next to the other CSVs
+CELL_DEG = 0.5  # grid cell size, ~55 km north-south
+EARTH_KM = 6371.0088
+WATCHED = ("providers", "receivers", "food_listings")  # tables whose city spellings the index tracks
+
+CITIES_DDL = """
+    CREATE TABLE IF NOT EXISTS cities (
+        City_Key TEXT PRIMARY KEY,
+        City TEXT NOT NULL,
+        Region TEXT,
+        Latitude REAL,
+        Longitude REAL
+    )"""
+DATA_CITIES_SQL = "SELECT DISTINCT City FROM summary_cities WHERE City IS NOT NULL AND City != ''"
+
+# open listings (as matching.OPEN_LISTINGS_SQL) in a set of Location spellings.
+# Params: as-of date, JSON array of spellings
+OPEN_LISTINGS_IN_SQL = """
+    SELECT f.Food_ID, f.Food_Name, f.Quantity, f.Expiry_Date, f.Location, f.Food_Type, f.Meal_Type, f.Provider_ID
+    FROM food_listings f
+    WHERE f.Location IN (SELECT value FROM json_each(?))
+      AND f.Quantity > 0 AND (f.Expiry_Date IS NULL OR f.Expiry_Date >= ?)
+      AND NOT EXISTS (SELECT 1 FROM claims c WHERE c.Food_ID = f.Food_ID AND c.Status = 'Completed')
+      AND NOT EXISTS (SELECT 1 FROM claims_archive a WHERE a.Food_ID = f.Food_ID AND a.Status = 'Completed')
+"""
+
+
+def city_key(city):
+    if not isinstance(city, str):
+        return None
+    return " ".join(fold(city).split()) or None
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((p2 - p1) / 2) ** 2
+         + math.cos(p1) * math.cos(p2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_KM * math.asin(min(1.0, math.sqrt(a)))
+
+def cities_file(csv_dir=None):
+    return os.path.join(csv_dir or "", CITIES_FILE)
+
+# ---------- loading ----------
+def read_cities(path):
+    # the file's rows keyed by city_key; coordinates out of range are dropped
+    df = pd.read_csv(path, dtype={"City": str, "Region": str})
+    if "Region" not in df:
+        df["Region"] = None
+    df["City_Key"] = df["City"].map(city_key)
+    df = df.dropna(subset=["City_Key"]).drop_duplicates("City_Key")
+    for col, bound in (("Latitude", 90), ("Longitude", 180)):
+        df[col] = pd.to_numeric(df.get(col), errors="coerce")
+        df.loc[df[col].abs() > bound, col] = None
+    missing = df["Latitude"].isna() | df["Longitude"].isna()
+    df.loc[missing, ["Latitude", "Longitude"]] = None
+    df["City"] = df["City"].str.strip()
+    return df[["City_Key", "City", "Region", "Latitude", "Longitude"]]
+
+def install(conn, path=None):
+    # the table always; with a path (the pipeline), reload it from that file
+    # plus every city the data mentions. -> (cities, with coordinates)
+    conn.execute(CITIES_DDL)
+    conn.commit()
+    if path is None:
+        return None
+    rows = read_cities(path) if os.path.exists(path) else pd.DataFrame(
+        columns=["City_Key", "City", "Region", "Latitude", "Longitude"])
+    known = set(rows["City_Key"])
+    extra = {}
+    for (city,) in conn.execute(DATA_CITIES_SQL):
+        key = city_key(city)
+        if key and key not in known and key not in extra:
+            extra[key] = city.strip()
+    with conn:
+        conn.execute("DELETE FROM cities")
+        conn.executemany("INSERT INTO cities VALUES (?, ?, ?, ?, ?)",
+                         [tuple(None if pd.isna(v) else v for v in r) for r in rows.itertuples(index=False)])
+        conn.executemany("INSERT INTO cities (City_Key, City) VALUES (?, ?)", extra.items())
+    return len(rows) + len(extra), int(rows["Latitude"].notna().sum())
+
+
+# ---------- proximity ----------
+class CityIndex:
+    def __init__(self, cell_deg=CELL_DEG):
+        self.cell_deg = cell_deg
+        self.coords = {}     # city key -> (lat, lon)
+        self.cells = {}      # (row, col) -> [(key, lat, lon)]
+        self.spellings = {}  # city key -> set of spellings used in the data
+        self.seen = None     # table_versions the spellings reflect
+        self.lock = threading.RLock()  # shared by every app session
+
+    def _cell(self, lat, lon):
+        return math.floor(lat / self.cell_deg), math.floor(lon / self.cell_deg) % round(360 / self.cell_deg)
+
+    def load(self, conn):
+        coords, cells = {}, {}
+        for key, lat, lon in conn.execute(
+                "SELECT City_Key, Latitude, Longitude FROM cities WHERE Latitude IS NOT NULL AND Longitude IS NOT NULL"):
+            coords[key] = (lat, lon)
+            cells.setdefault(self._cell(lat, lon), []).append((key, lat, lon))
+        with self.lock:
+            self.coords, self.cells = coords, cells
+            self._load_spellings(conn)
+        return self
+
+    def _load_spellings(self, conn):
+        spellings = {}
+        for (city,) in conn.execute(DATA_CITIES_SQL):
+            key = city_key(city)
+            if key:
+                spellings.setdefault(key, set()).add(city)
+        self.spellings = spellings
+        self.seen = {t: v for t, v in versions(conn).items() if t in WATCHED}
+
+    def ensure_current(self, conn):
+        # city names come and go with app writes; coordinates only change
+        # with a pipeline run, which reloads the whole index
+        with self.lock:
+            if {t: v for t, v in versions(conn).items() if t in WATCHED} != self.seen:
+                self._load_spellings(conn)
+        return self
+
+    def within(self, city, radius_km):
+        # -> {city key: km} for the cities within radius_km of `city`, itself
+        # included at 0. A city without coordinates only matches itself.
+        key = city_key(city)
+        if key is None:
+            return {}
+        with self.lock:
+            if key not in self.coords:
+                return {key: 0.0}
+            lat, lon = self.coords[key]
+            dlat = radius_km / (math.pi * EARTH_KM / 180)
+            # the widest the circle gets in longitude is at its edge nearest a pole
+            edge = min(abs(lat) + dlat, 89.9)
+            dlon = min(dlat / math.cos(math.radians(edge)), 180)
+            row0, row1 = math.floor((lat - dlat) / self.cell_deg), math.floor((lat + dlat) / self.cell_deg)
+            cols = round(360 / self.cell_deg)
+            col0, col1 = math.floor((lon - dlon) / self.cell_deg), math.floor((lon + dlon) / self.cell_deg)
+            found = {}
+            for row in range(row0, row1 + 1):
+                for col in range(col0, min(col1, col0 + cols - 1) + 1):
+                    for other, olat, olon in self.cells.get((row, col % cols), ()):
+                        km = haversine_km(lat, lon, olat, olon)
+                        if km <= radius_km:
+                            found[other] = km
+            found[key] = 0.0
+            return found
+
+    def nearby(self, city, radius_km):
+        # -> {spelling as stored in the tables: km}
+        with self.lock:
+            return {s: km for key, km in self.within(city, radius_km).items() for s in self.spellings.get(key, ())}
+
+    def located(self):
+        return len(self.coords)
+
+def listings_near(conn, index, city, radius_km, as_of, limit=200):
+    # open listings within radius_km of `city`, nearest first, then soonest expiry
+    near = index.ensure_current(conn).nearby(city, radius_km)
+    if not near:
+        return pd.DataFrame()
+    df = pd.read_sql_query(OPEN_LISTINGS_IN_SQL, conn, params=(json.dumps(list(near)), as_of))
+    df.insert(5, "Distance_km", df["Location"].map(near).round(1))
+    return df.sort_values(["Distance_km", "Expiry_Date", "Food_ID"], na_position="last",
+                          ignore_index=True).head(limit)
@@ -0,0 +1,237 @@
+# jobs.py
+# Background pipeline.py runs for the app. A job builds a staging copy of the
+# database in a pipeline.py subprocess, reading its printed lines for progress,
+# then copies it over the live file with SQLite's backup API in one
+# transaction: WAL readers keep the snapshot they started with and see the new
+# data on their next read, and the file is never missing or half-written.
+# Requests that arrive before a queued job starts are merged into it.
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timezone
+
+import columnar
+from db import connect
+from snapshots import versions
+
+PIPELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pipeline.py")
+TABLES = ("providers", "receivers", "food_listings", "claims")
+# pipeline.py output line -> step it marks as done; the last two steps are ours
+STEPS = [(re.compile(rf"^{t}[ :]"), f"load {t}") for t in TABLES] + [
+    (re.compile(r"^Database (created|synced)"), "indexes and summaries"),
+    (re.compile(r"query snapshots refreshed"), "query snapshots"),
+]
+SWAP_STEPS = ["swap into place", "Arrow store"]
+JOBS_KEPT = 20  # finished jobs shown in the status panel
+LOG_LINES = 200
+RETRIES = 3  # incremental jobs start over when the app wrote during the run
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+class IngestQueue:
+    # one worker thread; request() returns the job that will cover the request
+    def __init__(self, db_path, columnar_dir=columnar.COLUMNAR_DIR):
+        self.db_path = db_path
+        self.staging_path = db_path + ".staging"
+        self.columnar_dir = columnar_dir
+        self.db = None           # the app's Database, once the live file exists
+        self.hooks = []          # called after every swap
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.queue = deque()
+        self.running = None
+        self.finished = deque(maxlen=JOBS_KEPT)
+        self.swaps = 0
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def attach(self, db):
+        # swaps then hold the app's write lock, so no app write interleaves
+        self.db = db
+
+    def on_swap(self, fn):
+        self.hooks.append(fn)
+
+    # ---------- queue ----------
+    def request(self, mode="full", csv_dir=None, requested_by=None):
+        with self.lock:
+            for job in self.queue:
+                if job["csv_dir"] == csv_dir:
+                    # any rebuild covers an incremental sync of the same files
+                    if job["mode"] == "incremental" and mode != "incremental":
+                        job["mode"] = mode
+                    job["requests"] += 1
+                    return job
+            job = {"id": uuid.uuid4().hex[:8], "mode": mode, "csv_dir": csv_dir, "requested_by": requested_by,
+                   "requests": 1, "state": "queued", "queued_at": _now(), "started_at": None,
+                   "finished_at": None, "step": None, "done": 0, "steps": len(STEPS) + len(SWAP_STEPS),
+                   "log": deque(maxlen=LOG_LINES), "lines": 0, "error": None, "seconds": None}
+            self.queue.append(job)
+        self.wake.set()
+        return job
+
+    def status(self):
+        # plain copies, safe to render while the job moves on
+        with self.lock:
+            jobs = ([self.running] if self.running else []) + list(self.queue)
+            # under the lock: _log appends to these deques
+            return {"active": [_view(j) for j in jobs], "finished": [_view(j) for j in reversed(self.finished)],
+                    "swaps": self.swaps}
+
+    def busy(self):
+        with self.lock:
+            return self.running is not None or bool(self.queue)
+
+    # ---------- worker ----------
+    def _run(self):
+        while True:
+            self.wake.wait()
+            self.wake.clear()
+            while True:
+                with self.lock:
+                    if not self.queue:
+                        break
+                    job = self.running = self.queue.popleft()
+                    job["state"], job["started_at"] = "running", _now()
+                start = time.perf_counter()
+                try:
+                    self._ingest(job)
+                    job["state"] = "done"
+                except Exception as e:
+                    job["state"], job["error"] = "failed", str(e)
+                finally:
+                    if os.path.exists(self.staging_path):
+                        os.remove(self.staging_path)
+                    job["seconds"] = round(time.perf_counter() - start, 2)
+                    job["finished_at"] = _now()
+                    with self.lock:
+                        self.running = None
+                        self.finished.append(job)
+
+    def _ingest(self, job):
+        for attempt in range(RETRIES):
+            before = self._prepare_staging(job)
+            self._pipeline(job)
+            if self._swap(job, before):
+                break
+            self._log(job, "the app wrote to the database during the sync; starting over")
+        else:
+            raise RuntimeError(f"the database kept changing during {RETRIES} incremental syncs; try again")
+        self._mark(job, "Arrow store")
+        conn = connect(self.db_path)
+        try:
+            columnar.export(conn, self.columnar_dir)
+        finally:
+            conn.close()
+        job["done"] = job["steps"]
+
+    def _prepare_staging(self, job):
+        # full rebuilds start from nothing; an incremental sync needs the
+        # current data. -> live table versions the staging copy was taken at
+        if os.path.exists(self.staging_path):
+            os.remove(self.staging_path)
+        job["done"], job["step"] = 0, None
+        if job["mode"] != "incremental" or not os.path.exists(self.db_path):
+            return None
+        live, staging = connect(self.db_path), connect(self.staging_path)
+        try:
+            live.backup(staging)
+            return versions(live)
+        finally:
+            live.close()
+            staging.close()
+
+    def _pipeline(self, job):
+        args = [sys.executable, "-u", PIPELINE, "--db", self.staging_path, "--mode", job["mode"], "--no-columnar"]
+        if job["csv_dir"]:
+            args += ["--csv-dir", job["csv_dir"]]
+        proc = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+                                encoding="utf-8", errors="replace", env={**os.environ, "PYTHONIOENCODING": "utf-8"})
+        seen = set()
+        for line in proc.stdout:
+            line = line.rstrip()
+            self._log(job, line)
+            for pattern, step in STEPS:
+                if step not in seen and pattern.search(line):
+                    seen.add(step)
+                    job["done"], job["step"] = len(seen), step
+        if proc.wait() != 0:
+            last = job["log"][-1] if job["log"] else ""
+            raise RuntimeError(f"pipeline.py exited with status {proc.returncode}: {last}")
+
+    def _swap(self, job, before):
+        # -> False when an incremental copy went stale before it could be swapped
+        self._mark(job, "swap into place")
+        if not os.path.exists(self.db_path):
+            # nothing is reading a file that isn't there yet
+            os.replace(self.staging_path, self.db_path)
+        else:
+            lock = self.db.write_lock if self.db else threading.Lock()
+            with lock:
+                live, staging = connect(self.db_path), connect(self.staging_path)
+                try:
+                    if before is not None and versions(live) != before:
+                        return False
+                    staging.backup(live)
+                finally:
+                    live.close()
+                    staging.close()
+                if self.db:
+                    self.db.reopen()
+        with self.lock:
+            self.swaps += 1
+        if self.db:
+            self.db.clear()
+        for fn in self.hooks:
+            try:
+                fn()
+            except Exception as e:
+                self._log(job, f"after-swap hook failed: {e}")
+        return True
+
+    def _log(self, job, line):
+        with self.lock:
+            job["log"].append(line)
+            job["lines"] += 1
+
+    def _mark(self, job, step):
+        job["done"], job["step"] = len(STEPS) + SWAP_STEPS.index(step), step
+
+
+def _view(job):
+    return {**job, "log": list(job["log"])}
+
+
+if __name__ == "__main__":
+    # a one-off staged run from the command line, for scripts and cron
+    import argparse
+    from pipeline import DB_PATH
+
+    parser = argparse.ArgumentParser(description="Run pipeline.py into a staging file and swap it in.")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--mode", choices=["full", "stream", "parallel", "incremental"], default="full")
+    parser.add_argument("--csv-dir", default=None)
+    args = parser.parse_args()
+    jobs = IngestQueue(args.db)
+    job = jobs.request(args.mode, args.csv_dir)
+    shown = 0
+    while True:
+        done = job["finished_at"] is not None
+        with jobs.lock:
+            log, lines = list(job["log"]), job["lines"]
+        for line in log[len(log) - min(lines - shown, len(log)):]:
+            print(line)
+        shown = lines
+        if done:
+            break
+        time.sleep(0.2)
+    print(f"{job['state']} in {job['seconds']}s" + (f": {job['error']}" if job["error"] else ""))
+    sys.exit(job["state"] != "done")
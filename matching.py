@@ -0,0 +1,341 @@
+# matching.py
+# Proposes receiver <-> listing pairs. Open listings are held in memory, bucketed
+# by city (geo.city_key, as the proximity index) and then (Food_Type, Meal_Type),
+# each bucket sorted best-first by the part of the score that doesn't depend on
+# the receiver (expiry urgency and quantity). Only a receiver's claim-history affinity depends on the pair, so a
+# batch match walks the buckets' heads instead of scoring every pair.
+# The listings' rows live in a records.Store (arrays, not a tuple per row) and
+# every city, type and date string is interned through its Dictionary.
+import heapq
+import math
+import sqlite3
+import threading
+from array import array
+from bisect import insort
+from collections import Counter
+from datetime import date, datetime
+
+import pandas as pd
+
+import changelog
+from geo import city_key  # same city key as the proximity index
+import records
+from snapshots import versions
+
+WEIGHTS = {"urgency": 0.5, "quantity": 0.2, "history": 0.3}
+QUANTITY_CAP = 50  # listings this size or bigger get the full quantity score
+RELOAD_AT = 20_000  # logged changes past which a full load is cheaper than refreshing each row
+LISTING_COLUMNS = ["Food_ID", "Food_Name", "Quantity", "Expiry_Date", "Location", "Food_Type", "Meal_Type"]
+LOGGED = ("receivers", "food_listings", "claims", "claims_archive")  # change log tables the index reads
+TYPED = ("Food_Type", "Meal_Type")  # listing columns the claim history is counted by
+
+# open = stock left, not past its expiry date, no completed claim
+OPEN_LISTINGS_SQL = """
+    SELECT f.Food_ID, f.Food_Name, f.Quantity, f.Expiry_Date, f.Location, f.Food_Type, f.Meal_Type
+    FROM food_listings f
+    WHERE f.Quantity > 0 AND (f.Expiry_Date IS NULL OR f.Expiry_Date >= ?)
+      AND NOT EXISTS (SELECT 1 FROM claims c WHERE c.Food_ID = f.Food_ID AND c.Status = 'Completed')
+      AND NOT EXISTS (SELECT 1 FROM claims_archive a WHERE a.Food_ID = f.Food_ID AND a.Status = 'Completed')
+"""
+RECEIVERS_SQL = "SELECT Receiver_ID, City FROM receivers"
+# what each receiver has asked for before (cancelled claims don't count),
+# archived months included; claims of deleted receivers are skipped, as
+# refresh_receiver() does
+HISTORY_SQL = """
+    SELECT c.Receiver_ID, f.Food_Type, f.Meal_Type, SUM(c.Cnt)
+    FROM claims_counts c
+    JOIN food_listings f ON f.Food_ID = c.Food_ID
+    JOIN receivers r ON r.Receiver_ID = c.Receiver_ID
+    WHERE c.Status != 'Cancelled'
+"""
+CLAIMANTS_SQL = "SELECT DISTINCT Receiver_ID FROM claims_counts WHERE Food_ID = ?"
+
+
+def _days_left(expiry, as_of):
+    if not expiry:
+        return None
+    try:
+        return max((datetime.strptime(expiry[:10], "%Y-%m-%d").date() - as_of).days, 0)
+    except ValueError:
+        return None
+
+
+class Matcher:
+    def __init__(self, weights=WEIGHTS):
+        self.weights = weights
+        self.as_of = None
+        self.strings = records.Dictionary()  # every string the index holds, once
+        self.listings = {}   # Food_ID -> slot in self.store and the score arrays
+        self.store = records.Store("food_listings", LISTING_COLUMNS, self.strings)  # open listings' rows
+        self.urgency = array("d")   # per slot
+        self.quantity = array("d")  # per slot: the quantity score
+        self.buckets = {}    # city key -> {(Food_Type, Meal_Type): [sort keys, best first]}
+        self.receivers = {}  # Receiver_ID -> city key
+        self.by_city = {}    # city key -> set of Receiver_IDs
+        self.history = {}    # Receiver_ID -> (Food_Type Counter, Meal_Type Counter, total)
+        self.seen = None     # table_versions this index reflects
+        self.cursor = None   # change_log position it reflects; None without a change log
+        self.lock = threading.RLock()  # shared by every app session
+
+    # ---------- scoring ----------
+    def listing_parts(self, quantity, expiry):
+        days = _days_left(expiry, self.as_of)
+        urgency = 0.0 if days is None else 1.0 / (1 + days)
+        qty = min(math.log1p(max(quantity or 0, 0)) / math.log1p(QUANTITY_CAP), 1.0)
+        return urgency, qty
+
+    def affinity(self, rid, bucket):
+        hist = self.history.get(rid)
+        if not hist or not hist[2]:
+            return 0.0
+        food_types, meal_types, total = hist
+        return (food_types.get(bucket[0], 0) + meal_types.get(bucket[1], 0)) / (2 * total)
+
+    # ---------- full load ----------
+    def _read_transaction(self, conn, work):
+        # the cursor, versions and rows all from one snapshot of the file
+        own = not conn.in_transaction
+        if own:
+            conn.execute("BEGIN")
+        try:
+            return work()
+        finally:
+            if own:
+                conn.commit()
+
+    def load(self, conn, as_of=None):
+        with self.lock:
+            self._read_transaction(conn, lambda: self._load(conn, as_of))
+        return self
+
+    def _load(self, conn, as_of):
+        self.as_of = as_of or date.today()
+        self.cursor = self._head(conn)
+        self.listings, self.buckets, self.receivers, self.by_city, self.history = {}, {}, {}, {}, {}
+        self.strings = records.Dictionary()
+        self.store = records.Store("food_listings", LISTING_COLUMNS, self.strings)
+        self.urgency, self.quantity = array("d"), array("d")
+        # rows straight into the store's arrays, then placed column by column
+        self.store.extend(conn.execute(OPEN_LISTINGS_SQL, (self.as_of.isoformat(),)))
+        for slot, row in enumerate(self.store.rows()):
+            self._place(slot, *row, sort=False)
+        for groups in self.buckets.values():
+            for keys in groups.values():
+                keys.sort()
+        for rid, city in conn.execute(RECEIVERS_SQL):
+            self._add_receiver(rid, city)
+        self._load_history(conn.execute(HISTORY_SQL + " GROUP BY 1, 2, 3"))
+        self.seen = versions(conn)
+
+    def _head(self, conn):
+        try:
+            return changelog.head(conn)
+        except sqlite3.OperationalError:  # a database without the change log
+            return None
+
+    def ensure_current(self, conn, as_of=None):
+        # full reload on a new day (urgency is relative to it). Otherwise the rows
+        # logged since the last look are refreshed one by one; a full reload only
+        # when there are too many or the log can't say (a rebuilt or swapped file)
+        as_of = as_of or date.today()
+        with self.lock:
+            if self.as_of != as_of:
+                return self.load(conn, as_of)
+
+            def catch_up():
+                if self.cursor is None:
+                    return versions(conn) == self.seen
+                changes = changelog.read(conn, self.cursor, LOGGED, RELOAD_AT)
+                if changes is None:
+                    return False
+                self.cursor, rows = changes
+                listings, receivers, retyped = set(), set(), set()
+                for _, table, _, row_id, old, new in rows:
+                    if table == "food_listings":
+                        listings.add(row_id)
+                        if not (old and new) or [old[c] for c in TYPED] != [new[c] for c in TYPED]:
+                            # the claim history of whoever claimed it is counted by type
+                            retyped.add(row_id)
+                    elif table == "receivers":
+                        receivers.add(row_id)
+                    else:
+                        for row in (old, new):
+                            if row:
+                                listings.add(row["Food_ID"])
+                                receivers.add(row["Receiver_ID"])
+                for fid in retyped:
+                    receivers.update(r for (r,) in conn.execute(CLAIMANTS_SQL, (fid,)))
+                for fid in listings - {None}:
+                    self.refresh_listing(conn, fid)
+                for rid in receivers - {None}:
+                    self.refresh_receiver(conn, rid)
+                return True
+
+            if not self._read_transaction(conn, catch_up):
+                self.load(conn, as_of)
+        return self
+
+    def _load_history(self, rows):
+        intern = self.strings.intern
+        for rid, food_type, meal_type, n in rows:
+            food_type, meal_type = intern(food_type), intern(meal_type)
+            food_types, meal_types, total = self.history.setdefault(rid, (Counter(), Counter(), 0))
+            food_types[food_type] += n
+            meal_types[meal_type] += n
+            self.history[rid] = (food_types, meal_types, total + n)
+
+    def _key(self, slot, fid):
+        return (-(self.weights["urgency"] * self.urgency[slot] + self.weights["quantity"] * self.quantity[slot]), fid)
+
+    def _add_listing(self, row):
+        self._place(self.store.append(row), *row, sort=True)
+
+    def _place(self, slot, fid, _, quantity, expiry, location, food_type, meal_type, sort):
+        urgency, qty = self.listing_parts(quantity, expiry)
+        if slot == len(self.urgency):
+            self.urgency.append(urgency)
+            self.quantity.append(qty)
+        else:
+            self.urgency[slot], self.quantity[slot] = urgency, qty
+        key = self._key(slot, fid)
+        city = self.strings.intern(city_key(location))
+        keys = self.buckets.setdefault(city, {}).setdefault((food_type, meal_type), [])
+        if sort:
+            insort(keys, key)
+        else:
+            keys.append(key)
+        self.listings[fid] = slot
+
+    def _remove_listing(self, fid):
+        slot = self.listings.pop(fid, None)
+        if slot is not None:
+            _, _, _, _, location, food_type, meal_type = self.store.row(slot)
+            keys = self.buckets[city_key(location)][(food_type, meal_type)]
+            keys.remove(self._key(slot, fid))
+            if not keys:
+                del self.buckets[city_key(location)][(food_type, meal_type)]
+            self.store.delete(slot)
+
+    def _add_receiver(self, rid, city):
+        city = self.strings.intern(city_key(city))
+        self.receivers[rid] = city
+        self.by_city.setdefault(city, set()).add(rid)
+
+    def _remove_receiver(self, rid):
+        if rid in self.receivers:
+            self.by_city[self.receivers.pop(rid)].discard(rid)
+
+    # ---------- incremental updates ----------
+    def refresh_listing(self, conn, fid):
+        # after a listing is created, edited or deleted, or one of its claims changed
+        with self.lock:
+            self._remove_listing(fid)
+            row = conn.execute(OPEN_LISTINGS_SQL + " AND f.Food_ID = ?", (self.as_of.isoformat(), fid)).fetchone()
+            if row:
+                self._add_listing(row)
+            self.seen = versions(conn)
+
+    def refresh_receiver(self, conn, rid):
+        # after a receiver is created, edited or deleted, or one of its claims changed
+        with self.lock:
+            self._remove_receiver(rid)
+            self.history.pop(rid, None)
+            row = conn.execute(RECEIVERS_SQL + " WHERE Receiver_ID = ?", (rid,)).fetchone()
+            if row:
+                self._add_receiver(*row)
+                self._load_history(conn.execute(HISTORY_SQL + " AND c.Receiver_ID = ? GROUP BY 1, 2, 3", (rid,)))
+            self.seen = versions(conn)
+
+    def refresh_claim(self, conn, food_id, receiver_id):
+        if food_id is not None:
+            self.refresh_listing(conn, food_id)
+        if receiver_id is not None:
+            self.refresh_receiver(conn, receiver_id)
+
+    # ---------- matching ----------
+    def match(self):
+        # greedy one-to-one assignment, best remaining pair first. The best pair
+        # in a bucket is its head listing plus the unassigned receiver with the
+        # biggest history bonus for that bucket, so the heap holds one entry per
+        # bucket and each pop either assigns a pair or skips an assigned receiver.
+        # Receivers with no bonus for a bucket share one Receiver_ID-ordered pool per city.
+        with self.lock:
+            w = self.weights["history"]
+            assigned = set()
+            heap = []
+            state = {}  # (city, bucket) -> [next listing, receivers with a bonus, next of those]
+            pools = {}  # city -> [Receiver_IDs in order, next]
+
+            def push(city, bucket):
+                st = state[(city, bucket)]
+                keys = self.buckets[city][bucket]
+                if st[0] >= len(keys):
+                    return
+                ranked = st[1]
+                while st[2] < len(ranked) and ranked[st[2]][1] in assigned:
+                    st[2] += 1
+                if st[2] < len(ranked):
+                    bonus, rid = -ranked[st[2]][0], ranked[st[2]][1]
+                else:
+                    pool = pools[city]
+                    while pool[1] < len(pool[0]) and pool[0][pool[1]] in assigned:
+                        pool[1] += 1
+                    if pool[1] == len(pool[0]):
+                        return
+                    bonus, rid = 0.0, pool[0][pool[1]]
+                key = keys[st[0]]
+                heapq.heappush(heap, (-(-key[0] + bonus), rid, key[1], city, bucket))
+
+            for city, groups in self.buckets.items():
+                rids = self.by_city.get(city)
+                if city is None or not rids:
+                    continue
+                pools[city] = [sorted(rids), 0]
+                ranked = {bucket: [] for bucket in groups}
+                for rid in rids:
+                    hist = self.history.get(rid)
+                    if hist and hist[2]:
+                        food_types, meal_types, total = hist
+                        for bucket in groups:
+                            # same arithmetic as affinity(), inlined: this loop is the hot path
+                            n = food_types.get(bucket[0], 0) + meal_types.get(bucket[1], 0)
+                            if n:
+                                ranked[bucket].append((-(w * (n / (2 * total))), rid))
+                for bucket in groups:
+                    state[(city, bucket)] = [0, sorted(ranked[bucket]), 0]
+                    push(city, bucket)
+
+            pairs = []
+            while heap:
+                neg_score, rid, fid, city, bucket = heapq.heappop(heap)
+                if rid not in assigned:
+                    assigned.add(rid)
+                    state[(city, bucket)][0] += 1
+                    pairs.append((rid, fid, -neg_score))
+                push(city, bucket)
+            return self._frame(pairs)
+
+    def suggest(self, rid, k=10):
+        # best k open listings for one receiver, ignoring everyone else
+        with self.lock:
+            if rid not in self.receivers:
+                return self._frame([])
+            scored = []
+            for bucket, keys in self.buckets.get(self.receivers[rid], {}).items():
+                bonus = self.weights["history"] * self.affinity(rid, bucket)
+                scored += [(-key[0] + bonus, key[1]) for key in keys[:k]]
+            scored.sort(key=lambda s: (-s[0], s[1]))
+            return self._frame([(rid, fid, score) for score, fid in scored[:k]])
+
+    def _frame(self, pairs):
+        rows = []
+        for rid, fid, score in pairs:
+            slot = self.listings[fid]
+            urgency, qty = self.urgency[slot], self.quantity[slot]
+            _, name, quantity, expiry, location, food_type, meal_type = self.store.row(slot)
+            rows.append((rid, fid, name, location, food_type, meal_type, expiry, quantity,
+                         round(score, 4), round(urgency, 4), round(qty, 4),
+                         round(self.affinity(rid, (food_type, meal_type)), 4)))
+        return pd.DataFrame(rows, columns=["Receiver_ID", "Food_ID", "Food_Name", "City", "Food_Type", "Meal_Type",
+                                           "Expiry_Date", "Quantity", "Score", "Urgency", "Quantity_Score",
+                                           "History_Affinity"])
@@ -0,0 +1,55 @@
+# pagination.py
+# Keyset (seek) pagination for the grids in queries.GRIDS: each page is
+# fetched with "WHERE (sort, key) > (last sort, last key) ... LIMIT n", so the
+# cost of a page does not depend on how deep into the table it is.
+
+SORT_COLUMN = "_sort_value"
+KEY_COLUMN = "_key_value"
+
+
+def sort_expr(grid, label):
+    expr = grid["sortable"][label]
+    if expr == grid["key"]:
+        return expr
+    # NULLs break row-value comparisons; '' keeps the order total and the
+    # primary key breaks ties
+    return f"IFNULL({expr}, '')"
+
+def count_sql(grid, where="1=1"):
+    return f"SELECT COUNT(*) FROM {grid.get('count_source', grid['source'])} WHERE {where}"
+
+def page_sql(grid, label, descending=False, page_size=50, cursor=None, where="1=1", params=()):
+    # cursor is the (sort value, key) of the last row on the previous page
+    sx = sort_expr(grid, label)
+    key = grid["key"]
+    direction = "DESC" if descending else "ASC"
+    op = "<" if descending else ">"
+    params = list(params)
+
+    conditions = [f"({where})"]
+    if cursor is not None:
+        if sx == key:
+            conditions.append(f"{key} {op} ?")
+            params.append(cursor[1])
+        else:
+            conditions.append(f"({sx}, {key}) {op} (?, ?)")
+            params.extend(cursor)
+    order = key if sx == key else f"{sx} {direction}, {key}"
+
+    sql = (f"SELECT {grid['select']}, {sx} AS {SORT_COLUMN}, {key} AS {KEY_COLUMN} "
+           f"FROM {grid['source']} WHERE {' AND '.join(conditions)} "
+           f"ORDER BY {order} {direction} LIMIT ?")
+    params.append(int(page_size))
+    return sql, params
+
+def split_page(df):
+    # drop the helper columns; return the cursor for the next page (None at the end)
+    cursor = None
+    if not df.empty:
+        last = df.iloc[-1]
+        cursor = (_plain(last[SORT_COLUMN]), _plain(last[KEY_COLUMN]))
+    return df.drop(columns=[SORT_COLUMN, KEY_COLUMN]), cursor
+
+def _plain(value):
+    # numpy scalars -> Python values sqlite3 can bind
+    return value.item() if hasattr(value, "item") else value
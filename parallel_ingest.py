@@ -0,0 +1,86 @@
+# parallel_ingest.py
+# Worker side of `pipeline.py --mode parallel`: each CSV is cut into byte ranges
+# at record boundaries, and worker processes parse + clean one range each and
+# hand back column buffers for the single writer in pipeline.load_parallel.
+import io
+import os
+import time
+from collections import deque
+
+import pandas as pd
+
+from bulk_load import column_buffers
+from cleaning import CSV_DTYPES, clean_table
+
+DEFAULT_CHUNK_BYTES = 16 * 1024 * 1024
+SCAN_BLOCK = 1024 * 1024
+AHEAD_PER_WORKER = 2  # chunks submitted per worker beyond the one being written
+
+
+def split_csv(path, chunk_bytes=DEFAULT_CHUNK_BYTES):
+    # (header_end, [(start, end), ...]) where every cut sits just after a newline
+    # that is outside quotes, so quoted fields with line breaks stay whole.
+    # Quotes are counted from the start of the file: "" escapes keep the parity.
+    size = os.path.getsize(path)
+    cuts = []
+    target = 0  # first cut is the end of the header line
+    quotes = 0
+    pos = 0
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(SCAN_BLOCK)
+            if not block:
+                break
+            i = 0
+            while True:
+                start = max(i, target - pos)
+                if start >= len(block):
+                    quotes += block.count(b'"', i)
+                    break
+                quotes += block.count(b'"', i, start)
+                nl = block.find(b"\n", start)
+                if nl < 0:
+                    quotes += block.count(b'"', start)
+                    break
+                quotes += block.count(b'"', start, nl)
+                i = nl + 1
+                if quotes % 2 == 0:
+                    cuts.append(pos + i)
+                    target = pos + i + chunk_bytes
+            pos += len(block)
+    if not cuts:
+        return size, []
+    bounds = cuts + ([size] if cuts[-1] < size else [])
+    return cuts[0], list(zip(bounds[:-1], bounds[1:]))
+
+def parse_chunk(task):
+    # runs in a worker process; returns buffers instead of a DataFrame so only
+    # arrays / lists cross the process boundary
+    table, path, header_end, start, end = task
+    t0 = time.perf_counter()
+    with open(path, "rb") as f:
+        header = f.read(header_end)
+        f.seek(start)
+        data = f.read(end - start)
+    t1 = time.perf_counter()
+    df = pd.read_csv(io.BytesIO(header + data), dtype=CSV_DTYPES)
+    t2 = time.perf_counter()
+    df = clean_table(table, df)
+    t3 = time.perf_counter()
+    buffers = column_buffers(df)
+    t4 = time.perf_counter()
+    timings = {"read": t1 - t0, "parse": t2 - t1, "clean": t3 - t2, "pack": t4 - t3}
+    return table, list(df.columns), buffers, len(df), timings
+
+def map_ahead(pool, fn, tasks, window):
+    # pool.map in task order, but with at most `window` tasks submitted and not
+    # yet consumed: parsed chunks can't pile up in memory while the single
+    # writer is behind, and the workers still have the next ones queued
+    tasks = iter(tasks)
+    pending = deque(pool.submit(fn, t) for _, t in zip(range(window), tasks))
+    while pending:
+        result = pending.popleft().result()
+        task = next(tasks, None)
+        if task is not None:
+            pending.append(pool.submit(fn, task))
+        yield result
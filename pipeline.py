@@ -1,90 +1,54 @@
 import pandas as pd
 import sqlite3
-from datetime import datetime
-import re
+import argparse
+import hashlib
+import time
 import os
+from concurrent.futures import ProcessPoolExecutor
 
-# ---------- Helper cleaning functions ----------
-def clean_phone(phone):
-    if pd.isna(phone):
-        return None
-    s = str(phone)
-    digits = re.sub(r'\D', '', s)  # keep digits only
-    return digits if digits else None
-
-def parse_date(val):
-    if pd.isna(val):
-        return None
-    for fmt in ("%Y-%m-%d", "%d-%m-%Y", "%d/%m/%Y", "%Y/%m/%d", "%m/%d/%Y"):
-        try:
-            return datetime.strptime(str(val).strip(), fmt).date().isoformat()
-        except:
-            continue
-    try:
-        return pd.to_datetime(val).date().isoformat()
-    except:
-        return None
-
-# ---------- 1. Load CSVs ----------
-providers = pd.read_csv("providers_data.csv")
-receivers = pd.read_csv("receivers_data.csv")
-food = pd.read_csv("food_listings_data.csv")
-claims = pd.read_csv("claims_data.csv")
-
-print("providers shape:", providers.shape)
-print("receivers shape:", receivers.shape)
-print("food shape:", food.shape)
-print("claims shape:", claims.shape)
-
-# ---------- 2. Clean Providers ----------
-providers.columns = [c.strip() for c in providers.columns]
-receivers.columns = [c.strip() for c in receivers.columns]
-food.columns = [c.strip() for c in food.columns]
-claims.columns = [c.strip() for c in claims.columns]
-
-providers['Provider_ID'] = pd.to_numeric(providers['Provider_ID'], errors='coerce').astype('Int64')
-providers['Name'] = providers['Name'].astype(str).str.strip()
-providers['Type'] = providers['Type'].astype(str).str.strip()
-providers['City'] = providers['City'].astype(str).str.strip()
-providers['Contact'] = providers['Contact'].apply(clean_phone)
-providers['Address'] = providers.get('Address', '').fillna('').astype(str).str.strip()
-
-# ---------- 3. Clean Receivers ----------
-receivers['Receiver_ID'] = pd.to_numeric(receivers['Receiver_ID'], errors='coerce').astype('Int64')
-receivers['Name'] = receivers['Name'].astype(str).str.strip()
-receivers['Type'] = receivers['Type'].astype(str).str.strip()
-receivers['City'] = receivers['City'].astype(str).str.strip()
-receivers['Contact'] = receivers['Contact'].apply(clean_phone)
-
-# ---------- 4. Clean Food Listings ----------
-food['Food_ID'] = pd.to_numeric(food['Food_ID'], errors='coerce').astype('Int64')
-food['Food_Name'] = food['Food_Name'].astype(str).str.strip()
-food['Quantity'] = pd.to_numeric(food['Quantity'], errors='coerce').fillna(0).astype(int)
-food['Expiry_Date'] = food.get('Expiry_Date', None).apply(parse_date)
-food['Provider_ID'] = pd.to_numeric(food['Provider_ID'], errors='coerce').astype('Int64')
-food['Provider_Type'] = food.get('Provider_Type', '').astype(str).str.strip()
-food['Location'] = food.get('Location', '').astype(str).str.strip()
-food['Food_Type'] = food.get('Food_Type', '').astype(str).str.strip()
-food['Meal_Type'] = food.get('Meal_Type', '').astype(str).str.strip()
-
-# ---------- 5. Clean Claims ----------
-claims['Claim_ID'] = pd.to_numeric(claims['Claim_ID'], errors='coerce').astype('Int64')
-claims['Food_ID'] = pd.to_numeric(claims['Food_ID'], errors='coerce').astype('Int64')
-claims['Receiver_ID'] = pd.to_numeric(claims['Receiver_ID'], errors='coerce').astype('Int64')
-claims['Status'] = claims['Status'].astype(str).str.strip().fillna('Pending')
-claims['Timestamp'] = claims.get('Timestamp', None).apply(parse_date)
-
-# ---------- 6. Create SQLite DB ----------
-if os.path.exists("local_food_wastage.db"):
-    os.remove("local_food_wastage.db")  # start fresh
-
-conn = sqlite3.connect('local_food_wastage.db')
-c = conn.cursor()
-c.execute("PRAGMA foreign_keys = ON;")
-
-# Create tables
-c.execute("""
-CREATE TABLE providers (
+from cleaning import CSV_DTYPES, clean_table
+from bulk_load import (LOAD_PRAGMAS, buffer_rows, bulk_insert, create_indexes, df_rows, insert_batches,
+                       insert_sql, load_pragmas)
+from expiry import EXPIRY_INDEXES
+from parallel_ingest import AHEAD_PER_WORKER, DEFAULT_CHUNK_BYTES, map_ahead, parse_chunk, split_csv
+import allocation
+import archive
+import changelog
+import columnar
+import geo
+import search
+import snapshots
+import summary
+
+DB_PATH = "local_food_wastage.db"
+
+# table name -> source CSV, in load order
+CSV_FILES = {
+    "providers": "providers_data.csv",
+    "receivers": "receivers_data.csv",
+    "food_listings": "food_listings_data.csv",
+    "claims": "claims_data.csv",
+}
+
+def csv_files(csv_dir=None):
+    # CSV_FILES, read from csv_dir instead of the working directory when given
+    if csv_dir is None:
+        return dict(CSV_FILES)
+    return {table: os.path.join(csv_dir, name) for table, name in CSV_FILES.items()}
+
+PRIMARY_KEYS = {
+    "providers": "Provider_ID",
+    "receivers": "Receiver_ID",
+    "food_listings": "Food_ID",
+    "claims": "Claim_ID",
+}
+
+DEFAULT_CHUNKSIZE = 50_000
+
+# ---------- 1. Schema ----------
+SCHEMA = {
+    "providers": """
+CREATE TABLE IF NOT EXISTS providers (
     Provider_ID INTEGER PRIMARY KEY,
     Name TEXT NOT NULL,
     Type TEXT,
@@ -92,18 +56,18 @@ CREATE TABLE providers (
     City TEXT,
     Contact TEXT
 );
-""")
-c.execute("""
-CREATE TABLE receivers (
+""",
+    "receivers": """
+CREATE TABLE IF NOT EXISTS receivers (
     Receiver_ID INTEGER PRIMARY KEY,
     Name TEXT NOT NULL,
     Type TEXT,
     City TEXT,
     Contact TEXT
 );
-""")
-c.execute("""
-CREATE TABLE food_listings (
+""",
+    "food_listings": """
+CREATE TABLE IF NOT EXISTS food_listings (
     Food_ID INTEGER PRIMARY KEY,
     Food_Name TEXT,
     Quantity INTEGER,
@@ -115,31 +79,373 @@ CREATE TABLE food_listings (
     Meal_Type TEXT,
     FOREIGN KEY(Provider_ID) REFERENCES providers(Provider_ID) ON DELETE SET NULL
 );
-""")
-c.execute("""
-CREATE TABLE claims (
+""",
+    "claims": """
+CREATE TABLE IF NOT EXISTS claims (
     Claim_ID INTEGER PRIMARY KEY,
     Food_ID INTEGER,
     Receiver_ID INTEGER,
     Status TEXT,
     Timestamp DATETIME,
+    Claimed_Quantity INTEGER,
     FOREIGN KEY(Food_ID) REFERENCES food_listings(Food_ID) ON DELETE CASCADE,
     FOREIGN KEY(Receiver_ID) REFERENCES receivers(Receiver_ID) ON DELETE SET NULL
 );
-""")
-conn.commit()
+""",
+}
+
+# checksum of each CSV as of its last incremental load
+INGEST_STATE_DDL = """
+CREATE TABLE IF NOT EXISTS ingest_state (
+    File TEXT PRIMARY KEY,
+    Checksum TEXT NOT NULL,
+    Rows INTEGER,
+    Loaded_At TEXT
+);
+"""
+
+# content hash of each CSV row as of the last build or sync that read it: a
+# sync only writes the rows the CSV changed since then, so edits made in the
+# app to rows the CSV didn't touch survive
+INGEST_ROWS_DDL = """
+CREATE TABLE IF NOT EXISTS ingest_rows (
+    Tbl TEXT NOT NULL,
+    Key INTEGER NOT NULL,
+    Hash INTEGER NOT NULL,
+    PRIMARY KEY (Tbl, Key)
+) WITHOUT ROWID;
+"""
+
+# chosen from app.py's filters, joins and GROUP BYs (see explain_report.py);
+# built after the data is loaded
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_food_listings_location ON food_listings(Location, Food_Type)",
+    "CREATE INDEX IF NOT EXISTS idx_food_listings_food_type ON food_listings(Food_Type)",
+    "CREATE INDEX IF NOT EXISTS idx_food_listings_food_name ON food_listings(Food_Name)",
+    "CREATE INDEX IF NOT EXISTS idx_food_listings_provider ON food_listings(Provider_ID, Quantity)",
+    "CREATE INDEX IF NOT EXISTS idx_claims_food ON claims(Food_ID, Status)",
+    "CREATE INDEX IF NOT EXISTS idx_claims_receiver ON claims(Receiver_ID, Food_ID)",
+    "CREATE INDEX IF NOT EXISTS idx_claims_status ON claims(Status)",
+    "CREATE INDEX IF NOT EXISTS idx_claims_timestamp ON claims(Timestamp)",
+    "CREATE INDEX IF NOT EXISTS idx_providers_city ON providers(City)",
+    "CREATE INDEX IF NOT EXISTS idx_providers_name ON providers(Name)",
+    "CREATE INDEX IF NOT EXISTS idx_receivers_city ON receivers(City)",
+    *EXPIRY_INDEXES,
+]
+
+def create_tables(conn):
+    c = conn.cursor()
+    c.execute("PRAGMA foreign_keys = ON;")
+    for ddl in SCHEMA.values():
+        c.execute(ddl)
+    conn.commit()
+    archive.install(conn)
+
+def tune_db(conn, hot_months=archive.HOT_MONTHS, rebuild=True):
+    # rebuild=False after an incremental sync: the triggers kept the summary
+    # tables and the search index current, and only stale statistics are redone
+    create_indexes(conn, INDEXES)
+    # closed months leave claims before the summaries, search index and
+    # planner statistics are built over it
+    allocation.install(conn)
+    start = time.perf_counter()
+    moved, dropped = archive.compact(conn, hot_months)
+    print(f"{sum(moved.values())} claims in {len(moved)} closed months archived in {time.perf_counter() - start:.2f}s "
+          f"(claims from {archive.cutoff(conn, hot_months)} on stay hot)")
+    if dropped:
+        print(f"{dropped} reloaded claims dropped: their Claim_IDs are archived already, and the archive is read-only")
+    summary.install(conn, force_rebuild=rebuild)
+    search.install(conn, force_rebuild=rebuild)
+    # an incremental run's upserts (and the archiving above) are in the change
+    # log already; a new file starts one and builds the derived tables
+    changelog.install(conn)
+    with conn:
+        applied = changelog.catch_up(conn)
+        changelog.prune(conn)
+    if applied:
+        print("derived tables: " + ", ".join(f"{name} {n}" if n == "rebuilt" else f"{name} {n} groups updated"
+                                             for name, n in applied.items()))
+    conn.execute("ANALYZE" if rebuild else "PRAGMA optimize")  # planner statistics for the new indexes
+    conn.commit()
+
+def fresh_db(db_path):
+    if os.path.exists(db_path):
+        os.remove(db_path)  # start fresh
+    conn = sqlite3.connect(db_path)
+    create_tables(conn)
+    return conn
+
+# ---------- 2. Full load (everything in memory) ----------
+def write_table(conn, table, df, loader):
+    if loader == "bulk":
+        bulk_insert(conn, table, df)
+    else:
+        df.to_sql(table, conn, if_exists='append', index=False)
 
-# ---------- 7. Insert data (no foreign key issues) ----------
-conn.execute("PRAGMA foreign_keys = OFF;")  # disable temporarily
+def load_full(db_path=DB_PATH, loader="bulk", files=CSV_FILES):
+    frames = {table: pd.read_csv(path, dtype=CSV_DTYPES) for table, path in files.items()}
+    for table, df in frames.items():
+        print(f"{table} shape:", df.shape)
 
-providers.to_sql('providers', conn, if_exists='append', index=False)
-receivers.to_sql('receivers', conn, if_exists='append', index=False)
-food.to_sql('food_listings', conn, if_exists='append', index=False)
-claims.to_sql('claims', conn, if_exists='append', index=False)
+    frames = {table: clean_table(table, df) for table, df in frames.items()}
+
+    conn = fresh_db(db_path)
+    conn.execute("PRAGMA foreign_keys = OFF;")  # disable temporarily
+    with load_pragmas(conn, LOAD_PRAGMAS if loader == "bulk" else {}):
+        for table, df in frames.items():
+            write_table(conn, table, df, loader)
+    conn.execute("PRAGMA foreign_keys = ON;")  # re-enable
+    return conn
+
+# ---------- 3. Streaming load (one chunk in memory at a time) ----------
+def load_streaming(db_path=DB_PATH, chunksize=DEFAULT_CHUNKSIZE, loader="bulk", files=CSV_FILES):
+    conn = fresh_db(db_path)
+    conn.execute("PRAGMA foreign_keys = OFF;")
+    with load_pragmas(conn, LOAD_PRAGMAS if loader == "bulk" else {}):
+        for table, path in files.items():
+            start = time.perf_counter()
+            rows = 0
+            if loader == "bulk":
+                with conn:  # one transaction for the whole table
+                    for chunk in pd.read_csv(path, chunksize=chunksize, dtype=CSV_DTYPES):
+                        chunk = clean_table(table, chunk)
+                        rows += insert_batches(conn, table, list(chunk.columns), df_rows(chunk))
+            else:
+                for chunk in pd.read_csv(path, chunksize=chunksize, dtype=CSV_DTYPES):
+                    chunk = clean_table(table, chunk)
+                    chunk.to_sql(table, conn, if_exists='append', index=False)
+                    conn.commit()
+                    rows += len(chunk)
+            elapsed = time.perf_counter() - start
+            rate = rows / elapsed if elapsed else 0
+            print(f"{table}: {rows} rows in {elapsed:.2f}s ({rate:,.0f} rows/sec)")
+    conn.execute("PRAGMA foreign_keys = ON;")
+    return conn
+
+# ---------- 3b. Parallel load (parse + clean in worker processes) ----------
+def load_parallel(db_path=DB_PATH, workers=None, chunk_bytes=DEFAULT_CHUNK_BYTES, files=CSV_FILES):
+    # every CSV is split into byte ranges; workers parse and clean them while this
+    # process is the only writer, inserting results in table and file order.
+    # At most AHEAD_PER_WORKER chunks per worker are parsed ahead of the writer
+    workers = workers or os.cpu_count()
+    wall = time.perf_counter()
+    tasks = []
+    for table, path in files.items():
+        header_end, ranges = split_csv(path, chunk_bytes)
+        tasks += [(table, path, header_end, start, end) for start, end in ranges]
+    stages = {"split": time.perf_counter() - wall, "read": 0.0, "parse": 0.0, "clean": 0.0,
+              "pack": 0.0, "write": 0.0, "wait": 0.0}
+    rows = dict.fromkeys(files, 0)
+
+    conn = fresh_db(db_path)
+    conn.execute("PRAGMA foreign_keys = OFF;")
+    with load_pragmas(conn, LOAD_PRAGMAS), ProcessPoolExecutor(max_workers=workers) as pool:
+        current = None
+        results = map_ahead(pool, parse_chunk, tasks, AHEAD_PER_WORKER * workers)
+        while True:
+            t0 = time.perf_counter()
+            item = next(results, None)
+            stages["wait"] += time.perf_counter() - t0
+            if item is None:
+                break
+            table, columns, buffers, n, timings = item
+            for stage, seconds in timings.items():
+                stages[stage] += seconds
+            t0 = time.perf_counter()
+            if table != current:
+                conn.commit()  # one transaction per table
+                current = table
+            insert_batches(conn, table, columns, buffer_rows(buffers))
+            rows[table] += n
+            stages["write"] += time.perf_counter() - t0
+        conn.commit()
+    conn.execute("PRAGMA foreign_keys = ON;")
+
+    wall = time.perf_counter() - wall
+    for table, n in rows.items():
+        print(f"{table}: {n} rows")
+    worker_cpu = sum(stages[s] for s in ("read", "parse", "clean", "pack"))
+    print(f"{len(tasks)} chunks on {workers} workers, wall {wall:.2f}s")
+    print("  " + "  ".join(f"{stage} {seconds:.2f}s" for stage, seconds in stages.items()))
+    print(f"  worker stages sum to {worker_cpu:.2f}s; serial estimate {worker_cpu + stages['write']:.2f}s "
+          f"vs {wall:.2f}s wall")
+    return conn
+
+# ---------- 4. Incremental load (upsert changed rows, keep app edits) ----------
+def file_checksum(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def row_hash(*values):
+    # values as SQLite stored them (after column affinity), so a staged CSV row
+    # and the same row loaded by a full build hash alike
+    digest = hashlib.blake2b(repr(values).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+def csv_columns(conn, table, path):
+    # the table's columns the cleaned CSV fills, in table order
+    cleaned = set(clean_table(table, pd.read_csv(path, nrows=0)).columns)
+    return [r[1] for r in conn.execute(f"PRAGMA table_info({table})") if r[1] in cleaned]
+
+def ingest_install(conn):
+    conn.execute(INGEST_STATE_DDL)
+    conn.execute(INGEST_ROWS_DDL)
+    conn.create_function("row_hash", -1, row_hash, deterministic=True)
+
+def save_state(conn, path, checksum, rows):
+    conn.execute("""
+        INSERT INTO ingest_state (File, Checksum, Rows, Loaded_At) VALUES (?, ?, ?, datetime('now'))
+        ON CONFLICT(File) DO UPDATE SET Checksum=excluded.Checksum, Rows=excluded.Rows, Loaded_At=excluded.Loaded_At
+    """, (path, checksum, rows))
+
+def record_baseline(conn, files=CSV_FILES):
+    # right after a rebuild the tables hold exactly the CSVs: remember their
+    # rows so the next incremental sync can tell CSV changes from app edits
+    start = time.perf_counter()
+    ingest_install(conn)
+    with conn:
+        for table, path in files.items():
+            pk = PRIMARY_KEYS[table]
+            cols = ", ".join(csv_columns(conn, table, path))
+            rows = conn.execute(f"INSERT INTO ingest_rows (Tbl, Key, Hash) "
+                                f"SELECT ?, {pk}, row_hash({cols}) FROM {table} WHERE {pk} IS NOT NULL",
+                                (table,)).rowcount
+            save_state(conn, path, file_checksum(path), rows)
+    print(f"sync baseline recorded in {time.perf_counter() - start:.2f}s")
+
+# upserted values that aren't the CSV's as is: a listing's new quantity still
+# has the units its active claims hold taken off, or they'd be claimable twice
+UPSERT_VALUES = {
+    "food_listings": {"Quantity": f"excluded.Quantity - {allocation.held_sql('excluded.Food_ID')}"},
+}
+
+def upsert_sql(table, columns, select):
+    # select: the rows to write, in columns order
+    pk = PRIMARY_KEYS[table]
+    others = [c for c in columns if c != pk]
+    values = {c: UPSERT_VALUES.get(table, {}).get(c, f"excluded.{c}") for c in others}
+    sets = ", ".join(f"{c}={v}" for c, v in values.items())
+    # only touch rows whose values actually differ
+    changed = " OR ".join(f"{table}.{c} IS NOT {v}" for c, v in values.items())
+    return (f"INSERT INTO {table} ({', '.join(columns)}) {select} "
+            f"ON CONFLICT({pk}) DO UPDATE SET {sets} WHERE {changed}")
+
+def load_incremental(db_path=DB_PATH, chunksize=DEFAULT_CHUNKSIZE, files=CSV_FILES):
+    # -> (conn, rows written). Each chunk is staged in a temp table with the
+    # live table's column types and compared with ingest_rows: rows the CSV
+    # changed since the last sync are upserted, new keys inserted, and rows
+    # with no earlier sync to compare with (a database older than ingest_rows)
+    # left as they are
+    conn = sqlite3.connect(db_path)
+    create_tables(conn)
+    ingest_install(conn)
+    conn.execute("PRAGMA foreign_keys = OFF;")
+    total = 0
+    for table, path in files.items():
+        checksum = file_checksum(path)
+        seen = conn.execute("SELECT Checksum FROM ingest_state WHERE File = ?", (path,)).fetchone()
+        if seen and seen[0] == checksum:
+            print(f"{table}: {path} unchanged, skipped")
+            continue
 
-conn.execute("PRAGMA foreign_keys = ON;")  # re-enable
+        start = time.perf_counter()
+        rows = written = skipped = kept = 0
+        pk = PRIMARY_KEYS[table]
+        columns = csv_columns(conn, table, path)
+        cols = ", ".join(columns)
+        baseline = f"SELECT r.Hash FROM ingest_rows r WHERE r.Tbl = '{table}' AND r.Key = s.{pk}"
+        changed = upsert_sql(table, columns, f"SELECT {cols} FROM staged s WHERE ({baseline}) != s.Hash")
+        added = (f"INSERT INTO {table} ({cols}) SELECT {cols} FROM staged s WHERE NOT EXISTS ({baseline}) "
+                 f"ON CONFLICT({pk}) DO NOTHING")
+        with conn:  # one transaction per table, state updated with the data
+            conn.execute("DROP TABLE IF EXISTS temp.staged")
+            conn.execute(f"CREATE TEMP TABLE staged AS SELECT {cols}, 0 AS Hash FROM {table} WHERE 0")
+            for chunk in pd.read_csv(path, chunksize=chunksize, dtype=CSV_DTYPES):
+                chunk = clean_table(table, chunk)
+                rows += len(chunk)
+                keyed = chunk[chunk[pk].notna()][columns]  # rows without a key can't be matched
+                skipped += len(chunk) - len(keyed)
+                conn.execute("DELETE FROM staged")
+                conn.executemany(insert_sql("staged", columns), df_rows(keyed))
+                conn.execute(f"UPDATE staged SET Hash = row_hash({cols})")
+                written += conn.execute(changed).rowcount
+                new = conn.execute(f"SELECT COUNT(*) FROM staged s WHERE NOT EXISTS ({baseline})").fetchone()[0]
+                inserted = conn.execute(added).rowcount
+                written += inserted
+                kept += new - inserted
+                conn.execute(f"INSERT OR REPLACE INTO ingest_rows (Tbl, Key, Hash) "
+                             f"SELECT ?, {pk}, Hash FROM staged", (table,))
+            conn.execute("DROP TABLE temp.staged")
+            save_state(conn, path, checksum, rows)
+        total += written
+        elapsed = time.perf_counter() - start
+        note = f", {skipped} without {pk} skipped" if skipped else ""
+        if kept:
+            note += f", {kept} already in the database with no earlier sync to compare with left as they are"
+        print(f"{table}: {rows} rows read, {written} new/changed written in {elapsed:.2f}s{note}")
+    conn.execute("PRAGMA foreign_keys = ON;")
+    return conn, total
 
-print("Database created & data inserted successfully ✅")
+def run_pipeline(db_path=DB_PATH, mode="full", chunksize=DEFAULT_CHUNKSIZE, loader="bulk",
+                 workers=None, chunk_mb=DEFAULT_CHUNK_BYTES // (1024 * 1024), csv_dir=None,
+                 columnar_dir=columnar.COLUMNAR_DIR, hot_months=archive.HOT_MONTHS):
+    files = csv_files(csv_dir)
+    if mode == "incremental":
+        conn, written = load_incremental(db_path, chunksize, files)
+        if not written:
+            conn.close()
+            print("Nothing to sync: database left as it is ✅")
+            return
+        tune_db(conn, hot_months, rebuild=False)
+        print("Database synced with CSVs ✅")
+    else:
+        if mode == "stream":
+            conn = load_streaming(db_path, chunksize, loader, files)
+        elif mode == "parallel":
+            conn = load_parallel(db_path, workers, chunk_mb * 1024 * 1024, files)
+        else:
+            conn = load_full(db_path, loader, files)
+        record_baseline(conn, files)
+        tune_db(conn, hot_months)
+        print("Database created & data inserted successfully ✅")
+    cities, located = geo.install(conn, geo.cities_file(csv_dir))
+    print(f"{cities} cities, {located} with coordinates")
+    snapshots.install(conn)
+    built = snapshots.refresh(conn)
+    print(f"{len(built)} query snapshots refreshed in {sum(built.values()):.2f}s")
+    if columnar_dir:
+        start = time.perf_counter()
+        manifest = columnar.export(conn, columnar_dir)
+        size = sum(t["bytes"] for t in manifest["tables"].values())
+        print(f"Arrow store written to {columnar_dir}/ ({size / 1e6:.1f} MB) in {time.perf_counter() - start:.2f}s")
+    conn.close()
 
-conn.close()
 
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Clean the CSV exports and load them into SQLite.")
+    parser.add_argument("--db", default=DB_PATH, help="SQLite file to build")
+    parser.add_argument("--mode", choices=["full", "stream", "parallel", "incremental"], default="full",
+                        help="full: rebuild from CSVs in memory; stream: rebuild in chunks; "
+                             "parallel: rebuild with CSV chunks parsed in worker processes; "
+                             "incremental: upsert changed rows into the existing DB")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE,
+                        help="rows per chunk in stream and incremental mode")
+    parser.add_argument("--loader", choices=["bulk", "to_sql"], default="bulk",
+                        help="bulk: executemany in one transaction per table; to_sql: pandas DataFrame.to_sql")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes in parallel mode (default: one per CPU)")
+    parser.add_argument("--chunk-mb", type=int, default=DEFAULT_CHUNK_BYTES // (1024 * 1024),
+                        help="size of the CSV byte ranges handed to each worker in parallel mode")
+    parser.add_argument("--csv-dir", default=None,
+                        help="directory holding the four CSVs (default: the working directory)")
+    parser.add_argument("--columnar-dir", default=columnar.COLUMNAR_DIR,
+                        help="where to write the Arrow copy of the tables for analytics (see columnar.py)")
+    parser.add_argument("--no-columnar", action="store_true", help="skip the Arrow export")
+    parser.add_argument("--hot-months", type=int, default=archive.HOT_MONTHS,
+                        help="months (this one included) whose claims stay in claims; older ones are archived")
+    args = parser.parse_args()
+    run_pipeline(args.db, args.mode, args.chunksize, args.loader, args.workers, args.chunk_mb, args.csv_dir,
+                 None if args.no_columnar else args.columnar_dir, args.hot_months)
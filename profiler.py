@@ -0,0 +1,160 @@
+# profiler.py
+# Statement timings for app.py. run_query / exec_sql (and the claim / batch
+# writes) time every call and record rows returned and result-cache hits;
+# anything else that runs on a session's read connection is counted through
+# sqlite3's trace callback. Totals are kept per statement and per Streamlit
+# rerun, and the first time a statement takes longer than slow_ms its
+# EXPLAIN QUERY PLAN is captured. The report is plain JSON, so profiles from two
+# releases can be compared with `python profiler.py old.json new.json`.
+import argparse
+import json
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+SLOW_MS = 50
+RUNS_KEPT = 50  # most recent reruns, across all sessions
+WHITESPACE = re.compile(r"\s+")
+
+
+def normalize(sql):
+    return WHITESPACE.sub(" ", sql).strip()
+
+def _now():
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+class Profiler:
+    def __init__(self, slow_ms=SLOW_MS, runs_kept=RUNS_KEPT):
+        self.slow_ms = slow_ms
+        self.lock = threading.Lock()
+        self.local = threading.local()  # current run and "inside a timed call", per script thread
+        self.runs = deque(maxlen=runs_kept)
+        self.run_count = 0
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.since = _now()
+            self.statements = {}  # normalized sql -> totals
+            self.runs.clear()
+
+    # ---------- reruns ----------
+    def start_run(self, session):
+        with self.lock:
+            self.run_count += 1
+            run = {"run": self.run_count, "session": session, "started": _now(), "wall_ms": None,
+                   "statements": {}, "_t0": time.perf_counter()}
+            self.runs.append(run)
+        self.local.run = run
+        return run
+
+    def end_run(self):
+        run = getattr(self.local, "run", None)
+        if run is not None:
+            run["wall_ms"] = round((time.perf_counter() - run.pop("_t0")) * 1000, 2)
+            self.local.run = None
+
+    # ---------- recording ----------
+    def _record(self, sql, kind, ms=None, rows=None, cached=False):
+        with self.lock:
+            s = self.statements.setdefault(sql, {"kind": kind, "calls": 0, "cache_hits": 0, "timed": 0,
+                                                 "total_ms": 0.0, "max_ms": 0.0, "rows": 0, "slow": 0,
+                                                 "plan": None})
+            s["calls"] += 1
+            s["cache_hits"] += bool(cached)
+            if ms is not None:
+                s["timed"] += 1
+                s["total_ms"] += ms
+                s["max_ms"] = max(s["max_ms"], ms)
+                s["slow"] += ms >= self.slow_ms
+            s["rows"] += rows or 0
+            run = getattr(self.local, "run", None)
+            if run is not None:
+                r = run["statements"].setdefault(sql, {"kind": kind, "calls": 0, "ms": 0.0, "rows": 0})
+                r["calls"] += 1
+                r["ms"] += ms or 0.0
+                r["rows"] += rows or 0
+            return ms is not None and ms >= self.slow_ms and s["plan"] is None
+
+    @contextmanager
+    def timed(self, sql, kind, params=None, conn=None):
+        # the caller fills info["rows"] / info["cached"]; conn is used for the plan
+        info = {"rows": None, "cached": False}
+        self.local.inside = True
+        start = time.perf_counter()
+        try:
+            yield info
+            ms = (time.perf_counter() - start) * 1000
+            sql = normalize(sql)
+            if self._record(sql, kind, ms, info["rows"], info["cached"]) and conn is not None:
+                plan = self.explain(conn, sql, params)
+                with self.lock:
+                    self.statements[sql]["plan"] = plan
+        finally:
+            self.local.inside = False
+
+    def trace(self, sql):
+        # sqlite3 trace callback for session connections
+        if getattr(self.local, "inside", False):
+            return
+        sql = normalize(sql)
+        if sql and not sql.startswith(("BEGIN", "COMMIT", "ROLLBACK", "EXPLAIN")):
+            self._record(sql, "direct")
+
+    def explain(self, conn, sql, params=None):
+        try:
+            return [r[3] for r in conn.execute("EXPLAIN QUERY PLAN " + sql, tuple(params or ()))]
+        except Exception as e:
+            return [f"(no plan: {e})"]
+
+    # ---------- reporting ----------
+    def report(self):
+        with self.lock:
+            statements = []
+            for sql, s in self.statements.items():
+                avg = s["total_ms"] / s["timed"] if s["timed"] else None
+                statements.append({"sql": sql, **s, "total_ms": round(s["total_ms"], 2),
+                                   "max_ms": round(s["max_ms"], 2), "avg_ms": None if avg is None else round(avg, 3)})
+            statements.sort(key=lambda s: -s["total_ms"])
+            runs = [{**{k: v for k, v in run.items() if not k.startswith("_")},
+                     "statements": [{"sql": sql, **r, "ms": round(r["ms"], 2)}
+                                    for sql, r in run["statements"].items()]}
+                    for run in self.runs]
+            return {"generated_at": _now(), "since": self.since, "slow_ms": self.slow_ms,
+                    "statements": statements, "runs": runs}
+
+    def to_json(self):
+        return json.dumps(self.report(), indent=2)
+
+
+# ---------- comparing two exported profiles ----------
+def regressions(old, new, factor=1.5, min_ms=1.0):
+    # statements whose average time grew by more than factor (and by at least min_ms)
+    before = {s["sql"]: s for s in old["statements"] if s["avg_ms"] is not None}
+    out = []
+    for s in new["statements"]:
+        b = before.get(s["sql"])
+        if b and s["avg_ms"] is not None and s["avg_ms"] > b["avg_ms"] * factor and s["avg_ms"] - b["avg_ms"] >= min_ms:
+            out.append((s["avg_ms"] / max(b["avg_ms"], 1e-9), b["avg_ms"], s["avg_ms"], s["sql"]))
+    return sorted(out, reverse=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare two query profiles exported from the app's Admin tab.")
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--factor", type=float, default=1.5, help="report statements this many times slower")
+    args = parser.parse_args()
+
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    found = regressions(old, new, args.factor)
+    for ratio, before, after, sql in found:
+        print(f"{ratio:5.1f}x  {before:8.2f} ms -> {after:8.2f} ms  {sql[:100]}")
+    print(f"{len(found)} statements slower by more than {args.factor}x")
@@ -0,0 +1,226 @@
+# queries.py
+# SQL shared by app.py and the tooling that studies the app's workload.
+import json
+
+# ---------- Dashboard ----------
+# read the trigger-maintained tables from summary.py instead of scanning the facts
+TOTALS_SQL = "SELECT Name, Value FROM summary_totals"
+
+COMMON_FOOD_TYPES_SQL = """
+    SELECT Food_Type, Cnt as cnt
+    FROM summary_food_types
+    ORDER BY cnt DESC
+    LIMIT 10
+"""
+
+MONTHLY_CLAIMS_SQL = """
+    SELECT Month as month, Cnt as claims_count
+    FROM summary_claims_month
+    ORDER BY month;
+"""
+
+# ---------- Listings ----------
+def distinct_sql(table, column):
+    return f"SELECT DISTINCT {column} FROM {table}"
+
+PROVIDER_ID_BY_NAME_SQL = "SELECT Provider_ID FROM providers WHERE Name = ?"
+# the handful of food types, from the summary table instead of a scan
+FOOD_TYPES_SQL = "SELECT Food_Type FROM summary_food_types WHERE Food_Type IS NOT NULL ORDER BY Food_Type"
+
+def listings_where(city="All", food_type="All", food_name="All", provider_id=None, locations=None):
+    # locations: Location spellings to accept instead of one city (geo.CityIndex.nearby)
+    q = "1=1"
+    params = []
+    if locations is not None:
+        q += " AND Location IN (SELECT value FROM json_each(?))"
+        params.append(json.dumps(sorted(locations)))
+    elif city != "All":
+        q += " AND Location = ?"
+        params.append(city)
+    if food_type != "All":
+        q += " AND Food_Type = ?"
+        params.append(food_type)
+    if food_name != "All":
+        q += " AND Food_Name = ?"
+        params.append(food_name)
+    if provider_id is not None:
+        q += " AND Provider_ID = ?"
+        params.append(provider_id)
+    return q, params
+
+def listings_filter_sql(city="All", food_type="All", food_name="All", provider_id=None, locations=None):
+    where, params = listings_where(city, food_type, food_name, provider_id, locations)
+    return f"SELECT * FROM food_listings WHERE {where}", params
+
+# ---------- Expiring soon ----------
+EXPIRING_COLUMNS = "f.Food_ID, f.Food_Name, f.Quantity, f.Expiry_Date, f.Location, f.Food_Type, f.Meal_Type, f.Provider_ID"
+
+def expiring_sql(city=None):
+    # walks the partial expiry index (per city when one is given) in Expiry_Date
+    # order and stops after LIMIT live listings; a Completed claim takes a
+    # listing out of the queue. Params: window start, window end, [city,] limit.
+    q = f"""
+        SELECT {EXPIRING_COLUMNS}
+        FROM food_listings f
+        WHERE f.Quantity > 0 AND f.Expiry_Date >= ? AND f.Expiry_Date <= ?"""
+    if city:
+        q += " AND f.Location = ?"
+    return q + """
+          AND NOT EXISTS (SELECT 1 FROM claims c WHERE c.Food_ID = f.Food_ID AND c.Status = 'Completed')
+          AND NOT EXISTS (SELECT 1 FROM claims_archive a WHERE a.Food_ID = f.Food_ID AND a.Status = 'Completed')
+        ORDER BY f.Expiry_Date, f.Food_ID
+        LIMIT ?"""
+
+# ---------- Claims ----------
+# every claim, archived months included (archive.py)
+CLAIMS_VIEW_SQL = """
+    SELECT c.Claim_ID, c.Food_ID, f.Food_Name, c.Receiver_ID, r.Name as Receiver_Name, c.Status, c.Timestamp
+    FROM claims_history c
+    LEFT JOIN food_listings f ON c.Food_ID = f.Food_ID
+    LEFT JOIN receivers r ON c.Receiver_ID = r.Receiver_ID
+    ORDER BY c.Timestamp DESC
+"""
+
+# ---------- Paginated grids ----------
+# select / source / key feed pagination.page_sql; "sortable" maps the label shown
+# in the UI to the SQL expression rows are ordered by. count_source is what
+# COUNT(*) runs over (the claims LEFT JOINs never change the row count).
+GRIDS = {
+    "food_listings": {
+        "select": "*",
+        "source": "food_listings",
+        "key": "Food_ID",
+        "sortable": {c: c for c in ["Food_ID", "Food_Name", "Quantity", "Expiry_Date", "Provider_ID",
+                                    "Provider_Type", "Location", "Food_Type", "Meal_Type"]},
+    },
+    "providers": {
+        "select": "*",
+        "source": "providers",
+        "key": "Provider_ID",
+        "sortable": {c: c for c in ["Provider_ID", "Name", "Type", "Address", "City", "Contact"]},
+    },
+    "receivers": {
+        "select": "*",
+        "source": "receivers",
+        "key": "Receiver_ID",
+        "sortable": {c: c for c in ["Receiver_ID", "Name", "Type", "City", "Contact"]},
+    },
+    "claims": {
+        "select": "c.Claim_ID, c.Food_ID, f.Food_Name, c.Receiver_ID, r.Name as Receiver_Name, c.Status, c.Timestamp",
+        "source": """claims c
+            LEFT JOIN food_listings f ON c.Food_ID = f.Food_ID
+            LEFT JOIN receivers r ON c.Receiver_ID = r.Receiver_ID""",
+        "count_source": "claims c",
+        "key": "c.Claim_ID",
+        "sortable": {"Timestamp": "c.Timestamp", "Claim_ID": "c.Claim_ID", "Food_ID": "c.Food_ID",
+                     "Food_Name": "f.Food_Name", "Receiver_ID": "c.Receiver_ID",
+                     "Receiver_Name": "r.Name", "Status": "c.Status"},
+        "descending": True,
+    },
+}
+# the closed months (archive.py), same columns
+GRIDS["claims_archive"] = {**GRIDS["claims"], "count_source": "claims_archive c",
+                           "source": GRIDS["claims"]["source"].replace("claims c", "claims_archive c", 1)}
+
+# ---------- Queries tab ----------
+# Claim statistics cover all history: the hot claims plus the closed months'
+# counts in claims_rollup (archive.py), never the archive's rows. derived_*
+# tables are kept from the change log (changelog.py).
+PREDEFINED_QUERIES = {
+    "1 Providers & receivers per city": """
+        SELECT City,
+               SUM(CASE WHEN Kind = 'providers' AND City IS NOT NULL THEN Cnt ELSE 0 END) as providers_count,
+               SUM(CASE WHEN Kind = 'receivers' AND City IS NOT NULL THEN Cnt ELSE 0 END) as receivers_count
+        FROM summary_cities
+        WHERE Kind IN ('providers', 'receivers')
+        GROUP BY City;
+    """,
+    "2 Top provider type by count": """
+        SELECT Type, COUNT(*) as cnt
+        FROM providers
+        GROUP BY Type
+        ORDER BY cnt DESC;
+    """,
+    "3 Provider contacts by city (parameterized)": "SELECT Name, Contact, Address, City FROM providers WHERE City = ?;",
+    "4 Receivers who claimed the most": """
+        SELECT r.Receiver_ID, r.Name,
+               COUNT(c.Claim_ID)
+                   + IFNULL((SELECT SUM(x.Cnt) FROM claims_rollup x WHERE x.Receiver_ID = r.Receiver_ID), 0)
+                   as claims_count
+        FROM receivers r
+        LEFT JOIN claims c ON r.Receiver_ID = c.Receiver_ID
+        GROUP BY r.Receiver_ID
+        ORDER BY claims_count DESC;
+    """,
+    "5 Total quantity available": "SELECT Value as total_quantity FROM summary_totals WHERE Name = 'quantity';",
+    "6 City with highest listings": """
+        SELECT City, Cnt as listings_count
+        FROM summary_cities
+        WHERE Kind = 'food_listings'
+        ORDER BY listings_count DESC;
+    """,
+    "7 Most common food types": """
+        SELECT Food_Type, Cnt as cnt
+        FROM summary_food_types
+        ORDER BY cnt DESC;
+    """,
+    "8 Claims per food item": """
+        SELECT f.Food_ID, f.Food_Name,
+               COUNT(c.Claim_ID) + IFNULL((SELECT SUM(x.Cnt) FROM claims_rollup x WHERE x.Food_ID = f.Food_ID), 0)
+                   as claim_count
+        FROM food_listings f
+        LEFT JOIN claims c ON f.Food_ID = c.Food_ID
+        GROUP BY f.Food_ID
+        ORDER BY claim_count DESC;
+    """,
+    "9 Provider with most successful claims": """
+        SELECT p.Provider_ID, p.Name,
+               SUM(CASE WHEN c.Status = 'Completed' THEN 1 ELSE 0 END)
+                   + IFNULL((SELECT SUM(x.Cnt) FROM food_listings g JOIN claims_rollup x ON x.Food_ID = g.Food_ID
+                             WHERE g.Provider_ID = p.Provider_ID AND x.Status = 'Completed'), 0) as completed_claims
+        FROM providers p
+        LEFT JOIN food_listings f ON p.Provider_ID = f.Provider_ID
+        LEFT JOIN claims c ON f.Food_ID = c.Food_ID
+        GROUP BY p.Provider_ID
+        ORDER BY completed_claims DESC;
+    """,
+    "10 Claims status percentage": """
+        SELECT Status, Cnt * 1.0 / (SELECT SUM(Cnt) FROM derived_claim_status) * 100 as pct
+        FROM derived_claim_status
+        ORDER BY Status;
+    """,
+    "11 Avg quantity claimed per receiver": """
+        SELECT r.Receiver_ID, r.Name,
+               SUM(c.Cnt * f.Quantity) * 1.0 / SUM(CASE WHEN f.Quantity IS NOT NULL THEN c.Cnt END)
+                   as avg_quantity_claimed
+        FROM receivers r
+        JOIN claims_counts c ON r.Receiver_ID = c.Receiver_ID
+        JOIN food_listings f ON c.Food_ID = f.Food_ID
+        GROUP BY r.Receiver_ID
+        ORDER BY avg_quantity_claimed DESC;
+    """,
+    "12 Most claimed meal type": """
+        SELECT f.Meal_Type, SUM(c.Cnt) as claim_count
+        FROM food_listings f
+        JOIN claims_counts c ON f.Food_ID = c.Food_ID
+        GROUP BY f.Meal_Type
+        ORDER BY claim_count DESC;
+    """,
+    "13 Total quantity donated per provider": """
+        SELECT p.Provider_ID, p.Name, CASE WHEN d.Counted > 0 THEN d.Total END as total_donated
+        FROM providers p
+        LEFT JOIN derived_provider_donated d ON p.Provider_ID = d.Provider_ID
+        ORDER BY total_donated DESC;
+    """,
+    "14 Monthly claims trend": """
+        SELECT Month as month, Cnt as claims_count
+        FROM summary_claims_month
+        ORDER BY month;
+    """,
+    "15 Expired items still available": """
+        SELECT Food_ID, Food_Name, Quantity, Expiry_Date, Location
+        FROM food_listings
+        WHERE Expiry_Date IS NOT NULL AND DATE(Expiry_Date) < DATE('now') AND Quantity > 0;
+    """
+}
+
@@ -0,0 +1,283 @@
+# records.py
+# Compact in-memory rows for long-lived in-process indexes (matching.Matcher),
+# where a DataFrame or a tuple per row costs hundreds of bytes in Python
+# objects. A Store keeps one table struct-of-arrays style:
+#
+#   int       array('q'), NULL as a sentinel
+#   category  array('I') of codes into a Dictionary shared by the stores, so
+#             every city / type / status / date spelling exists once
+#   text      one UTF-8 bytearray plus a start offset and length per row
+#
+# Rows are appended straight from a cursor in fetchmany batches, so no
+# per-row objects outlive the batch; sqlite3 hands out Python values one by
+# one, which is as close to zero-copy as the stdlib driver gets. Slots of
+# deleted rows are reused. row(slot) gives a tuple, record(slot) one of the
+# __slots__ classes below, and column(name) bulk-iterates a decoded column.
+# columnar.py is the read-only Arrow counterpart for analytics.
+import sys
+from array import array
+
+NULL_INT = -(2 ** 63)
+BATCH_ROWS = 10_000
+
+SCHEMAS = {
+    "providers": [("Provider_ID", "int"), ("Name", "text"), ("Type", "category"), ("Address", "text"),
+                  ("City", "category"), ("Contact", "text")],
+    "receivers": [("Receiver_ID", "int"), ("Name", "text"), ("Type", "category"), ("City", "category"),
+                  ("Contact", "text")],
+    "food_listings": [("Food_ID", "int"), ("Food_Name", "category"), ("Quantity", "int"),
+                      ("Expiry_Date", "category"), ("Provider_ID", "int"), ("Provider_Type", "category"),
+                      ("Location", "category"), ("Food_Type", "category"), ("Meal_Type", "category")],
+    "claims": [("Claim_ID", "int"), ("Food_ID", "int"), ("Receiver_ID", "int"), ("Status", "category"),
+               ("Timestamp", "text"), ("Claimed_Quantity", "int")],
+}
+
+
+# ---------- records ----------
+class Record:
+    __slots__ = ()
+
+    def __init__(self, *values, **named):
+        for field, value in zip(self.__slots__, values):
+            setattr(self, field, value)
+        for field in self.__slots__[len(values):]:
+            setattr(self, field, named.get(field))
+
+    def __iter__(self):
+        return (getattr(self, f) for f in self.__slots__)
+
+    def __eq__(self, other):
+        return type(self) is type(other) and tuple(self) == tuple(other)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({', '.join(f'{f}={getattr(self, f)!r}' for f in self.__slots__)})"
+
+class Provider(Record):
+    __slots__ = tuple(c for c, _ in SCHEMAS["providers"])
+
+class Receiver(Record):
+    __slots__ = tuple(c for c, _ in SCHEMAS["receivers"])
+
+class FoodListing(Record):
+    __slots__ = tuple(c for c, _ in SCHEMAS["food_listings"])
+
+class Claim(Record):
+    __slots__ = tuple(c for c, _ in SCHEMAS["claims"])
+
+RECORDS = {"providers": Provider, "receivers": Receiver, "food_listings": FoodListing, "claims": Claim}
+
+
+# ---------- columns ----------
+class Dictionary:
+    # string <-> code; code 0 is NULL. Values are interned, so a string the
+    # index keys on elsewhere (a city key, a type) is the same object
+    def __init__(self):
+        self.values = [None]
+        self.codes = {None: 0}
+
+    def encode(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(sys.intern(value) if isinstance(value, str) else value)
+        return code
+
+    def intern(self, value):
+        return self.values[self.encode(value)]
+
+    def nbytes(self):
+        return (sys.getsizeof(self.values) + sys.getsizeof(self.codes)
+                + sum(sys.getsizeof(v) for v in self.values[1:]))
+
+    def __len__(self):
+        return len(self.values) - 1
+
+class IntColumn:
+    def __init__(self):
+        self.data = array("q")
+
+    def extend(self, values):
+        try:
+            batch = array("q", [NULL_INT if v is None else v for v in values])
+        except TypeError:  # a float or numeric text that SQLite's affinity left as is
+            batch = array("q", [NULL_INT if v is None else int(v) for v in values])
+        self.data.extend(batch)
+
+    def append(self, value):
+        self.data.append(NULL_INT if value is None else int(value))
+
+    def set(self, slot, value):
+        self.data[slot] = NULL_INT if value is None else int(value)
+
+    def get(self, slot):
+        v = self.data[slot]
+        return None if v == NULL_INT else v
+
+    def __iter__(self):
+        return (None if v == NULL_INT else v for v in self.data)
+
+    def nbytes(self):
+        return self.data.itemsize * len(self.data)
+
+class CategoryColumn:
+    def __init__(self, dictionary):
+        self.dictionary = dictionary
+        self.codes = array("I")
+
+    def extend(self, values):
+        known, encode = self.dictionary.codes.get, self.dictionary.encode
+        self.codes.extend([c if (c := known(v)) is not None else encode(v) for v in values])
+
+    def append(self, value):
+        self.codes.append(self.dictionary.encode(value))
+
+    def set(self, slot, value):
+        self.codes[slot] = self.dictionary.encode(value)
+
+    def get(self, slot):
+        return self.dictionary.values[self.codes[slot]]
+
+    def __iter__(self):
+        values = self.dictionary.values
+        return (values[c] for c in self.codes)
+
+    def nbytes(self):
+        return self.codes.itemsize * len(self.codes)
+
+class TextColumn:
+    # a changed value is appended; the old bytes stay until the store is reloaded
+    def __init__(self):
+        self.blob = bytearray()
+        self.starts = array("q")
+        self.lengths = array("i")  # -1: NULL
+
+    def _add(self, value):
+        if value is None:
+            return 0, -1
+        data = str(value).encode("utf-8")
+        start = len(self.blob)
+        self.blob += data
+        return start, len(data)
+
+    def extend(self, values):
+        data = [None if v is None else str(v).encode("utf-8") for v in values]
+        start = len(self.blob)
+        for d in data:
+            self.starts.append(start)
+            if d is not None:
+                start += len(d)
+        self.lengths.extend([-1 if d is None else len(d) for d in data])
+        self.blob += b"".join(d for d in data if d is not None)
+
+    def append(self, value):
+        start, length = self._add(value)
+        self.starts.append(start)
+        self.lengths.append(length)
+
+    def set(self, slot, value):
+        self.starts[slot], self.lengths[slot] = self._add(value)
+
+    def get(self, slot):
+        start, length = self.starts[slot], self.lengths[slot]
+        return None if length < 0 else self.blob[start:start + length].decode("utf-8")
+
+    def __iter__(self):
+        blob = self.blob
+        return (None if n < 0 else blob[s:s + n].decode("utf-8") for s, n in zip(self.starts, self.lengths))
+
+    def nbytes(self):
+        return len(self.blob) + (self.starts.itemsize + self.lengths.itemsize) * len(self.starts)
+
+
+class Store:
+    def __init__(self, table, columns=None, dictionary=None):
+        spec = dict(SCHEMAS[table])
+        self.table = table
+        self.names = list(columns or spec)
+        self.dictionary = Dictionary() if dictionary is None else dictionary
+        self.columns = {}
+        for name in self.names:
+            kind = spec[name]
+            self.columns[name] = (IntColumn() if kind == "int" else TextColumn() if kind == "text"
+                                  else CategoryColumn(self.dictionary))
+        self.size = 0    # slots in use or free
+        self.free = []   # slots of deleted rows, reused first
+        self.dead = set()
+
+    @classmethod
+    def load(cls, conn, table, columns=None, dictionary=None, where="", params=()):
+        store = cls(table, columns, dictionary)
+        return store.extend(conn.execute(f"SELECT {', '.join(store.names)} FROM {table} {where}", params))
+
+    def extend(self, rows):
+        # appends a cursor's rows (fetched in batches) or a list of tuples in
+        # self.names order -> self. Each batch goes in column by column
+        fetch = getattr(rows, "fetchmany", None)
+        for batch in iter(lambda: fetch(BATCH_ROWS), []) if fetch else [list(rows)]:
+            for column, values in zip(self.columns.values(), zip(*batch)):
+                column.extend(values)
+            self.size += len(batch)
+        return self
+
+    # ---------- single rows ----------
+    def append(self, row):
+        # -> slot
+        if self.free:
+            slot = self.free.pop()
+            self.dead.discard(slot)
+            for column, value in zip(self.columns.values(), row):
+                column.set(slot, value)
+            return slot
+        for column, value in zip(self.columns.values(), row):
+            column.append(value)
+        self.size += 1
+        return self.size - 1
+
+    def replace(self, slot, row):
+        for column, value in zip(self.columns.values(), row):
+            column.set(slot, value)
+
+    def delete(self, slot):
+        if slot not in self.dead:
+            self.dead.add(slot)
+            self.free.append(slot)
+
+    def row(self, slot):
+        return tuple(column.get(slot) for column in self.columns.values())
+
+    def record(self, slot):
+        return RECORDS[self.table](**dict(zip(self.names, self.row(slot))))
+
+    def get(self, slot, name):
+        return self.columns[name].get(slot)
+
+    # ---------- bulk ----------
+    def __len__(self):
+        return self.size - len(self.free)
+
+    def slots(self):
+        return (s for s in range(self.size) if s not in self.dead) if self.dead else iter(range(self.size))
+
+    def column(self, name):
+        # decoded values of one column, in slot order, deleted rows skipped
+        values = iter(self.columns[name])
+        if not self.dead:
+            return values
+        return (v for s, v in enumerate(values) if s not in self.dead)
+
+    def rows(self):
+        # every live row as a tuple, decoded column-wise
+        rows = zip(*(iter(c) for c in self.columns.values()))
+        if not self.dead:
+            return rows
+        return (r for s, r in enumerate(rows) if s not in self.dead)
+
+    def __iter__(self):
+        cls = RECORDS[self.table]
+        if self.names == list(cls.__slots__):
+            return (cls(*r) for r in self.rows())
+        return (cls(**dict(zip(self.names, r))) for r in self.rows())
+
+    def nbytes(self):
+        # the arrays only; the shared dictionary is counted once by its owner
+        return sum(c.nbytes() for c in self.columns.values())
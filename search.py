@@ -0,0 +1,182 @@
+# search.py
+# Full-text search over listings, providers and receivers. Each table gets an
+# external-content FTS5 index (the text lives only in the base table) kept in
+# step by triggers, with 2- and 3-character prefix indexes so "as you type"
+# prefix queries stay index lookups. A word that matches nothing is swapped for
+# indexed terms within one or two edits of it, read from an fts5vocab table.
+import re
+import unicodedata
+
+import pandas as pd
+
+# table -> (key column, indexed columns, bm25 weight per column)
+INDEXED = {
+    "food_listings": ("Food_ID", ["Food_Name", "Location", "Food_Type", "Meal_Type", "Provider_Type"],
+                      [10.0, 5.0, 2.0, 2.0, 1.0]),
+    "providers": ("Provider_ID", ["Name", "Type", "Address", "City"], [10.0, 1.0, 2.0, 5.0]),
+    "receivers": ("Receiver_ID", ["Name", "Type", "City"], [10.0, 1.0, 5.0]),
+}
+TOKENIZE = "unicode61 remove_diacritics 2"
+FUZZY_CANDIDATES = 5  # corrections kept per misspelt word, most common first
+# bm25 has to score every match before ORDER BY can pick the best ones, which
+# is ~250 ms for a word found in 100k rows. Past this many matches only the
+# newest (highest rowid) are ranked.
+RANK_WINDOW = 1000
+WORD = re.compile(r"\w+")
+
+
+def fts(table):
+    return f"{table}_fts"
+
+def vocab(table):
+    return f"{table}_fts_vocab"
+
+def schema_sql(table):
+    key, columns, weights = INDEXED[table]
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts(table)} USING fts5({', '.join(columns)}, "
+        f"content='{table}', content_rowid='{key}', tokenize='{TOKENIZE}', prefix='2 3')",
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {vocab(table)} USING fts5vocab({fts(table)}, row)",
+    ]
+
+def trigger_sql(table):
+    # the documented external-content pattern: 'delete' needs the old values.
+    # Updates only reindex when an indexed column (or the key) changes, so stock
+    # changes from claims don't touch the index.
+    key, columns, _ = INDEXED[table]
+    cols = ", ".join(columns)
+    new = ", ".join(f"new.{c}" for c in columns)
+    old = ", ".join(f"old.{c}" for c in columns)
+    name = fts(table)
+    return [
+        f"""CREATE TRIGGER IF NOT EXISTS trg_fts_{table}_ins AFTER INSERT ON {table} BEGIN
+            INSERT INTO {name} (rowid, {cols}) VALUES (new.{key}, {new});
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_fts_{table}_del AFTER DELETE ON {table} BEGIN
+            INSERT INTO {name} ({name}, rowid, {cols}) VALUES ('delete', old.{key}, {old});
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_fts_{table}_upd AFTER UPDATE OF {key}, {cols} ON {table} BEGIN
+            INSERT INTO {name} ({name}, rowid, {cols}) VALUES ('delete', old.{key}, {old});
+            INSERT INTO {name} (rowid, {cols}) VALUES (new.{key}, {new});
+        END""",
+    ]
+
+def rebuild(conn):
+    with conn:
+        for table in INDEXED:
+            conn.execute(f"INSERT INTO {fts(table)} ({fts(table)}) VALUES ('rebuild')")
+
+def install(conn, force_rebuild=False):
+    # idempotent, like summary.install: a database without the index gets it
+    # built once; the pipeline forces a rebuild after every load
+    fresh = conn.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'trg_fts_%'"
+    ).fetchone()[0] == 0
+    with conn:
+        for table in INDEXED:
+            for ddl in schema_sql(table) + trigger_sql(table):
+                conn.execute(ddl)
+    if fresh or force_rebuild:
+        rebuild(conn)
+
+# ---------- query building ----------
+def fold(text):
+    # what the unicode61 tokenizer does to a word: lower case, no diacritics
+    text = unicodedata.normalize("NFKD", text.lower())
+    return "".join(ch for ch in text if not unicodedata.combining(ch))
+
+def words(text):
+    return WORD.findall(fold(text or ""))
+
+def edit_distance(a, b, limit):
+    # Levenshtein plus swapped neighbours ("riec" -> "rice" is one edit), giving
+    # up (returns limit + 1) once no alignment can come back under limit
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before, prev = None, list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            d = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb))
+            if before and i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                d = min(d, before[j - 2] + 1)
+            cur.append(d)
+        if min(cur) > limit and min(prev) > limit:
+            return limit + 1
+        before, prev = prev, cur
+    return prev[-1]
+
+def _found(conn, table, word):
+    # cheaper than asking fts5vocab, which counts every document per term
+    return conn.execute(f"SELECT 1 FROM {fts(table)} WHERE {fts(table)} MATCH ? LIMIT 1",
+                        (f'"{word}"*',)).fetchone() is not None
+
+def corrections(conn, table, word):
+    # indexed terms close to an unknown word. Only terms with the same first
+    # letter are read, so the vocab lookup stays a range scan.
+    limit = 1 if len(word) <= 5 else 2
+    rows = conn.execute(f"SELECT term, doc FROM {vocab(table)} WHERE term >= ? AND term < ?",
+                        (word[0], word[0] + "\uffff"))
+    close = [(edit_distance(word, term, limit), -doc, term) for term, doc in rows
+             if abs(len(term) - len(word)) <= limit]
+    return [term for d, _, term in sorted(close) if d <= limit][:FUZZY_CANDIDATES]
+
+def match_expression(conn, table, text, column=None, fuzzy=True):
+    # -> (FTS5 MATCH expression or None, {word: [corrections used]}).
+    # Every word must match; each is a prefix query ("ric" finds "rice").
+    parts, fixed = [], {}
+    for word in words(text):
+        alternatives = [f'"{word}"*']
+        if fuzzy and len(word) > 2 and not _found(conn, table, word):
+            found = corrections(conn, table, word)
+            if found:
+                fixed[word] = found
+                alternatives = [f'"{term}"' for term in found]
+        parts.append(alternatives[0] if len(alternatives) == 1 else f"({' OR '.join(alternatives)})")
+    if not parts:
+        return None, fixed
+    expr = " AND ".join(parts)
+    if column:
+        expr = f"{{{column}}} : ({expr})"
+    return expr, fixed
+
+# ---------- searching ----------
+def window_sql(table):
+    # rowid of the RANK_WINDOW-th newest match, if there are that many
+    return f"SELECT rowid FROM {fts(table)} WHERE {fts(table)} MATCH ? ORDER BY rowid DESC LIMIT 1 OFFSET ?"
+
+def search_sql(table):
+    # rank inside the index first, then fetch only the rows that made the cut.
+    # Params: match expression, lowest rowid to rank, limit.
+    key, _, weights = INDEXED[table]
+    bm25 = f"bm25({fts(table)}, {', '.join(str(w) for w in weights)})"
+    return f"""
+        SELECT t.*, s.Rank
+        FROM (SELECT rowid, {bm25} AS Rank FROM {fts(table)} WHERE {fts(table)} MATCH ? AND rowid >= ?
+              ORDER BY Rank LIMIT ?) s
+        JOIN {table} t ON t.{key} = s.rowid
+        ORDER BY s.Rank"""
+
+def search_query(conn, table, text, limit=50, column=None, fuzzy=True):
+    # -> (sql, params, {word: corrections}); sql is None when there is nothing to match
+    expr, fixed = match_expression(conn, table, text, column, fuzzy)
+    if expr is None:
+        return None, (), fixed
+    row = conn.execute(window_sql(table), (expr, RANK_WINDOW - 1)).fetchone()
+    floor = row[0] if row else -2 ** 63
+    return search_sql(table), (expr, floor, limit), fixed
+
+def search(conn, table, text, limit=50, column=None, fuzzy=True):
+    # -> (DataFrame of the best `limit` rows, best first, {word: corrections})
+    sql, params, fixed = search_query(conn, table, text, limit, column, fuzzy)
+    if sql is None:
+        return pd.DataFrame(), fixed
+    return pd.read_sql_query(sql, conn, params=params), fixed
+
+def search_values(conn, table, column, text, limit=50):
+    # distinct values of one indexed column among the best hits on that column,
+    # for narrowing a dropdown to what was typed
+    df, _ = search(conn, table, text, limit * 4, column=column)
+    if df.empty:
+        return []
+    return list(dict.fromkeys(v for v in df[column] if v))[:limit]
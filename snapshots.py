@@ -0,0 +1,180 @@
+# snapshots.py
+# Pre-computed results for the predefined queries. Each snapshot records the
+# version of every fact table it was built from; triggers bump those versions
+# on every write, so a refresh only recomputes the snapshots whose sources moved.
+# Parameterized queries can't be pre-computed and always run live. The
+# refresher also moves changelog.py's derived tables forward before each pass.
+import io
+import json
+import threading
+import time
+
+import pandas as pd
+
+import changelog
+from db import tables_read
+from queries import PREDEFINED_QUERIES
+from summary import DERIVED
+
+FACT_TABLES = list(DERIVED)
+REFRESH_INTERVAL = 600  # seconds; also picks up pipeline runs and date-dependent queries
+
+SNAPSHOT_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS table_versions (
+        Name TEXT PRIMARY KEY,
+        Version INTEGER NOT NULL DEFAULT 0
+    )""",
+    """CREATE TABLE IF NOT EXISTS query_snapshots (
+        Name TEXT PRIMARY KEY,
+        Generation INTEGER NOT NULL,
+        Sources TEXT NOT NULL,
+        Built_At TEXT NOT NULL,
+        Seconds REAL,
+        Result TEXT NOT NULL
+    )""",
+]
+
+
+def trigger_sql():
+    return [f"""CREATE TRIGGER IF NOT EXISTS trg_version_{table}_{event.lower()} AFTER {event} ON {table}
+    BEGIN
+        UPDATE table_versions SET Version = Version + 1 WHERE Name = '{table}';
+    END""" for table in FACT_TABLES for event in ("INSERT", "UPDATE", "DELETE")]
+
+def install(conn):
+    with conn:
+        for ddl in SNAPSHOT_SCHEMA + trigger_sql():
+            conn.execute(ddl)
+        conn.executemany("INSERT OR IGNORE INTO table_versions (Name) VALUES (?)",
+                         [(t,) for t in FACT_TABLES])
+
+def snapshot_queries():
+    return {name: sql for name, sql in PREDEFINED_QUERIES.items() if "?" not in sql}
+
+def sources(sql):
+    # fact tables a query depends on; summary and derived tables map back to the facts behind them
+    found = set()
+    for t in tables_read(sql):
+        if t in DERIVED:
+            found.add(t)
+        elif t in changelog.VIEWS:
+            found |= set(changelog.VIEWS[t]["sources"])
+        else:
+            found |= {fact for fact, derived in DERIVED.items() if t in derived}
+    return sorted(found)
+
+def versions(conn):
+    return dict(conn.execute("SELECT Name, Version FROM table_versions").fetchall())
+
+def _is_stale(sql, stored_sources, built_at, current, today):
+    if json.loads(stored_sources) != {t: current.get(t, 0) for t in sources(sql)}:
+        return True
+    # e.g. "expired items" compares against DATE('now'), so it goes stale at midnight
+    return "'now'" in sql and built_at[:10] != today
+
+def stale(conn, queries=None):
+    queries = queries or snapshot_queries()
+    current = versions(conn)
+    today = conn.execute("SELECT date('now')").fetchone()[0]
+    built = {row[0]: row[1:] for row in conn.execute("SELECT Name, Sources, Built_At FROM query_snapshots")}
+    return [name for name, sql in queries.items()
+            if name not in built or _is_stale(sql, *built[name], current, today)]
+
+# ---------- build / store ----------
+def build(conn, sql):
+    # versions and result come from the same read transaction, so a write that
+    # lands mid-build leaves the snapshot marked stale instead of mislabelled
+    own = not conn.in_transaction
+    if own:
+        conn.execute("BEGIN")
+    try:
+        current = versions(conn)
+        lagging = changelog.behind(conn, tables_read(sql))
+        start = time.perf_counter()
+        df = pd.read_sql_query(sql, conn)
+        seconds = time.perf_counter() - start
+    finally:
+        if own:
+            conn.commit()
+    srcs = {t: current.get(t, 0) for t in sources(sql)}
+    if lagging:
+        # a derived table that hasn't caught up with the log: store it as stale
+        srcs = dict.fromkeys(srcs)
+    return srcs, df, seconds
+
+def store(conn, name, generation, srcs, df, seconds):
+    conn.execute("""
+        INSERT INTO query_snapshots (Name, Generation, Sources, Built_At, Seconds, Result)
+        VALUES (?, ?, ?, datetime('now'), ?, ?)
+        ON CONFLICT(Name) DO UPDATE SET Generation=excluded.Generation, Sources=excluded.Sources,
+            Built_At=excluded.Built_At, Seconds=excluded.Seconds, Result=excluded.Result
+    """, (name, generation, json.dumps(srcs), seconds, df.to_json(orient="split", index=False)))
+
+def refresh(conn, force=False, transaction=None):
+    # recompute stale snapshots on conn; each result is written inside
+    # transaction() (defaults to a plain commit on conn). Returns name -> seconds.
+    transaction = transaction or (lambda: conn)
+    queries = snapshot_queries()
+    names = list(queries) if force else stale(conn, queries)
+    if not names:
+        return {}
+    generation = conn.execute("SELECT IFNULL(MAX(Generation), 0) + 1 FROM query_snapshots").fetchone()[0]
+    built = {}
+    for name in names:
+        srcs, df, seconds = build(conn, queries[name])
+        with transaction() as w:
+            store(w, name, generation, srcs, df, seconds)
+        built[name] = seconds
+    return built
+
+def load(conn, name):
+    # the stored result plus whether it still matches the source tables; None if never built
+    row = conn.execute("SELECT Generation, Sources, Built_At, Result FROM query_snapshots WHERE Name = ?",
+                       (name,)).fetchone()
+    if row is None or name not in snapshot_queries():
+        return None
+    generation, srcs, built_at, result = row
+    today = conn.execute("SELECT date('now')").fetchone()[0]
+    return {
+        "df": pd.read_json(io.StringIO(result), orient="split", dtype=False, convert_dates=False),
+        "generation": generation,
+        "built_at": built_at,
+        "fresh": not _is_stale(PREDEFINED_QUERIES[name], srcs, built_at, versions(conn), today),
+    }
+
+
+class Refresher:
+    # background thread that rebuilds stale snapshots; request() wakes it and
+    # requests made while a refresh is running collapse into one more pass
+    def __init__(self, db, interval=REFRESH_INTERVAL):
+        self.db = db
+        self.interval = interval
+        self.wake = threading.Event()
+        self.last = {}
+        self.error = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def request(self):
+        self.wake.set()
+
+    def _run(self):
+        conn, generation = self.db.reader(), self.db.generation
+        while True:
+            self.wake.wait(self.interval)
+            self.wake.clear()
+            if generation != self.db.generation:  # the file was swapped (jobs.py)
+                conn.close()
+                conn, generation = self.db.reader(), self.db.generation
+            try:
+                with self.db.transaction(*changelog.VIEWS) as w:
+                    changelog.catch_up(w)
+                    changelog.prune(w)
+                built = refresh(conn, transaction=lambda: self.db.transaction("query_snapshots"))
+                if built:
+                    self.last = built
+                self.error = None
+            except Exception as e:
+                if conn.in_transaction:
+                    conn.rollback()
+                self.error = e
@@ -0,0 +1,159 @@
+# summary.py
+# Materialized aggregates for the Dashboard and sidebar, kept current by
+# triggers on the fact tables so every write path (app forms, incremental
+# pipeline runs, batch jobs) updates them by +/- one row.
+#
+#   summary_totals       row counts per table, plus the food quantity total
+#   summary_food_types   listings per Food_Type
+#   summary_cities       providers / receivers / listings per city
+#   summary_claims_month claims per substr(Timestamp, 1, 7)
+#
+# Claims count wherever they live: moving one into claims_archive (archive.py)
+# adds it there as it is taken off claims.
+
+SUMMARY_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS summary_totals (
+        Name TEXT PRIMARY KEY,
+        Value INTEGER NOT NULL DEFAULT 0
+    )""",
+    """CREATE TABLE IF NOT EXISTS summary_food_types (
+        Food_Type TEXT UNIQUE,
+        Cnt INTEGER NOT NULL DEFAULT 0
+    )""",
+    """CREATE TABLE IF NOT EXISTS summary_cities (
+        Kind TEXT NOT NULL,
+        City TEXT,
+        Cnt INTEGER NOT NULL DEFAULT 0,
+        UNIQUE (Kind, City)
+    )""",
+    """CREATE TABLE IF NOT EXISTS summary_claims_month (
+        Month TEXT PRIMARY KEY,
+        Cnt INTEGER NOT NULL DEFAULT 0
+    )""",
+]
+
+# fact table -> summary tables its triggers write (used for cache invalidation)
+DERIVED = {
+    "providers": {"summary_totals", "summary_cities"},
+    "receivers": {"summary_totals", "summary_cities"},
+    "food_listings": {"summary_totals", "summary_food_types", "summary_cities"},
+    "claims": {"summary_totals", "summary_claims_month", "claims_history", "claims_counts",
+               "claims_archive", "claims_rollup", "archived_months"},
+}
+# (archive.py's tables only change when claims do: compact() moves them there,
+# and claims_history / claims_counts are views over claims plus the archive)
+
+
+def _bump(table, keys, delta):
+    # NULL-safe "upsert then add": UNIQUE treats NULLs as distinct, so look the
+    # group up with IS instead of relying on ON CONFLICT. Empty groups are
+    # dropped to match what a GROUP BY over the fact table would return.
+    cols = [c for c, _ in keys]
+    match = " AND ".join(f"{c} IS {v}" for c, v in keys)
+    return f"""
+        INSERT INTO {table} ({", ".join(cols)}, Cnt)
+            SELECT {", ".join(v for _, v in keys)}, 0
+            WHERE NOT EXISTS (SELECT 1 FROM {table} WHERE {match});
+        UPDATE {table} SET Cnt = Cnt + ({delta}) WHERE {match};
+        DELETE FROM {table} WHERE {match} AND Cnt <= 0;"""
+
+def _total(name, delta):
+    return f"\n        UPDATE summary_totals SET Value = Value + ({delta}) WHERE Name = '{name}';"
+
+def _city(kind, row, column):
+    return ("summary_cities", [("Kind", f"'{kind}'"), ("City", f"{row}.{column}")])
+
+def _month(row):
+    return f"substr({row}.Timestamp, 1, 7)"
+
+def _trigger(name, event, table, body, when=None):
+    when = f" WHEN {when}" if when else ""
+    return f"CREATE TRIGGER IF NOT EXISTS {name} AFTER {event} ON {table}{when}\n    BEGIN{body}\n    END"
+
+def trigger_sql():
+    stmts = []
+    for table, kind, city_col in [("providers", "providers", "City"),
+                                  ("receivers", "receivers", "City"),
+                                  ("food_listings", "food_listings", "Location")]:
+        ins = _total(table, 1) + _bump(*_city(kind, "NEW", city_col), 1)
+        dele = _total(table, -1) + _bump(*_city(kind, "OLD", city_col), -1)
+        if table == "food_listings":
+            ins += _total("quantity", "IFNULL(NEW.Quantity, 0)")
+            ins += _bump("summary_food_types", [("Food_Type", "NEW.Food_Type")], 1)
+            dele += _total("quantity", "-IFNULL(OLD.Quantity, 0)")
+            dele += _bump("summary_food_types", [("Food_Type", "OLD.Food_Type")], -1)
+        stmts.append(_trigger(f"trg_summary_{table}_ins", "INSERT", table, ins))
+        stmts.append(_trigger(f"trg_summary_{table}_del", "DELETE", table, dele))
+        stmts.append(_trigger(
+            f"trg_summary_{table}_city", f"UPDATE OF {city_col}", table,
+            _bump(*_city(kind, "OLD", city_col), -1) + _bump(*_city(kind, "NEW", city_col), 1),
+            when=f"OLD.{city_col} IS NOT NEW.{city_col}"))
+
+    stmts.append(_trigger(
+        "trg_summary_food_listings_qty", "UPDATE OF Quantity", "food_listings",
+        _total("quantity", "IFNULL(NEW.Quantity, 0) - IFNULL(OLD.Quantity, 0)"),
+        when="OLD.Quantity IS NOT NEW.Quantity"))
+    stmts.append(_trigger(
+        "trg_summary_food_listings_type", "UPDATE OF Food_Type", "food_listings",
+        _bump("summary_food_types", [("Food_Type", "OLD.Food_Type")], -1)
+        + _bump("summary_food_types", [("Food_Type", "NEW.Food_Type")], 1),
+        when="OLD.Food_Type IS NOT NEW.Food_Type"))
+
+    def month(row, delta, extra=""):
+        return _bump("summary_claims_month", [("Month", _month(row))], delta), f"{row}.Timestamp IS NOT NULL{extra}"
+
+    moved = f" AND {_month('OLD')} IS NOT {_month('NEW')}"
+    stmts.append(_trigger("trg_summary_claims_ins", "INSERT", "claims", _total("claims", 1)))
+    stmts.append(_trigger("trg_summary_claims_del", "DELETE", "claims", _total("claims", -1)))
+    for name, event, row, delta, extra in [("ins", "INSERT", "NEW", 1, ""),
+                                           ("del", "DELETE", "OLD", -1, ""),
+                                           ("upd_old", "UPDATE OF Timestamp", "OLD", -1, moved),
+                                           ("upd_new", "UPDATE OF Timestamp", "NEW", 1, moved)]:
+        body, when = month(row, delta, extra)
+        stmts.append(_trigger(f"trg_summary_claims_month_{name}", event, "claims", body, when))
+    # the archive is insert-only
+    body, when = month("NEW", 1)
+    stmts.append(_trigger("trg_summary_claims_archive_ins", "INSERT", "claims_archive", _total("claims", 1)))
+    stmts.append(_trigger("trg_summary_claims_archive_month", "INSERT", "claims_archive", body, when))
+    return stmts
+
+
+REBUILD_SQL = [
+    "DELETE FROM summary_totals",
+    "DELETE FROM summary_food_types",
+    "DELETE FROM summary_cities",
+    "DELETE FROM summary_claims_month",
+    """INSERT INTO summary_totals (Name, Value)
+        SELECT 'providers', COUNT(*) FROM providers
+        UNION ALL SELECT 'receivers', COUNT(*) FROM receivers
+        UNION ALL SELECT 'food_listings', COUNT(*) FROM food_listings
+        UNION ALL SELECT 'claims', COUNT(*) FROM claims_history
+        UNION ALL SELECT 'quantity', IFNULL(SUM(Quantity), 0) FROM food_listings""",
+    """INSERT INTO summary_food_types (Food_Type, Cnt)
+        SELECT Food_Type, COUNT(*) FROM food_listings GROUP BY Food_Type""",
+    """INSERT INTO summary_cities (Kind, City, Cnt)
+        SELECT 'providers', City, COUNT(*) FROM providers GROUP BY City
+        UNION ALL SELECT 'receivers', City, COUNT(*) FROM receivers GROUP BY City
+        UNION ALL SELECT 'food_listings', Location, COUNT(*) FROM food_listings GROUP BY Location""",
+    """INSERT INTO summary_claims_month (Month, Cnt)
+        SELECT substr(Timestamp, 1, 7), COUNT(*) FROM claims_history
+        WHERE Timestamp IS NOT NULL GROUP BY substr(Timestamp, 1, 7)""",
+]
+
+
+def rebuild(conn):
+    with conn:
+        for sql in REBUILD_SQL:
+            conn.execute(sql)
+
+def install(conn, force_rebuild=False):
+    # idempotent; an existing database gets the tables and triggers on first use.
+    # Rebuilding is only needed when the triggers were missing while data changed.
+    fresh = conn.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'trg_summary_%'"
+    ).fetchone()[0] == 0
+    with conn:
+        for ddl in SUMMARY_SCHEMA + trigger_sql():
+            conn.execute(ddl)
+    if fresh or force_rebuild:
+        rebuild(conn)
@@ -0,0 +1,196 @@
+# synth_data.py
+# Writes the four CSVs at N times the size of the shipped ones (1,000 rows per
+# table), shaped like them: Faker-style names, cities and multi-line quoted
+# addresses, the same category values, listings whose Provider_Type / Location
+# come from their provider, claims pointing at existing listings and receivers,
+# US phone numbers in all the shipped spellings (with extensions), M/D/YYYY
+# expiry dates and M/D/YYYY H:MM claim timestamps. --messy mixes in the other
+# date spellings cleaning.parse_date accepts, plus some it can't parse.
+# A fifth file, cities.csv, places every city somewhere in the contiguous US
+# for geo.py.
+import argparse
+import os
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+import geo
+from pipeline import CSV_FILES
+
+BASE_ROWS = 1000  # rows per table in the shipped CSVs
+START = date(2025, 3, 1)
+DAYS = 30  # claim timestamps fall in START .. START + DAYS
+# shipped expiry dates are 3/16 .. 3/30: with the day past 12, M/D/YYYY can't be
+# read day-first by parse_date's "%d/%m/%Y", so keep to that window
+EXPIRY_START = date(2025, 3, 16)
+EXPIRY_DAYS = 15
+LATITUDE = (25.0, 49.0)  # contiguous US, roughly
+LONGITUDE = (-124.0, -67.0)
+
+FIRST = ["James", "Mary", "John", "Patricia", "Robert", "Jennifer", "Michael", "Linda", "David", "Elizabeth",
+         "William", "Barbara", "Richard", "Susan", "Joseph", "Jessica", "Thomas", "Sarah", "Charles", "Karen",
+         "Daniel", "Lisa", "Matthew", "Nancy", "Anthony", "Betty", "Mark", "Sandra", "Donald", "Ashley",
+         "Steven", "Kimberly", "Paul", "Emily", "Andrew", "Donna", "Joshua", "Michelle", "Kenneth", "Carol",
+         "Kevin", "Amanda", "Brian", "Melissa", "Timothy", "Deborah", "Ronald", "Stephanie", "Jason", "Laura",
+         "Carl", "Amy", "Samuel", "Lindsay", "Danielle", "Tonya", "Sheena", "Catherine", "Kelly", "Andrea"]
+LAST = ["Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez", "Martinez",
+        "Hernandez", "Lopez", "Gonzales", "Wilson", "Anderson", "Thomas", "Taylor", "Moore", "Jackson", "Martin",
+        "Lee", "Perez", "Thompson", "White", "Harris", "Sanchez", "Clark", "Ramirez", "Lewis", "Robinson",
+        "Walker", "Young", "Allen", "King", "Wright", "Scott", "Torres", "Nguyen", "Hill", "Flores",
+        "Green", "Adams", "Nelson", "Baker", "Hall", "Rivera", "Campbell", "Mitchell", "Carter", "Roberts",
+        "Cochran", "Hurley", "Barnett", "Acosta", "Chan", "Wallace", "Goodwin", "Weeks", "Sharp", "Lutz"]
+CITY_PREFIX = ["", "", "", "North ", "South ", "East ", "West ", "New ", "Lake ", "Port "]
+CITY_SUFFIX = ["", "town", "ton", "ville", "burgh", "borough", "chester", "furt", "fort", "mouth", "stad",
+               "side", "haven", "land", "view", "berg", "shire", "port", "bury", "field"]
+STREETS = ["Street", "Avenue", "Road", "Lane", "Mountains", "Cove", "Plaza", "Extensions", "Throughway",
+           "Crossing", "Harbor", "Ridge", "Meadow", "Parkway", "Point", "Terrace"]
+STATES = ["AL", "AK", "AZ", "CA", "CO", "FL", "GA", "IL", "KS", "MA", "MN", "ND", "NY", "OK", "OR", "TX", "WA", "WI"]
+COMPANY = ["{a}-{b}", "{a}, {b} and {c}", "{a} and Sons", "{a} LLC", "{a} Inc", "{a} Group", "{a} PLC", "{a} Ltd"]
+PHONES = ["###-###-####", "(###)###-####", "###.###.####", "+1-###-###-####", "001-###-###-####", "##########"]
+
+PROVIDER_TYPES = ["Supermarket", "Grocery Store", "Restaurant", "Catering Service"]
+RECEIVER_TYPES = ["NGO", "Charity", "Shelter", "Individual"]
+FOOD_NAMES = ["Rice", "Soup", "Salad", "Dairy", "Chicken", "Pasta", "Bread", "Fish", "Vegetables", "Fruits"]
+FOOD_TYPES = ["Vegetarian", "Vegan", "Non-Vegetarian"]
+MEAL_TYPES = ["Breakfast", "Snacks", "Lunch", "Dinner"]
+STATUSES = ["Completed", "Cancelled", "Pending"]
+# --messy spellings: what cleaning.parse_date / FALLBACK_FORMATS accept, and junk it can't
+EXPIRY_MESSY = ["{y}-{m:02d}-{d:02d}", "{d:02d}-{m:02d}-{y}", "{y}/{m:02d}/{d:02d}", "{m:02d}/{d:02d}/{y}", "unknown", ""]
+TIMESTAMP_MESSY = ["{y}-{m:02d}-{d:02d} {H:02d}:{M:02d}:{S:02d}", "{m}/{d}/{y} {H}:{M:02d}:{S:02d}",
+                   "{y}-{m:02d}-{d:02d}", "n/a", ""]
+
+
+def pick(rng, values, n):
+    return np.asarray(values, dtype=object)[rng.integers(0, len(values), n)]
+
+def city_names(rng, n):
+    return [p + b + s for p, b, s in zip(pick(rng, CITY_PREFIX, n), pick(rng, FIRST + LAST, n),
+                                         pick(rng, CITY_SUFFIX, n))]
+
+def person_names(rng, n):
+    return [f"{a} {b}" for a, b in zip(pick(rng, FIRST, n), pick(rng, LAST, n))]
+
+def company_names(rng, n):
+    a, b, c = pick(rng, LAST, n), pick(rng, LAST, n), pick(rng, LAST, n)
+    return [fmt.format(a=x, b=y, c=z) for fmt, x, y, z in zip(pick(rng, COMPANY, n), a, b, c)]
+
+def phones(rng, n):
+    digits = rng.integers(0, 10, (n, 10)).astype(str)
+    out = []
+    for fmt, ds, ext in zip(pick(rng, PHONES, n), digits, rng.integers(0, 100000, n)):
+        it = iter(ds)
+        s = "".join(next(it) if ch == "#" else ch for ch in fmt)
+        if ext % 2:  # about half carry an extension, like the shipped data
+            s += f"x{ext % 10 ** (3 + ext % 3)}"
+        out.append(s)
+    return out
+
+def addresses(rng, cities):
+    n = len(cities)
+    units = [f" Apt. {u}" if u % 3 == 0 else (f" Suite {u}" if u % 3 == 1 else "") for u in rng.integers(100, 999, n)]
+    return [f"{num} {street_name} {street}{unit}\n{city}, {state} {zip_code:05d}"
+            for num, street_name, street, unit, city, state, zip_code in
+            zip(rng.integers(1, 99999, n), pick(rng, LAST, n), pick(rng, STREETS, n), units, cities,
+                pick(rng, STATES, n), rng.integers(501, 99950, n))]
+
+def _mess(rng, values, parts, templates, messy):
+    # replaces a `messy` share of values with the other spellings
+    if not messy:
+        return values
+    values = list(values)
+    for i in np.flatnonzero(rng.random(len(values)) < messy):
+        values[i] = templates[rng.integers(0, len(templates))].format(**{k: int(v[i]) for k, v in parts.items()})
+    return values
+
+def generate(scale, seed=0, messy=0.0):
+    # -> {table: DataFrame} with BASE_ROWS * scale rows per table
+    rng = np.random.default_rng(seed)
+    n = BASE_ROWS * scale
+    ids = np.arange(1, n + 1)
+
+    # cities: about one per provider, and receivers mostly live elsewhere
+    # (only ~6% of shipped receiver cities also have a provider)
+    provider_cities = city_names(rng, n)
+    receiver_cities = city_names(rng, n)
+    shared = rng.random(n) < 0.06
+    receiver_cities = np.where(shared, pick(rng, provider_cities, n), np.asarray(receiver_cities, dtype=object))
+
+    provider_types = pick(rng, PROVIDER_TYPES, n)
+    providers = pd.DataFrame({
+        "Provider_ID": ids,
+        "Name": company_names(rng, n),
+        "Type": provider_types,
+        "Address": addresses(rng, provider_cities),
+        "City": provider_cities,
+        "Contact": phones(rng, n),
+    })
+    receivers = pd.DataFrame({
+        "Receiver_ID": ids,
+        "Name": person_names(rng, n),
+        "Type": pick(rng, RECEIVER_TYPES, n),
+        "City": receiver_cities,
+        "Contact": phones(rng, n),
+    })
+
+    owner = rng.integers(0, n, n)
+    expiry = [EXPIRY_START + timedelta(days=int(d)) for d in rng.integers(0, EXPIRY_DAYS, n)]
+    parts = {"y": [d.year for d in expiry], "m": [d.month for d in expiry], "d": [d.day for d in expiry]}
+    food = pd.DataFrame({
+        "Food_ID": ids,
+        "Food_Name": pick(rng, FOOD_NAMES, n),
+        "Quantity": rng.integers(1, 51, n),
+        "Expiry_Date": _mess(rng, [f"{d.month}/{d.day}/{d.year}" for d in expiry], parts, EXPIRY_MESSY, messy),
+        "Provider_ID": owner + 1,
+        "Provider_Type": provider_types[owner],
+        "Location": np.asarray(provider_cities, dtype=object)[owner],
+        "Food_Type": pick(rng, FOOD_TYPES, n),
+        "Meal_Type": pick(rng, MEAL_TYPES, n),
+    })
+
+    seconds = rng.integers(0, DAYS * 86400, n)
+    stamps = [START + timedelta(seconds=int(s)) for s in seconds]
+    hms = [(int(s) % 86400 // 3600, int(s) % 3600 // 60, int(s) % 60) for s in seconds]
+    parts = {"y": [d.year for d in stamps], "m": [d.month for d in stamps], "d": [d.day for d in stamps],
+             "H": [h for h, _, _ in hms], "M": [m for _, m, _ in hms], "S": [s for _, _, s in hms]}
+    claims = pd.DataFrame({
+        "Claim_ID": ids,
+        "Food_ID": rng.integers(1, n + 1, n),
+        "Receiver_ID": rng.integers(1, n + 1, n),
+        "Status": pick(rng, STATUSES, n),
+        "Timestamp": _mess(rng, [f"{d.month}/{d.day}/{d.year} {h}:{m:02d}" for d, (h, m, _) in zip(stamps, hms)],
+                           parts, TIMESTAMP_MESSY, messy),
+    })
+
+    # drawn last so the four tables come out the same as before for a given seed
+    names = pd.Series(pd.unique(np.concatenate([np.asarray(provider_cities, dtype=object), receiver_cities])))
+    names = names.groupby(names.map(geo.city_key), sort=False).first()  # one per normalized name
+    cities = pd.DataFrame({
+        "City": names.values,
+        "Latitude": rng.uniform(*LATITUDE, len(names)).round(5),
+        "Longitude": rng.uniform(*LONGITUDE, len(names)).round(5),
+    })
+    return {"providers": providers, "receivers": receivers, "food_listings": food, "claims": claims,
+            "cities": cities}
+
+def write(frames, out_dir):
+    os.makedirs(out_dir, exist_ok=True)
+    for table, df in frames.items():
+        df.to_csv(os.path.join(out_dir, CSV_FILES.get(table, geo.CITIES_FILE)), index=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write synthetic CSVs shaped like the shipped ones.")
+    parser.add_argument("--scale", type=int, default=10, help=f"rows per table = {BASE_ROWS} x scale")
+    parser.add_argument("--out", default=None, help="output directory (default: synth_x<scale>)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--messy", type=float, default=0.0,
+                        help="share of dates written in other spellings (some unparseable)")
+    args = parser.parse_args()
+
+    out = args.out or f"synth_x{args.scale}"
+    start = time.perf_counter()
+    write(generate(args.scale, args.seed, args.messy), out)
+    print(f"{BASE_ROWS * args.scale} rows per table written to {out}/ in {time.perf_counter() - start:.1f}s")
+    print(f"load with: python pipeline.py --csv-dir {out} --db {out}/local_food_wastage.db")
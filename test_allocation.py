@@ -0,0 +1,77 @@
+# test_allocation.py
+import os
+import threading
+
+import pandas as pd
+import pytest
+
+import allocation
+import pipeline
+
+STOCK = 25
+WORKERS = 6
+
+
+def listing(conn, quantity):
+    with conn:
+        cur = conn.execute("INSERT INTO food_listings (Food_Name, Quantity) VALUES ('Contested', ?)", (quantity,))
+    return cur.lastrowid
+
+def test_concurrent_claims_never_over_allocate(db_path, conn):
+    food_id = listing(conn, STOCK)
+    receiver_id = conn.execute("SELECT MIN(Receiver_ID) FROM receivers").fetchone()[0]
+    won, errors = [], []
+
+    def worker():
+        c = allocation.connect(db_path)
+        try:
+            while True:
+                try:
+                    claim_id, _ = allocation.claim(c, food_id, receiver_id, quantity=2)
+                    won.append(claim_id)
+                except allocation.InsufficientQuantity:
+                    return
+        except Exception as e:
+            errors.append(e)
+        finally:
+            c.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(WORKERS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    assert len(won) == len(set(won)) == STOCK // 2
+    assert conn.execute("SELECT Quantity FROM food_listings WHERE Food_ID = ?", (food_id,)).fetchone()[0] == STOCK % 2
+    claimed = conn.execute("SELECT SUM(Claimed_Quantity) FROM claims WHERE Food_ID = ?", (food_id,)).fetchone()[0]
+    assert claimed == STOCK - STOCK % 2
+
+def test_cancel_and_delete_give_stock_back(conn):
+    food_id = listing(conn, 3)
+    receiver_id = conn.execute("SELECT MIN(Receiver_ID) FROM receivers").fetchone()[0]
+    first, _ = allocation.claim(conn, food_id, receiver_id, quantity=2)
+    with pytest.raises(allocation.InsufficientQuantity):
+        allocation.claim(conn, food_id, receiver_id, quantity=2)
+    allocation.set_status(conn, first, "Cancelled")
+    second, _ = allocation.claim(conn, food_id, receiver_id, quantity=3)
+    # re-activating the cancelled claim needs stock that is gone now
+    with pytest.raises(allocation.InsufficientQuantity):
+        allocation.set_status(conn, first, "Pending")
+    allocation.delete_claim(conn, second)
+    assert conn.execute("SELECT Quantity FROM food_listings WHERE Food_ID = ?", (food_id,)).fetchone()[0] == 3
+
+def test_a_sync_keeps_claimed_stock_held(csv_dir, db_path, conn, tmp_path):
+    food_id = conn.execute("SELECT MIN(Food_ID) FROM food_listings WHERE Quantity >= 5").fetchone()[0]
+    receiver_id = conn.execute("SELECT MIN(Receiver_ID) FROM receivers").fetchone()[0]
+    allocation.claim(conn, food_id, receiver_id, quantity=3)
+    cancelled, _ = allocation.claim(conn, food_id, receiver_id, quantity=2)
+    allocation.set_status(conn, cancelled, "Cancelled")
+    # the CSV restocks the listing to 50
+    df = pd.read_csv(os.path.join(csv_dir, pipeline.CSV_FILES["food_listings"]))
+    df.loc[df["Food_ID"] == food_id, "Quantity"] = 50
+    path = str(tmp_path / "food_listings.csv")
+    df.to_csv(path, index=False)
+    pipeline.load_incremental(db_path, files={"food_listings": path})[0].close()
+    assert conn.execute("SELECT Quantity FROM food_listings WHERE Food_ID = ?", (food_id,)).fetchone()[0] == 47
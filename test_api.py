@@ -0,0 +1,60 @@
+# test_api.py
+import base64
+import json
+
+import pytest
+
+import api
+
+
+@pytest.fixture
+def server(db_path):
+    a = api.Api(db_path, pool_size=2)
+    yield a
+    a.close()
+
+def get(server, target, if_none_match=None):
+    status, headers, body = server.handle(target, if_none_match)
+    return status, headers, json.loads(body) if body else None
+
+def token(value):
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode()
+
+@pytest.mark.parametrize("after", ["!!", token(5), token([1]), token([1, 2, 3]), token([{"a": 1}, 2]),
+                                   token([1, [2]]), token("ab")])
+def test_bad_cursor_is_a_400(server, after):
+    status, _, body = get(server, f"/listings?after={after}")
+    assert status == 400
+    assert "after" in body["error"]
+
+def test_pages_follow_on(server, conn):
+    ids = [r[0] for r in conn.execute("SELECT Food_ID FROM food_listings ORDER BY Food_ID LIMIT 6")]
+    status, _, first = get(server, "/listings?limit=3")
+    assert status == 200
+    _, _, second = get(server, f"/listings?limit=3&after={first['next']}")
+    assert [r[0] for r in first["rows"] + second["rows"]] == ids
+
+def test_etag_revalidates_until_a_write(server, conn):
+    status, headers, _ = get(server, "/providers/1")
+    assert status == 200 and headers["X-Cache"] == "miss"
+    assert get(server, "/providers/1")[1]["X-Cache"] == "hit"
+    assert get(server, "/providers/1", headers["ETag"])[0] == 304
+
+    with conn:
+        conn.execute("UPDATE providers SET Name = 'Renamed' WHERE Provider_ID = 1")
+    status, after, body = get(server, "/providers/1", headers["ETag"])
+    assert status == 200 and after["ETag"] != headers["ETag"] and after["X-Cache"] == "miss"
+    assert body["rows"][0][1] == "Renamed"
+
+def test_an_unexpected_error_is_a_500(server, monkeypatch, capsys):
+    def broken(conn, args):
+        raise KeyError("boom")
+    monkeypatch.setattr(server, "routes", [(pattern, broken if pattern.pattern == "/queries" else route)
+                                           for pattern, route in server.routes])
+    status, headers, body = get(server, "/queries")
+    assert status == 500
+    assert body == {"error": "internal server error"}
+    assert "ETag" not in headers and "X-Cache" not in headers
+    assert "KeyError: 'boom'" in capsys.readouterr().err
+    status, _, _ = get(server, "/providers?limit=1")  # the pooled connection is still usable
+    assert status == 200
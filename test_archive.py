@@ -0,0 +1,62 @@
+# test_archive.py
+from datetime import date
+
+import archive
+import summary
+from db import Database
+
+COUNTS_SQL = "SELECT Food_ID, Receiver_ID, Status, SUM(Cnt) FROM claims_counts GROUP BY 1, 2, 3 ORDER BY 1, 2, 3"
+
+
+def move_a_claim(conn, timestamp):
+    claim_id = conn.execute("SELECT MIN(Claim_ID) FROM claims WHERE Status = 'Completed'").fetchone()[0]
+    with conn:
+        conn.execute("UPDATE claims SET Timestamp = ? WHERE Claim_ID = ?", (timestamp, claim_id))
+    return claim_id
+
+def test_old_exports_stay_hot(conn):
+    # the synthetic claims all fall in March 2025, long before today
+    assert conn.execute("SELECT COUNT(*) FROM claims_archive").fetchone()[0] == 0
+    assert archive.cutoff(conn) == "2025-01"
+    assert archive.compact(conn) == ({}, 0)
+
+def test_window_follows_the_newest_claim(conn):
+    move_a_claim(conn, "2025-07-02 10:00:00")
+    before = conn.execute(COUNTS_SQL).fetchall()
+    pending = conn.execute("SELECT COUNT(*) FROM claims WHERE Status = 'Pending'").fetchone()[0]
+
+    assert archive.cutoff(conn) == "2025-05"
+    moved, _ = archive.compact(conn)
+    assert list(moved) == ["2025-03"]
+    # only the July claim and the pending ones stay; the rollup keeps the all-time counts
+    assert conn.execute("SELECT COUNT(*) FROM claims").fetchone()[0] == pending + 1
+    assert conn.execute(COUNTS_SQL).fetchall() == before
+
+def test_future_timestamps_are_capped_at_today(conn):
+    move_a_claim(conn, "2099-01-01 00:00:00")
+    assert archive.newest_month(conn, today=date(2025, 4, 20)) == date(2025, 4, 20)
+    assert archive.cutoff(conn, today=date(2025, 4, 20)) == "2025-02"
+    assert archive.compact(conn, today=date(2025, 4, 20)) == ({}, 0)
+
+def test_archiving_invalidates_the_cached_archive(db_path, conn):
+    move_a_claim(conn, "2025-07-02 10:00:00")
+    db = Database(db_path, derived=summary.DERIVED)
+    reader = db.reader()
+    sql = "SELECT COUNT(*) FROM claims_archive"
+    assert db.query(reader, sql).iloc[0, 0] == 0
+    # what the Admin tab's "Archive closed months" does
+    with db.write_lock:
+        moved, _ = archive.compact(db.write_conn)
+    db.invalidate("claims")
+    assert db.query(reader, sql).iloc[0, 0] == sum(moved.values()) > 0
+
+def test_reloaded_archived_claims_are_counted(conn):
+    move_a_claim(conn, "2025-07-02 10:00:00")
+    archive.compact(conn)
+    archived = conn.execute("SELECT Claim_ID, Status FROM claims_archive WHERE Status = 'Completed' LIMIT 2").fetchall()
+    with conn:  # a reload brings two of them back, one corrected
+        conn.executemany("INSERT INTO claims (Claim_ID, Status, Timestamp) VALUES (?, ?, '2025-03-01')",
+                         [archived[0], (archived[1][0], "Cancelled")])
+    assert archive.compact(conn) == ({}, 2)
+    assert conn.execute("SELECT COUNT(*) FROM claims WHERE Claim_ID IN (?, ?)",
+                        (archived[0][0], archived[1][0])).fetchone()[0] == 0
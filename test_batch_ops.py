@@ -0,0 +1,77 @@
+# test_batch_ops.py
+import pandas as pd
+
+import allocation
+import batch_ops
+
+
+def batch(rows, columns):
+    # rows as they come out of read_csv: all text, blanks as ""
+    return pd.DataFrame([[str(v) for v in r] for r in rows], columns=columns)
+
+def quantity(conn, food_id):
+    return conn.execute("SELECT Quantity FROM food_listings WHERE Food_ID = ?", (food_id,)).fetchone()[0]
+
+def test_a_bad_row_is_reported_and_the_others_are_written(conn):
+    df = batch([["", "Good One", "NGO", "Pune", "123"],
+                ["", "", "NGO", "Pune", "456"],
+                ["", "Good Two", "Shelter", "Delhi", "789"],
+                ["x", "Bad Key", "NGO", "Pune", "000"]], batch_ops.template("receivers"))
+    rows, errors = batch_ops.validate("receivers", df)
+    assert [n for n, _ in rows] == [1, 3]
+    assert errors == [(2, "Name is required"), (4, "Receiver_ID must be a whole number")]
+
+    (applied, failed), _ = batch_ops.apply(conn, "receivers", "upsert", rows)
+    assert applied == [1, 3] and failed == []
+    names = {r[0] for r in conn.execute("SELECT Name FROM receivers WHERE Name IN ('Good One', 'Good Two', 'Bad Key')")}
+    assert names == {"Good One", "Good Two"}
+
+def test_a_row_the_database_rejects_falls_back_to_row_by_row(conn):
+    # passes validation but fails in SQLite, so the executemany is rolled back
+    # and replayed under savepoints
+    conn.execute("CREATE TEMP TRIGGER reject BEFORE INSERT ON receivers WHEN NEW.Name = 'Rejected' "
+                 "BEGIN SELECT RAISE(ABORT, 'rejected by trigger'); END")
+    before = conn.execute("SELECT COUNT(*) FROM receivers").fetchone()[0]
+    df = batch([["", "Kept A", "NGO", "Pune", ""],
+                ["", "Rejected", "NGO", "Pune", ""],
+                ["", "Kept B", "NGO", "Pune", ""]], batch_ops.template("receivers"))
+    rows, errors = batch_ops.validate("receivers", df)
+    assert errors == []
+
+    (applied, failed), _ = batch_ops.apply(conn, "receivers", "upsert", rows)
+    assert applied == [1, 3]
+    assert failed == [(2, "rejected by trigger")]
+    assert conn.execute("SELECT COUNT(*) FROM receivers").fetchone()[0] == before + 2
+    assert not conn.in_transaction
+
+def test_claims_reserve_stock_and_a_blank_status_keeps_an_existing_claim(conn):
+    with conn:
+        food_id = conn.execute("INSERT INTO food_listings (Food_Name, Quantity) VALUES ('Batch', 10)").lastrowid
+    receiver_id = conn.execute("SELECT MIN(Receiver_ID) FROM receivers").fetchone()[0]
+    cancelled, _ = allocation.claim(conn, food_id, receiver_id, quantity=2, status="Cancelled")
+    completed, _ = allocation.claim(conn, food_id, receiver_id, quantity=3, status="Completed")
+    assert quantity(conn, food_id) == 7
+
+    columns = batch_ops.template("claims")
+    df = batch([["", food_id, receiver_id, "", "", 4],      # new: defaults to Pending, holds 4
+                ["", food_id, receiver_id, "", "", 9],      # more than is left
+                [cancelled, "", "", "", "", ""],            # blank status: stays Cancelled
+                [completed, "", "", "", "", ""],            # blank status: stays Completed
+                [999999999, "", "", "", "", ""],            # no such claim
+                [completed, "", "", "Shipped", "", ""]], columns)
+    rows, errors = batch_ops.validate("claims", df)
+    assert errors == [(6, "Status must be one of Pending, Completed, Cancelled")]
+
+    (applied, failed), _ = batch_ops.apply(conn, "claims", "upsert", rows)
+    assert applied == [1, 3, 4]
+    assert [n for n, _ in failed] == [2, 5]
+    assert "3 left, 9 requested" in failed[0][1] and "does not exist" in failed[1][1]
+    assert quantity(conn, food_id) == 3
+    status = dict(conn.execute("SELECT Claim_ID, Status FROM claims WHERE Food_ID = ?", (food_id,)))
+    assert status[cancelled] == "Cancelled" and status[completed] == "Completed"
+    assert sorted(status.values()) == ["Cancelled", "Completed", "Pending"]
+
+    rows, errors = batch_ops.validate("claims", batch([[completed]], ["Claim_ID"]), "delete")
+    (applied, failed), _ = batch_ops.apply(conn, "claims", "delete", rows)
+    assert applied == [1] and failed == []
+    assert quantity(conn, food_id) == 6
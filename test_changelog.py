@@ -0,0 +1,43 @@
+# test_changelog.py
+import changelog
+
+VIEWS = list(changelog.VIEWS)
+
+
+def contents(conn):
+    return {v: sorted(conn.execute(f"SELECT * FROM {v}").fetchall(), key=repr) for v in VIEWS}
+
+def test_catch_up_matches_a_rebuild(conn, churn):
+    churn(conn, seed=2)
+    assert changelog.behind(conn, VIEWS) == VIEWS
+    with conn:
+        applied = changelog.catch_up(conn)
+    # applied from the log, not rebuilt
+    assert all(isinstance(n, int) for n in applied.values()), applied
+    assert changelog.behind(conn, VIEWS) == []
+    kept = contents(conn)
+    with conn:
+        for v in VIEWS:
+            changelog.rebuild(conn, v)
+    assert kept == contents(conn)
+
+def test_a_gap_in_the_log_rebuilds(conn, churn):
+    churn(conn, seed=3, rounds=20)
+    with conn:
+        conn.execute("DELETE FROM change_log WHERE Seq <= (SELECT MIN(Seq) + 5 FROM change_log)")
+        assert set(changelog.catch_up(conn).values()) == {"rebuilt"}
+    kept = contents(conn)
+    with conn:
+        for v in VIEWS:
+            changelog.rebuild(conn, v)
+    assert kept == contents(conn)
+
+def test_prune_keeps_what_a_consumer_still_needs(conn, churn):
+    churn(conn, seed=4, rounds=20)
+    last = changelog.head(conn)[1]
+    with conn:
+        changelog.catch_up(conn, VIEWS[:1])  # the other view stays behind
+        changelog.prune(conn, keep=0)
+    behind = conn.execute("SELECT Seq FROM change_consumers WHERE Name = ?", (VIEWS[1],)).fetchone()[0]
+    assert behind < last
+    assert changelog.read(conn, (changelog.head(conn)[0], behind)) is not None
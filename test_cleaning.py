@@ -0,0 +1,46 @@
+# test_cleaning.py
+import numpy as np
+import pandas as pd
+import pytest
+
+import synth_data
+from cleaning import clean_phone, clean_phone_column, parse_date, parse_date_column
+
+EDGE_DATES = [None, np.nan, "", "  ", "2025-03-05", " 2025-03-05 ", "05-03-2025", "13/03/2025", "3/5/2025",
+              "3/5/2025 5:26", "2025/03/05", "2025-03-05 17:26:00", "0099-01-02", "31/02/2025", "March 5, 2025",
+              "not a date", "2025-3-5", 20250305]
+EDGE_PHONES = [None, np.nan, "", "---", "+1-555-010-9999x123", "(555) 010 9999", "٣٣٣", 5550109999, 5.5]
+
+
+@pytest.fixture(scope="module")
+def messy():
+    return synth_data.generate(1, seed=3, messy=0.3)
+
+def same_as_rowwise(col, vectorized, rowwise):
+    got, expected = vectorized(col.copy()), col.apply(rowwise)
+    assert list(got.index) == list(expected.index)
+    assert [None if pd.isna(v) else v for v in got] == [None if pd.isna(v) else v for v in expected]
+
+@pytest.mark.parametrize("table, column", [("food_listings", "Expiry_Date"), ("claims", "Timestamp")])
+def test_dates_match_parse_date(messy, table, column):
+    same_as_rowwise(messy[table][column], parse_date_column, parse_date)
+
+def test_edge_dates_match_parse_date():
+    same_as_rowwise(pd.Series(EDGE_DATES, dtype=object), parse_date_column, parse_date)
+    same_as_rowwise(pd.Series(EDGE_DATES, dtype=object, index=range(100, 100 + len(EDGE_DATES))),
+                    parse_date_column, parse_date)
+
+@pytest.mark.parametrize("table", ["providers", "receivers"])
+def test_phones_match_clean_phone(messy, table):
+    same_as_rowwise(messy[table]["Contact"], clean_phone_column, clean_phone)
+
+@pytest.mark.parametrize("dtype", [object, "string"])
+def test_edge_phones_match_clean_phone(dtype):
+    col = pd.Series([v for v in EDGE_PHONES if isinstance(v, str) or v is None], dtype=dtype)
+    same_as_rowwise(col, clean_phone_column, clean_phone)
+    same_as_rowwise(pd.Series(EDGE_PHONES, dtype=object), clean_phone_column, clean_phone)
+
+def test_all_missing_columns():
+    empty = pd.Series([None, np.nan], dtype=object)
+    same_as_rowwise(empty, parse_date_column, parse_date)
+    same_as_rowwise(empty, clean_phone_column, clean_phone)
@@ -0,0 +1,31 @@
+# test_columnar.py
+import pandas as pd
+import pytest
+
+import columnar
+from bench_columnar import same
+
+
+@pytest.fixture
+def store(conn, churn, tmp_path):
+    churn(conn, seed=7, rounds=30)  # NULL cities and types, archived claims
+    columnar.export(conn, str(tmp_path))
+    store = columnar.Store(str(tmp_path))
+    yield store
+    store.tables.clear()
+
+@pytest.mark.parametrize("name", list(columnar.ANALYTICS))
+def test_analytics_match_sqlite(conn, store, name):
+    call, sql = columnar.ANALYTICS[name]
+    assert same(call(store), pd.read_sql_query(sql, conn))
+
+def test_tables_match_sqlite(conn, store):
+    for table in columnar.SCHEMAS:
+        source = columnar.SOURCES.get(table, table)
+        assert len(store.to_pandas(table)) == conn.execute(f"SELECT COUNT(*) FROM {source}").fetchone()[0]
+
+def test_a_write_makes_the_store_stale(conn, store):
+    assert store.fresh(conn)
+    with conn:
+        conn.execute("UPDATE receivers SET City = 'Elsewhere' WHERE Receiver_ID = (SELECT MIN(Receiver_ID) FROM receivers)")
+    assert not store.fresh(conn)
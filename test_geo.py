@@ -0,0 +1,47 @@
+# test_geo.py
+import math
+import random
+
+import pytest
+
+import geo
+
+RADII = (10, 100, 400, 2500)
+
+
+def place(conn, coords):
+    # replaces the pipeline's cities with these (key -> (lat, lon))
+    with conn:
+        conn.execute("DELETE FROM cities")
+        conn.executemany("INSERT INTO cities (City_Key, City, Latitude, Longitude) VALUES (?, ?, ?, ?)",
+                         [(k, k, lat, lon) for k, (lat, lon) in coords.items()])
+    return geo.CityIndex().load(conn)
+
+def brute_force(coords, key, radius_km):
+    lat, lon = coords[key]
+    return {k: geo.haversine_km(lat, lon, a, b) for k, (a, b) in coords.items()
+            if geo.haversine_km(lat, lon, a, b) <= radius_km}
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_within_matches_a_brute_force_scan(conn, seed):
+    rng = random.Random(seed)
+    coords = {f"city {i}": (math.degrees(math.asin(rng.uniform(-1, 1))), rng.uniform(-180, 180))
+              for i in range(1500)}
+    # crowded on both sides of the antimeridian and near the poles
+    coords.update({f"east {i}": (rng.uniform(-70, 70), rng.uniform(178, 180)) for i in range(150)})
+    coords.update({f"west {i}": (rng.uniform(-70, 70), rng.uniform(-180, -178)) for i in range(150)})
+    coords.update({f"polar {i}": (rng.choice([-1, 1]) * rng.uniform(85, 90), rng.uniform(-180, 180))
+                   for i in range(100)})
+    coords["dateline east"], coords["dateline west"] = (0.0, 179.95), (0.0, -179.95)
+    index = place(conn, coords)
+    for key in ["dateline east", "dateline west"] + rng.sample(sorted(coords), 60):
+        for radius in RADII:
+            found = index.within(key, radius)
+            assert found.keys() == brute_force(coords, key, radius).keys(), (key, radius)
+    assert "dateline west" in index.within("dateline east", 15)
+
+def test_a_city_without_coordinates_only_matches_itself(conn):
+    index = place(conn, {"pune": (18.52, 73.86)})
+    assert index.within(" Nowhere ", 500) == {"nowhere": 0.0}
+    assert index.within("  PUNE", 1) == {"pune": 0.0}
+    assert index.within(None, 500) == {}
@@ -0,0 +1,59 @@
+# test_jobs.py
+import time
+
+import pytest
+
+import allocation
+import archive
+import changelog
+import geo
+import jobs
+import search
+import snapshots
+import summary
+import synth_data
+from db import Database
+from expiry import install as install_expiry_indexes
+
+
+@pytest.fixture
+def other_csv_dir(tmp_path):
+    # different sizes than the session data, so the swapped-in file's pages differ
+    synth_data.write(synth_data.generate(2, seed=1), str(tmp_path))
+    return str(tmp_path)
+
+def app_database(path):
+    # what app.get_db sets up on the write connection
+    db = Database(path, derived=summary.DERIVED)
+    with db.write_lock:
+        allocation.install(db.write_conn)
+        archive.install(db.write_conn)
+        summary.install(db.write_conn)
+        snapshots.install(db.write_conn)
+        install_expiry_indexes(db.write_conn)
+        search.install(db.write_conn)
+        geo.install(db.write_conn)
+        changelog.install(db.write_conn)
+    return db
+
+def test_writes_after_swap(db_path, other_csv_dir, tmp_path):
+    db = app_database(db_path)
+    queue = jobs.IngestQueue(db_path, columnar_dir=str(tmp_path / "columnar"))
+    queue.attach(db)
+    reader = db.reader()
+    assert db.query(reader, "SELECT COUNT(*) FROM providers").iloc[0, 0] == synth_data.BASE_ROWS
+
+    job = queue.request("full", other_csv_dir)
+    deadline = time.time() + 300
+    while job["finished_at"] is None and time.time() < deadline:
+        time.sleep(0.1)
+    assert job["state"] == "done", job["error"]
+    assert db.generation == 1
+
+    # the app's rerun order: a read, then writes into every FTS-indexed table
+    assert db.query(reader, "SELECT COUNT(*) FROM providers").iloc[0, 0] == 2 * synth_data.BASE_ROWS
+    db.execute("INSERT INTO providers (Name, City) VALUES ('After Swap', 'Nowhere')")
+    db.execute("INSERT INTO receivers (Name, City) VALUES ('After Swap', 'Nowhere')")
+    db.execute("INSERT INTO food_listings (Food_Name, Quantity) VALUES ('After Swap', 1)")
+    hits, _ = search.search(db.reader(), "providers", "after swap")
+    assert list(hits["Name"]) == ["After Swap"]
@@ -0,0 +1,34 @@
+# test_matching.py
+from datetime import date
+
+from matching import Matcher
+
+AS_OF = date(2025, 3, 20)  # the synthetic listings expire 2025-03-16 .. 03-30
+
+
+def same(a, b):
+    assert a.listings.keys() == b.listings.keys()
+    assert a.receivers == b.receivers
+    assert a.history == b.history
+    assert a.match().equals(b.match())
+
+def test_catch_up_matches_a_reload(conn, churn):
+    matcher = Matcher().load(conn, AS_OF)
+    assert matcher.listings and not matcher.match().empty
+    churn(conn, seed=5)
+    matcher.ensure_current(conn, AS_OF)
+    same(matcher, Matcher().load(conn, AS_OF))
+
+def test_new_day_reloads(conn):
+    matcher = Matcher().load(conn, AS_OF)
+    later = date(2025, 3, 25)
+    matcher.ensure_current(conn, later)
+    same(matcher, Matcher().load(conn, later))
+
+def test_cities_match_across_case_accents_and_spacing(conn):
+    with conn:
+        rid = conn.execute("INSERT INTO receivers (Name, City) VALUES ('Folded', ' São  Paulo')").lastrowid
+        fid = conn.execute("INSERT INTO food_listings (Food_Name, Quantity, Expiry_Date, Location) "
+                           "VALUES ('Folded', 5, '2025-03-25', 'SAO PAULO')").lastrowid
+    matcher = Matcher().load(conn, AS_OF)
+    assert fid in set(matcher.suggest(rid)["Food_ID"])
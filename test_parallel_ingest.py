@@ -0,0 +1,56 @@
+# test_parallel_ingest.py
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+import pipeline
+from parallel_ingest import map_ahead, split_csv
+
+
+def tables(path):
+    conn = sqlite3.connect(path)
+    try:
+        return {t: conn.execute(f"SELECT * FROM {t} ORDER BY {k}").fetchall() for t, k in pipeline.PRIMARY_KEYS.items()}
+    finally:
+        conn.close()
+
+def test_parallel_load_matches_a_full_load(csv_dir, tmp_path):
+    files = pipeline.csv_files(csv_dir)
+    # a run of phone numbers that look numeric, leading zeros included, so a
+    # chunk holds nothing else
+    df = pd.read_csv(files["providers"], dtype=str)
+    df.loc[:59, "Contact"] = [f"00{n:08d}" for n in range(60)]
+    path = files["providers"] = str(tmp_path / "providers.csv")
+    df.to_csv(path, index=False)
+    with open(path, "rb") as f:
+        data = f.read()
+    # the first chunk's target lands inside a quoted multi-line address
+    header_end, _ = split_csv(path, len(data))
+    inside = data.index(b"\n", header_end + 2_000)
+    while data.count(b'"', 0, inside) % 2 == 0:
+        inside = data.index(b"\n", inside + 1)
+    chunk_bytes = inside - 1 - header_end
+    _, ranges = split_csv(path, chunk_bytes)
+    assert len(ranges) > 3 and ranges[0][1] > inside
+    assert all(data.count(b'"', 0, start) % 2 == 0 for start, _ in ranges)
+
+    full, parallel = str(tmp_path / "full.db"), str(tmp_path / "parallel.db")
+    pipeline.load_full(full, files=files).close()
+    pipeline.load_parallel(parallel, workers=2, chunk_bytes=chunk_bytes, files=files).close()
+    assert tables(parallel) == tables(full)
+
+def test_map_ahead_keeps_a_bounded_window():
+    submitted = []
+
+    class Pool(ThreadPoolExecutor):
+        def submit(self, fn, *args):
+            submitted.append(args)
+            return super().submit(fn, *args)
+
+    out = []
+    with Pool(2) as pool:
+        for consumed, result in enumerate(map_ahead(pool, lambda x: x * x, range(50), 4), 1):
+            assert len(submitted) - consumed <= 4
+            out.append(result)
+    assert out == [x * x for x in range(50)]
@@ -0,0 +1,56 @@
+# test_pipeline.py
+import pandas as pd
+
+import changelog
+import pipeline
+import summary
+
+
+def edited_csvs(csv_dir, out, edits):
+    # copies of the four CSVs, rewritten by pandas; edits: table -> fn(df)
+    files = pipeline.csv_files(str(out))
+    for table, path in pipeline.csv_files(csv_dir).items():
+        df = pd.read_csv(path)
+        if table in edits:
+            edits[table](df)
+        df.to_csv(files[table], index=False)
+    return files
+
+def test_an_unchanged_sync_writes_nothing(csv_dir, db_path):
+    with open(db_path, "rb") as f:
+        before = f.read()
+    pipeline.run_pipeline(db_path, "incremental", csv_dir=csv_dir, columnar_dir=None)
+    with open(db_path, "rb") as f:
+        assert f.read() == before
+    sync, written = pipeline.load_incremental(db_path, files=pipeline.csv_files(csv_dir))
+    sync.close()
+    assert written == 0
+
+def test_an_edited_row_updates_only_that_row(csv_dir, db_path, conn, tmp_path):
+    with conn:  # edited in the app; the CSV keeps the old city
+        conn.execute("UPDATE receivers SET City = 'Edited in app' WHERE Receiver_ID = 1")
+    seq = changelog.head(conn)[1]
+
+    def edit(df):
+        df.loc[df["Receiver_ID"] == 2, "City"] = "Edited in CSV"
+    files = edited_csvs(csv_dir, tmp_path, {"receivers": edit})
+    sync, written = pipeline.load_incremental(db_path, files=files)
+    sync.close()
+
+    assert written == 1
+    cities = dict(conn.execute("SELECT Receiver_ID, City FROM receivers WHERE Receiver_ID IN (1, 2)"))
+    assert cities == {1: "Edited in app", 2: "Edited in CSV"}
+    logged = conn.execute("SELECT Tbl, Op, Row_ID FROM change_log WHERE Seq > ?", (seq,)).fetchall()
+    assert logged == [("receivers", "U", 2)]
+    kept = conn.execute("SELECT * FROM summary_cities ORDER BY 1, 2").fetchall()
+    summary.rebuild(conn)
+    assert kept == conn.execute("SELECT * FROM summary_cities ORDER BY 1, 2").fetchall()
+
+def test_a_new_row_is_inserted(csv_dir, db_path, conn, tmp_path):
+    def add(df):
+        df.loc[len(df)] = {**df.iloc[0].to_dict(), "Provider_ID": 99_999, "Name": "New in CSV"}
+    files = edited_csvs(csv_dir, tmp_path, {"providers": add})
+    sync, written = pipeline.load_incremental(db_path, files=files)
+    sync.close()
+    assert written == 1
+    assert conn.execute("SELECT Name FROM providers WHERE Provider_ID = 99999").fetchone() == ("New in CSV",)
@@ -0,0 +1,68 @@
+# test_records.py
+import random
+
+import pytest
+
+import records
+from records import Store
+
+
+def table_rows(conn, store):
+    return conn.execute(f"SELECT {', '.join(store.names)} FROM {store.table}").fetchall()
+
+@pytest.mark.parametrize("table", list(records.SCHEMAS))
+def test_load_matches_the_table(conn, table):
+    store = Store.load(conn, table)
+    rows = table_rows(conn, store)
+    assert len(store) == len(rows) > 0
+    assert list(store.rows()) == rows
+    assert [store.row(s) for s in store.slots()] == rows
+    assert list(store) == [records.RECORDS[table](*r) for r in rows]
+    assert list(store.column(store.names[1])) == [r[1] for r in rows]
+
+def test_edits_match_a_reload(conn):
+    rng = random.Random(0)
+    strings = records.Dictionary()
+    store = Store.load(conn, "receivers", dictionary=strings)
+    slots = {row[0]: slot for slot, row in zip(store.slots(), store.rows())}
+    sql = "INSERT OR REPLACE INTO receivers (Receiver_ID, Name, Type, City, Contact) VALUES (?, ?, ?, ?, ?)"
+    for i in range(300):
+        rid = rng.choice(sorted(slots))
+        op = rng.random()
+        if op < 0.4:
+            row = (rid, rng.choice(["Zoë Ünal", "", "x" * 50]), rng.choice(["Shelter", None]),
+                   rng.choice(["São Paulo", "Köln", None]), rng.choice([None, "555"]))
+            with conn:
+                conn.execute(sql, row)
+            store.replace(slots[rid], row)
+        elif op < 0.7:
+            with conn:
+                conn.execute("DELETE FROM receivers WHERE Receiver_ID = ?", (rid,))
+            store.delete(slots.pop(rid))
+        else:
+            row = (max(slots) + 1, f"new {i}", "Charity", "Köln", None)
+            with conn:
+                conn.execute(sql, row)
+            slots[row[0]] = store.append(row)
+    assert store.free and store.size == len(slots) + len(store.free)
+    fresh = Store.load(conn, "receivers", dictionary=strings)
+    assert len(store) == len(fresh)
+    assert sorted(store.rows(), key=repr) == sorted(fresh.rows(), key=repr) == sorted(table_rows(conn, store), key=repr)
+    assert all(store.record(slot).Receiver_ID == rid for rid, slot in slots.items())
+
+def test_deleted_slots_are_reused():
+    store = Store("claims").extend([(1, 10, 100, "Pending", "2025-03-01", 2), (2, 11, 101, None, None, None)])
+    store.delete(0)
+    store.delete(0)
+    assert len(store) == 1 and list(store.rows()) == [(2, 11, 101, None, None, None)]
+    assert store.append((3, 12, 102, "Completed", "2025-03-02", None)) == 0
+    assert store.size == 2 and store.free == [] and store.dead == set()
+    assert list(store.rows()) == [(3, 12, 102, "Completed", "2025-03-02", None), (2, 11, 101, None, None, None)]
+
+def test_categories_share_one_dictionary():
+    strings = records.Dictionary()
+    a = Store("receivers", ["Receiver_ID", "City"], strings).extend([(1, "Köln"), (2, None)])
+    b = Store("providers", ["Provider_ID", "City"], strings).extend([(1, "Köln")])
+    assert len(strings) == 1
+    assert a.get(0, "City") is b.get(0, "City") and a.get(1, "City") is None
+    assert a.record(0) == records.Receiver(Receiver_ID=1, City="Köln")
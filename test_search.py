@@ -0,0 +1,51 @@
+# test_search.py
+import random
+
+import pytest
+
+import search
+from search import INDEXED
+
+
+def expected_hits(conn, table, prefix):
+    key, columns, _ = INDEXED[table]
+    rows = conn.execute(f"SELECT {key}, {', '.join(columns)} FROM {table}")
+    return {r[0] for r in rows if any(w.startswith(prefix) for v in r[1:] for w in search.words(v))}
+
+@pytest.mark.parametrize("table", list(INDEXED))
+def test_prefix_hits_match_a_scan_after_writes(conn, churn, monkeypatch, table):
+    monkeypatch.setattr(search, "RANK_WINDOW", 10 ** 9)  # rank every match
+    churn(conn, seed=9, rounds=40)
+    key, columns, _ = INDEXED[table]
+    # the triggers left the external-content index in step with the table
+    conn.execute(f"INSERT INTO {search.fts(table)} ({search.fts(table)}, rank) VALUES ('integrity-check', 1)")
+    values = [v for r in conn.execute(f"SELECT {', '.join(columns)} FROM {table}") for v in r if v]
+    rng = random.Random(0)
+    for word in rng.sample(sorted({w for v in values for w in search.words(v)}), 15):
+        prefix = word[:3]
+        hits, fixed = search.search(conn, table, prefix, limit=10 ** 6, fuzzy=False)
+        assert fixed == {}
+        assert set(hits[key] if not hits.empty else []) == expected_hits(conn, table, prefix), prefix
+
+def test_a_misspelt_word_is_corrected(conn):
+    with conn:
+        food_id = conn.execute("INSERT INTO food_listings (Food_Name, Quantity) VALUES ('Lasagna al forno', 4)").lastrowid
+    hits, fixed = search.search(conn, "food_listings", "lasgana")  # swapped letters
+    assert fixed == {"lasgana": ["lasagna"]}
+    assert list(hits["Food_ID"]) == [food_id]
+    assert search.search_values(conn, "food_listings", "Food_Name", "lasa") == ["Lasagna al forno"]
+
+    with conn:  # the update trigger takes the old words out of the index
+        conn.execute("UPDATE food_listings SET Food_Name = 'Moussaka' WHERE Food_ID = ?", (food_id,))
+    assert search.search(conn, "food_listings", "lasagna", fuzzy=False)[0].empty
+    hits, fixed = search.search(conn, "food_listings", "musaka")
+    assert fixed == {"musaka": ["moussaka"]} and list(hits["Food_ID"]) == [food_id]
+
+    with conn:
+        conn.execute("DELETE FROM food_listings WHERE Food_ID = ?", (food_id,))
+    hits, fixed = search.search(conn, "food_listings", "moussaka")
+    assert hits.empty and fixed == {}
+
+def test_nothing_to_match(conn):
+    assert search.search(conn, "providers", "  ,;  ")[0].empty
+    assert search.search_values(conn, "providers", "City", "") == []
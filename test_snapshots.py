@@ -0,0 +1,31 @@
+# test_snapshots.py
+import pandas as pd
+
+import changelog
+import snapshots
+
+
+def refreshed(conn):
+    with conn:
+        changelog.catch_up(conn)
+    return snapshots.refresh(conn)
+
+def test_snapshots_match_the_live_queries(conn, churn):
+    churn(conn, seed=8, rounds=30)
+    assert refreshed(conn)
+    assert snapshots.stale(conn) == []
+    for name, sql in snapshots.snapshot_queries().items():
+        snap = snapshots.load(conn, name)
+        live = pd.read_sql_query(sql, conn)
+        assert snap["fresh"], name
+        # the stored JSON keeps 10 decimal places
+        pd.testing.assert_frame_equal(snap["df"], live, check_dtype=False, rtol=1e-9, obj=name)
+
+def test_a_write_rebuilds_only_what_reads_the_table(conn):
+    refreshed(conn)
+    with conn:
+        conn.execute("UPDATE providers SET City = 'Elsewhere' WHERE Provider_ID = (SELECT MIN(Provider_ID) FROM providers)")
+    expected = sorted(n for n, sql in snapshots.snapshot_queries().items() if "providers" in snapshots.sources(sql))
+    assert expected and sorted(snapshots.stale(conn)) == expected
+    assert not snapshots.load(conn, expected[0])["fresh"]
+    assert sorted(refreshed(conn)) == expected
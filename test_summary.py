@@ -0,0 +1,15 @@
+# test_summary.py
+import summary
+
+TABLES = ["summary_totals", "summary_food_types", "summary_cities", "summary_claims_month"]
+
+
+def contents(conn):
+    return {t: sorted(conn.execute(f"SELECT * FROM {t}").fetchall(), key=repr) for t in TABLES}
+
+def test_triggers_match_a_rebuild(conn, churn):
+    churn(conn, seed=1)
+    assert conn.execute("SELECT COUNT(*) FROM claims_archive").fetchone()[0] > 0
+    kept = contents(conn)
+    summary.rebuild(conn)
+    assert kept == contents(conn)